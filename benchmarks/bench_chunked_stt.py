@@ -0,0 +1,52 @@
+"""
+วัด throughput ของ transcribe_long_audio กับ FakeSpeechClient (offline) และตรวจว่าลำดับคำถูกต้อง
+
+    python benchmarks/bench_chunked_stt.py --minutes 60 --latency 0.5 --workers 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from longsorn.fakes import FakeSpeechClient, fake_stt_caller, synthetic_speech_pcm
+from longsorn.stt import split_on_silence, transcribe_long_audio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=30)
+    parser.add_argument("--latency", type=float, default=0.3, help="latency ต่อการเรียก recognize (วินาที)")
+    parser.add_argument("--realtime-factor", type=float, default=0.01, help="เวลาประมวลผลเพิ่มต่อวินาทีเสียง")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    audio_seconds = args.minutes * 60
+    pcm = synthetic_speech_pcm(audio_seconds)
+    start = time.perf_counter()
+    chunks = split_on_silence(pcm)
+    split_ms = (time.perf_counter() - start) * 1000
+    longest = max(end - begin for begin, end in chunks) / 16000
+    print(f"audio: {args.minutes:g} min, {len(chunks)} chunks (longest {longest:.1f}s), split in {split_ms:.1f} ms")
+
+    baseline = None
+    print(f"{'workers':>7} {'wall (s)':>9} {'audio-s/s':>10} {'words':>7} {'max in-flight':>14} {'ordered':>8}")
+    for workers in args.workers:
+        client = FakeSpeechClient(latency=args.latency, realtime_factor=args.realtime_factor)
+        start = time.perf_counter()
+        result, error = transcribe_long_audio(client, pcm, max_workers=workers, caller=fake_stt_caller)
+        elapsed = time.perf_counter() - start
+        if error:
+            sys.exit(f"transcription failed: {error}")
+        words = result["word_timestamps"]
+        starts = [w["Start (s)"] for w in words]
+        ordered = all(a <= b for a, b in zip(starts, starts[1:]))
+        if baseline is None:
+            baseline = words
+        ordered = ordered and words == baseline
+        print(f"{workers:>7} {elapsed:>9.2f} {audio_seconds / elapsed:>10.0f} {len(words):>7} {client.max_concurrency:>14} {str(ordered):>8}")
+
+
+if __name__ == "__main__":
+    main()
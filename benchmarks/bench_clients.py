@@ -0,0 +1,55 @@
+"""
+วัดเวลาที่เสียไปกับการสร้าง SpeechClient / GenerativeModel ใหม่ทุก request เทียบกับการใช้ ClientRegistry
+(ไม่เรียก API จริง ใช้ AnonymousCredentials และ API key ปลอม จึงวัดเฉพาะต้นทุนการสร้าง client/channel
+TLS/gRPC handshake จริงเกิดตอนเรียก API ครั้งแรกของแต่ละ client ค่าที่ได้จึงเป็นขั้นต่ำของเวลาที่ประหยัดได้)
+
+    python benchmarks/bench_clients.py --requests 50
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from longsorn.clients import ClientRegistry, build_gemini_model
+
+
+def build_anonymous_speech_client():
+    from google.auth.credentials import AnonymousCredentials
+    from google.cloud import speech
+    return speech.SpeechClient(credentials=AnonymousCredentials())
+
+
+def measure(label, get_client, requests):
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        get_client()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    print(f"{label:<28} max {timings[-1]:>8.2f} ms   "
+          f"p50 {timings[len(timings) // 2]:>8.3f} ms   total {sum(timings):>9.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    # import SDK ไว้ก่อน เพื่อไม่ให้เวลา import ปนกับเวลาสร้าง client
+    build_anonymous_speech_client(); build_gemini_model("bench-key")
+
+    measure("speech: new per request", build_anonymous_speech_client, args.requests)
+    measure("gemini: new per request", lambda: build_gemini_model("bench-key"), args.requests)
+
+    registry = ClientRegistry()
+    measure("speech: registry", lambda: registry.get("speech", "bench", build_anonymous_speech_client), args.requests)
+    measure("gemini: registry", lambda: registry.get("gemini", "bench", lambda: build_gemini_model("bench-key")), args.requests)
+    for kind, stats in registry.stats().items():
+        print(f"{kind}: created={stats['created']} reused={stats['reused']} "
+              f"saved {stats['saved_ms_per_request']:.2f} ms/request ({stats['saved_ms_total']:.1f} ms total)")
+
+
+if __name__ == "__main__":
+    main()
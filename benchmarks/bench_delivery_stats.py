@@ -0,0 +1,124 @@
+"""
+เทียบการคำนวณสถิติการพูดแบบ loop เดิม และแบบ token id ล้วน (ก่อนมี FillerMatcher) กับ compute_delivery_stats บน transcript ยาว
+จบด้วย AssertionError ถ้า compute_delivery_stats ช้ากว่าแบบ token id เกิน --max-ratio เท่า (เวลาดีที่สุดจาก --repeat รอบ)
+
+    python benchmarks/bench_delivery_stats.py --hours 1 3
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from longsorn.fillers import load_lexicon
+from longsorn.phrase_index import normalize_token
+from longsorn.timeline import WordTimeline, compute_delivery_stats, rolling_pace
+
+VOCAB = ["the", "market", "students", "so", "you", "know", "um", "idea", "like", "data", "i", "mean", "right", "today"]
+
+
+def legacy_stats(transcript, word_timestamps, fillers_list):
+    """loop เดิมใน run_real_nlp_analysis"""
+    word_count = len(word_timestamps)
+    duration_seconds = float(word_timestamps[-1]['End (s)']) if word_timestamps and float(word_timestamps[-1]['End (s)']) > 0 else 1.0
+    wpm = (word_count / duration_seconds) * 60 if duration_seconds > 0 else 0
+    filler_word_count = sum(1 for word in transcript.lower().split() if word in fillers_list)
+    long_pauses = 0
+    for i in range(1, len(word_timestamps)):
+        if word_timestamps[i]['Start (s)'] - word_timestamps[i-1]['End (s)'] >= 2.0:
+            long_pauses += 1
+    return wpm, filler_word_count, long_pauses
+
+
+def token_id_stats(timeline, phrases):
+    """
+    สถิติแบบ token id ล้วน (หา filler ด้วย n-gram ของ id วลียาวได้ก่อน ไม่นับซ้ำ) เป็นเกณฑ์ความเร็วของ compute_delivery_stats
+    """
+    n = len(timeline)
+    used = np.zeros(n, dtype=bool)
+    matches = []
+    for phrase, tokens in sorted(((p, [normalize_token(t) for t in p.split()]) for p in phrases), key=lambda item: -len(item[1])):
+        m = len(tokens)
+        ids = [timeline.token_id(t) for t in tokens]
+        if m == 0 or m > n or -1 in ids:
+            continue
+        hit = np.ones(n - m + 1, dtype=bool)
+        for offset, token_id in enumerate(ids):
+            hit &= (timeline.token_ids[offset:n - m + 1 + offset] == token_id) & ~used[offset:n - m + 1 + offset]
+        positions = np.flatnonzero(hit)
+        if m > 1 and len(positions) > 1:
+            keep, last = [], -m
+            for pos in positions:
+                if pos >= last + m:
+                    keep.append(pos); last = pos
+            positions = np.asarray(keep, dtype=np.intp)
+        for offset in range(m):
+            used[positions + offset] = True
+        matches.extend((int(pos), phrase) for pos in positions)
+    matches.sort()
+    pauses = timeline.starts[1:] - timeline.ends[:-1]
+    long_pause_mask = pauses >= 2.0
+    window_starts, window_wpm = rolling_pace(timeline)
+    return {
+        "filler_matches": [{"phrase": phrase, "Start (s)": float(timeline.starts[i])} for i, phrase in matches],
+        "long_pauses": int(np.count_nonzero(long_pause_mask)),
+        "long_pause_starts": timeline.ends[:-1][long_pause_mask].tolist(),
+        "pace_windows": [{"start": float(s), "wpm": float(w)} for s, w in zip(window_starts, window_wpm)],
+    }
+
+
+def best_ms(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000, result
+
+
+def synthetic_words(hours, seed=0):
+    rng = random.Random(seed)
+    words, t = [], 0.0
+    while t < hours * 3600:
+        duration = rng.uniform(0.15, 0.5)
+        words.append({"Word": rng.choice(VOCAB), "Start (s)": t, "End (s)": t + duration})
+        t += duration + (rng.uniform(2.0, 4.0) if rng.random() < 0.01 else rng.uniform(0.0, 0.2))
+    return words
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, nargs="+", default=[1, 3])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-ratio", type=float, default=1.5, help="compute_delivery_stats ช้ากว่าแบบ token id ได้ไม่เกินกี่เท่า")
+    args = parser.parse_args()
+
+    phrases = [filler["phrase"] for filler in load_lexicon("en")["fillers"]]
+    print(f"{'hours':>5} {'words':>8} {'legacy (ms)':>12} {'token id (ms)':>14} {'build (ms)':>11} {'stats (ms)':>11} "
+          f"{'fillers old/new':>16} {'pauses':>7}")
+    slow = []
+    for hours in args.hours:
+        words = synthetic_words(hours)
+        transcript = " ".join(w["Word"] for w in words)
+
+        legacy_ms, (_, legacy_fillers, legacy_pauses) = best_ms(lambda: legacy_stats(transcript, words, phrases), args.repeat)
+        build_ms, timeline = best_ms(lambda: WordTimeline.from_word_timestamps(words), args.repeat)
+        token_id_ms, reference = best_ms(lambda: token_id_stats(timeline, phrases), args.repeat)
+        stats_ms, stats = best_ms(lambda: compute_delivery_stats(timeline, "en"), args.repeat)
+        assert stats["long_pauses"] == legacy_pauses == reference["long_pauses"]
+        assert stats["filler_word_count"] == len(reference["filler_matches"])
+        if stats_ms > args.max_ratio * token_id_ms:
+            slow.append(f"{hours:g} h: {stats_ms:.1f} ms > {args.max_ratio:g} x {token_id_ms:.1f} ms")
+
+        print(f"{hours:>5g} {len(words):>8} {legacy_ms:>12.1f} {token_id_ms:>14.1f} {build_ms:>11.1f} {stats_ms:>11.1f} "
+              f"{legacy_fillers:>7}/{stats['filler_word_count']:<8} {stats['long_pauses']:>7}")
+    print("(จำนวน filler แบบใหม่นับวลีหลายคำ เช่น 'you know', 'i mean' ได้ด้วย จึงไม่เท่ากับแบบเดิม)")
+    assert not slow, "compute_delivery_stats ช้ากว่าแบบ token id: " + "; ".join(slow)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+วัดเวลาและหน่วยความจำของการสกัด pitch/ความดัง/อัตราพยางค์จาก PCM (longsorn.features) บนเสียงสังเคราะห์ที่รู้ค่าจริง
+เสียงเป็น harmonic ที่ pitch เปลี่ยนทุก 10 วินาที ตัดเป็นพยางค์ด้วย envelope และมีช่วงเงียบคั่น
+
+    python benchmarks/bench_features.py --minutes 60 --block-seconds 10 60 300
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from longsorn.features import extract_features
+from longsorn.ingest import SAMPLE_RATE
+
+SEGMENT_SECONDS = 10
+
+
+def synthetic_voice(minutes, sample_rate=SAMPLE_RATE, seed=0):
+    """คืนค่า (PCM bytes, pitch จริงต่อช่วง 10 วินาที, พยางค์/วินาทีจริงต่อช่วง) ช่วงที่ลงท้ายด้วยเลข 9 เป็นช่วงเงียบ"""
+    rng = np.random.default_rng(seed)
+    segments, pitches, rates = [], [], []
+    t = np.arange(SEGMENT_SECONDS * sample_rate) / sample_rate
+    for index in range(int(minutes * 60 / SEGMENT_SECONDS)):
+        noise = rng.standard_normal(len(t)) * 30
+        if index % 10 == 9:
+            segments.append(noise.astype("<i2")); pitches.append(np.nan); rates.append(0.0)
+            continue
+        f0, syllables = rng.uniform(90, 260), rng.uniform(2.0, 5.0)
+        phase = 2 * np.pi * np.cumsum(f0 * (1 + 0.03 * np.sin(2 * np.pi * 0.5 * t))) / sample_rate
+        voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+        envelope = np.sin(np.pi * syllables * t) ** 2  # syllables peak ต่อวินาที
+        segments.append((voice * envelope * 5000 + noise).astype("<i2")); pitches.append(f0); rates.append(syllables)
+    return np.concatenate(segments).tobytes(), np.array(pitches), np.array(rates)
+
+
+def accuracy(features, pitches, rates):
+    """ค่าคลาดเคลื่อนเฉลี่ยของ median pitch (%) และอัตราพยางค์ (พยางค์/วินาที) ต่อช่วง เทียบกับค่าจริง"""
+    per_segment = int(round(SEGMENT_SECONDS / features.window_seconds))
+    n = min(len(pitches), len(features) // per_segment)
+    voiced = ~np.isnan(pitches[:n])
+    pitch = np.nanmedian(features.pitch_hz[:n * per_segment].reshape(n, per_segment)[voiced], axis=1)
+    rate = features.syllable_rate[:n * per_segment].reshape(n, per_segment).mean(axis=1)
+    pitch_error = np.nanmean(np.abs(pitch - pitches[:n][voiced]) / pitches[:n][voiced]) * 100
+    return pitch_error, np.mean(np.abs(rate[voiced] - rates[:n][voiced]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=60)
+    parser.add_argument("--block-seconds", type=float, nargs="+", default=[10, 60, 300])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pcm, pitches, rates = synthetic_voice(args.minutes)
+    audio_seconds = len(pcm) / (2 * SAMPLE_RATE)
+    print(f"{audio_seconds / 60:.0f} min audio ({len(pcm) / 1e6:.0f} MB PCM)")
+    print(f"{'block s':>8} {'seconds':>8} {'x realtime':>10} {'peak MB':>8} {'windows':>8} {'pitch err':>9} {'rate err':>8}")
+    for block_seconds in args.block_seconds:
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            features = extract_features(pcm, block_seconds=block_seconds)
+            times.append(time.perf_counter() - start)
+        tracemalloc.start()
+        extract_features(pcm, block_seconds=block_seconds)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        pitch_error, rate_error = accuracy(features, pitches, rates)
+        elapsed = min(times)
+        print(f"{block_seconds:>8g} {elapsed:>8.2f} {audio_seconds / elapsed:>10.0f} {peak / 1e6:>8.1f} {len(features):>8} "
+              f"{pitch_error:>8.1f}% {rate_error:>8.2f}")
+    print(features.summary())
+
+
+if __name__ == "__main__":
+    main()
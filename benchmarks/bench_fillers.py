@@ -0,0 +1,118 @@
+"""
+ความแม่นยำและความเร็วของการตรวจ filler words (longsorn.fillers) เทียบกับการเทียบทีละคำแบบเดิม (คำต้องตรงกับ filler ทั้งคำ)
+- accuracy: ประโยคภาษาไทยที่ติดป้าย filler ไว้แล้ว (fixtures/fillers_th_labeled.json ชุดเดียวกับ tests/test_fillers.py)
+- merged: transcript ตัวอย่างที่สุ่มรวมคำติดกันแบบที่ STT ภาษาไทยมักส่งมา จำนวน filler ที่นับได้ควรเท่าเดิม
+- throughput: transcript ภาษาไทยยาวหลายชั่วโมง (fixture วนซ้ำ)
+
+    python benchmarks/bench_fillers.py --hours 1 5
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from longsorn.fillers import get_matcher, load_lexicon
+from longsorn.phrase_index import normalize_token
+
+STT_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "stt_th_lecture.json")
+LABELED_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "fillers_th_labeled.json")
+
+
+def labeled_cases():
+    """(คำคั่นด้วย | ตามที่ STT ส่งมา, filler ที่ถูกต้องเรียงตามตำแหน่ง)"""
+    with open(LABELED_FIXTURE, encoding="utf-8") as f:
+        return [(case["tokens"], case["fillers"]) for case in json.load(f)["cases"]]
+
+
+def legacy_matches(tokens, phrases):
+    """แบบเดิม: คำ (หรือคำที่ติดกันสำหรับวลีหลายคำ) ต้องตรงกับ filler ทั้งคำ วลีที่ยาวกว่าได้ก่อน"""
+    phrase_tokens = sorted((tuple(normalize_token(t) for t in phrase.split()), phrase) for phrase in phrases)
+    used, matches = [False] * len(tokens), []
+    for parts, phrase in sorted(phrase_tokens, key=lambda item: -len(item[0])):
+        for i in range(len(tokens) - len(parts) + 1):
+            if tuple(tokens[i:i + len(parts)]) == parts and not any(used[i:i + len(parts)]):
+                used[i:i + len(parts)] = [True] * len(parts)
+                matches.append((i, phrase))
+    return [phrase for _, phrase in sorted(matches)]
+
+
+def score(predicted, expected):
+    """(true positive, false positive, false negative) เทียบเป็น multiset ต่อประโยค"""
+    remaining = list(expected)
+    tp = 0
+    for phrase in predicted:
+        if phrase in remaining:
+            remaining.remove(phrase); tp += 1
+    return tp, len(predicted) - tp, len(remaining)
+
+
+def report(name, totals):
+    tp, fp, fn = totals
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    print(f"{name:<18} precision {precision:6.1%}  recall {recall:6.1%}  (tp {tp}, fp {fp}, fn {fn})")
+
+
+def fixture_tokens(hours):
+    with open(STT_FIXTURE, encoding="utf-8") as f:
+        fixture = json.load(f)
+    tokens = [normalize_token(word) for word in fixture["w"]]
+    return tokens * max(1, int(hours * 3600 / fixture["duration_s"]))
+
+
+def merge_tokens(tokens, probability, seed=0):
+    """รวมคำที่ติดกันแบบสุ่ม (STT ภาษาไทยมักส่งวลีมาเป็นคำเดียว)"""
+    rng = random.Random(seed)
+    merged = [tokens[0]]
+    for token in tokens[1:]:
+        if rng.random() < probability:
+            merged[-1] += token
+        else:
+            merged.append(token)
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, nargs="+", default=[1, 5])
+    parser.add_argument("--merge", type=float, default=0.3, help="โอกาสที่คำถูกรวมกับคำก่อนหน้า")
+    args = parser.parse_args()
+
+    matcher = get_matcher("th")
+    phrases = [filler["phrase"] for filler in load_lexicon("th")["fillers"]]
+    legacy_totals, new_totals = [0, 0, 0], [0, 0, 0]
+    labeled = labeled_cases()
+    for sentence, expected in labeled:
+        tokens = [normalize_token(token) for token in sentence.split("|")]
+        for totals, predicted in ((legacy_totals, legacy_matches(tokens, phrases)), (new_totals, [m.phrase for m in matcher.find(tokens)])):
+            for i, value in enumerate(score(predicted, expected)):
+                totals[i] += value
+    print(f"accuracy ({len(labeled)} labeled sentences, {sum(len(e) for _, e in labeled)} fillers)")
+    report("token equality", legacy_totals)
+    report("aho-corasick", new_totals)
+
+    tokens = fixture_tokens(0.1)
+    merged = merge_tokens(tokens, args.merge)
+    print(f"\nmerged tokens ({len(tokens)} -> {len(merged)} words, merge probability {args.merge:g})")
+    print(f"{'token equality':<18} {len(legacy_matches(tokens, phrases)):>5} -> {len(legacy_matches(merged, phrases)):>5}")
+    print(f"{'aho-corasick':<18} {len(matcher.find(tokens)):>5} -> {len(matcher.find(merged)):>5}")
+
+    print(f"\n{'hours':>5} {'words':>9} {'build ms':>9} {'scan ms':>9} {'words/s':>11} {'fillers':>8}")
+    lexicon = load_lexicon("th")
+    for hours in args.hours:
+        tokens = fixture_tokens(hours)
+        start = time.perf_counter()
+        fresh = type(matcher).from_lexicon(lexicon)
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        matches = fresh.find(tokens)
+        scan = time.perf_counter() - start
+        print(f"{hours:>5g} {len(tokens):>9} {build * 1000:>9.2f} {scan * 1000:>9.1f} {len(tokens) / scan:>11,.0f} {len(matches):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+วัดเวลาเขียน/อ่านประวัติผลวิเคราะห์ (longsorn.history) ด้วยข้อมูลสังเคราะห์: ผู้สอนหลายคน คนละหลาย session
+- insert: add() ทีละรายการ (หนึ่ง transaction ต่อรายการ) เทียบ add_many() ครั้งละ --chunk รายการ
+- query: history() และ trend() ของผู้สอนหนึ่งคน แบบมี index และหลัง DROP INDEX (full table scan)
+
+    python benchmarks/bench_history.py
+    python benchmarks/bench_history.py --teachers 500 --sessions 40 --words 4000
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from longsorn.history import AnalysisStore
+
+DAY = 86400
+
+
+def synthetic_session(rng, index, words):
+    """ผลวิเคราะห์หนึ่ง session ในรูปแบบเดียวกับ run_pipeline (เฉพาะ field ที่ประวัติใช้)"""
+    duration = words / rng.uniform(1.8, 2.8)
+    starts = sorted(rng.uniform(0, duration) for _ in range(words))
+    return {
+        "speech_analysis": {"Filler Words Detected": rng.randint(0, 80), "Speaking Pace": "Good", "Clarity Score": round(rng.uniform(4, 9.5), 1),
+                            "Clarity Justification": "synthetic", "Long Pauses": rng.randint(0, 30)},
+        "delivery_stats": {"word_count": words, "duration_seconds": duration, "wpm": words / duration * 60},
+        "keywords": ["keyword"] * 5, "timeline_feedback": [],
+        "word_timeline": {"words": [f"word{(index + i) % 997}" for i in range(words)], "starts": starts, "ends": [s + 0.25 for s in starts]},
+    }
+
+
+def entries(teachers, sessions, words, seed=0):
+    rng = random.Random(seed)
+    templates = [synthetic_session(rng, i, words) for i in range(20)]  # ใช้ซ้ำ: วัดเวลาเขียน ไม่ใช่เวลาสร้างข้อมูล
+    now = time.time()
+    for session in range(sessions):
+        for teacher in range(teachers):
+            created_at = now - (sessions - session) * 7 * DAY + rng.uniform(0, DAY)
+            yield (f"teacher{teacher:05d}", f"{teacher:05d}{session:04d}", templates[(teacher + session) % len(templates)],
+                   {"job_id": f"job{teacher}-{session}", "file_name": f"lesson{session}.mp4", "created_at": created_at})
+
+
+def timed_queries(store, teacher_ids, repeat):
+    """ค่า median (ms) ของแต่ละ query"""
+    queries = {
+        "history (50 rows)": lambda user: store.history(user, limit=50),
+        "trend wpm": lambda user: store.trend(user, "wpm"),
+        "trend filler/min weekly": lambda user: store.trend(user, "filler_per_minute", bucket="week"),
+        "trend clarity monthly": lambda user: store.trend(user, "clarity", bucket="month"),
+    }
+    results = {}
+    for name, query in queries.items():
+        times = []
+        for _ in range(repeat):
+            for user in teacher_ids:
+                start = time.perf_counter()
+                query(user)
+                times.append(time.perf_counter() - start)
+        results[name] = statistics.median(times) * 1000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teachers", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=25, help="จำนวน session ต่อผู้สอน (ห่างกันสัปดาห์ละครั้ง)")
+    parser.add_argument("--words", type=int, default=2000, help="จำนวนคำใน word timeline ต่อ session")
+    parser.add_argument("--chunk", type=int, default=50, help="จำนวนรายการต่อ add_many()")
+    parser.add_argument("--single-rows", type=int, default=500, help="จำนวนรายการที่วัดด้วย add() ทีละรายการ")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="longsorn_history_")
+    try:
+        rows = list(entries(args.teachers, args.sessions, args.words))
+        single = AnalysisStore(os.path.join(work_dir, "single.sqlite3"))
+        start = time.perf_counter()
+        for user_id, video_hash, nlp_results, fields in rows[:args.single_rows]:
+            single.add(user_id, video_hash, nlp_results, **fields)
+        single_seconds = time.perf_counter() - start
+
+        store = AnalysisStore(os.path.join(work_dir, "history.sqlite3"))
+        start = time.perf_counter()
+        for offset in range(0, len(rows), args.chunk):
+            store.add_many(rows[offset:offset + args.chunk])
+        bulk_seconds = time.perf_counter() - start
+
+        size = sum(os.path.getsize(os.path.join(work_dir, name)) for name in os.listdir(work_dir) if name.startswith("history"))
+        print(f"{len(rows)} analyses ({args.teachers} teachers x {args.sessions} sessions, {args.words} words each), {size / 1e6:.0f} MB")
+        print(f"{'add() per row':<26} {len(rows[:args.single_rows]) / single_seconds:>9.0f} rows/s")
+        print(f"{f'add_many() x{args.chunk}':<26} {len(rows) / bulk_seconds:>9.0f} rows/s")
+
+        teacher_ids = [f"teacher{i:05d}" for i in random.Random(1).sample(range(args.teachers), min(20, args.teachers))]
+        indexed = timed_queries(store, teacher_ids, args.repeat)
+        connection = store._connect()
+        connection.execute("DROP INDEX analyses_user_time")
+        connection.execute("ALTER TABLE analyses RENAME TO analyses_old")  # ตัด index จาก UNIQUE (user_id, job_id) ด้วย
+        connection.execute("CREATE TABLE analyses AS SELECT * FROM analyses_old")
+        scanned = timed_queries(store, teacher_ids, args.repeat)
+        print(f"\n{'query (median ms)':<26} {'indexed':>9} {'no index':>9}")
+        for name in indexed:
+            print(f"{name:<26} {indexed[name]:>9.2f} {scanned[name]:>9.2f}")
+
+        start = time.perf_counter()
+        timeline = store.word_timeline(1)
+        print(f"\nword_timeline(): {len(timeline['words'])} words in {(time.perf_counter() - start) * 1000:.2f} ms")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+วัดเวลาเริ่มต้นของแอป (cold start + render หน้าอัปโหลดครั้งแรก) ด้วย python -X importtime
+
+    python benchmarks/bench_import_time.py                      # localrun.py และ app.py, 5 รอบ
+    python benchmarks/bench_import_time.py --script app.py --top 25 --output startup.json
+
+แต่ละรอบรันสคริปต์ใน process ใหม่แบบ bare mode ของ Streamlit (ไม่มี server) แล้วรายงาน
+เวลารวม (median), เวลา import สะสมของ package หนัก ๆ ที่ควรถูก import เฉพาะตอนเริ่มวิเคราะห์ และ module ที่ช้าที่สุด
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# package ที่ไม่ควรถูก import ตอนเปิดหน้าแรก
+WATCHED_PACKAGES = ("google.cloud.speech", "google.generativeai", "pandas", "requests", "numpy", "streamlit", "longsorn")
+
+
+def _matches(module, package):
+    return module == package or module.startswith(package + ".")
+
+
+def parse_importtime(stderr_text):
+    """
+    คืนค่า (เวลา import สะสมต่อ package ที่สนใจ, self time ของทุก module) หน่วย us
+    เวลาของ package = ผลรวม cumulative ของ module ใน package ที่ไม่ได้ถูก import จาก module อื่นใน package เดียวกัน
+    """
+    entries = []
+    for line in stderr_text.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append((len(name) - len(name.lstrip()), name.strip(), int(self_us), int(cumulative_us)))
+
+    packages = dict.fromkeys(WATCHED_PACKAGES, 0)
+    self_times = {}
+    ancestors = []  # -X importtime พิมพ์ลูกก่อนแม่ อ่านย้อนหลังจึงเห็นแม่ก่อนเสมอ
+    for depth, module, self_us, cumulative_us in reversed(entries):
+        while ancestors and ancestors[-1][0] >= depth:
+            ancestors.pop()
+        self_times[module] = self_times.get(module, 0) + self_us
+        for package in WATCHED_PACKAGES:
+            if _matches(module, package) and not any(_matches(name, package) for _, name in ancestors):
+                packages[package] += cumulative_us
+        ancestors.append((depth, module))
+    return packages, self_times
+
+
+def run_once(script):
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", script], cwd=ROOT, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    packages, self_times = parse_importtime(proc.stderr)
+    return {"wall_seconds": elapsed, "returncode": proc.returncode, "packages": packages, "self": self_times}
+
+
+def measure(script, repeat, top):
+    runs = [run_once(script) for _ in range(repeat)]
+    last = runs[-1]
+    return {
+        "script": script,
+        "wall_seconds_median": statistics.median(run["wall_seconds"] for run in runs),
+        "returncode": last["returncode"],
+        "packages_ms": {package: us / 1000 for package, us in last["packages"].items()},
+        "slowest_ms": [(module, us / 1000) for module, us in sorted(last["self"].items(), key=lambda item: -item[1])[:top]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--script", nargs="+", default=["localrun.py", "app.py"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="จำนวน module ที่ใช้เวลา import (self) มากที่สุดที่จะแสดง")
+    parser.add_argument("--output", help="บันทึกผลเป็น JSON")
+    args = parser.parse_args()
+
+    reports = []
+    for script in args.script:
+        report = measure(script, args.repeat, args.top)
+        reports.append(report)
+        print(f"{script}: {report['wall_seconds_median'] * 1000:.0f} ms median over {args.repeat} runs (exit {report['returncode']})")
+        for package, ms in report["packages_ms"].items():
+            print(f"  {package:<22} {'not imported' if not ms else f'{ms:8.1f} ms'}")
+        print("  slowest modules (self):")
+        for module, ms in report["slowest_ms"]:
+            print(f"    {module:<50} {ms:8.1f} ms")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+เปรียบเทียบขั้นตอนรับไฟล์แบบเดิม (ffprobe + ffmpeg ผ่านไฟล์ชั่วคราว 2 ไฟล์) กับ ingest_media (ffmpeg รอบเดียวผ่าน pipe)
+
+    python benchmarks/bench_ingest.py                 # สร้างวิดีโอทดสอบ 10 นาทีให้อัตโนมัติ
+    python benchmarks/bench_ingest.py --input lecture.mp4 --repeat 3
+
+แต่ละโหมดรันใน process ใหม่ เพื่อให้ค่า peak RSS (ru_maxrss) ไม่ปนกัน
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# --- เส้นทางเดิมใน app.py (คัดลอกมาโดยตัด Streamlit ออก) ---
+def legacy_get_audio_duration(file_path):
+    command = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", file_path]
+    result = subprocess.run(command, check=True, capture_output=True, text=True)
+    return float(result.stdout.strip())
+
+
+def legacy_convert_audio_with_ffmpeg(input_bytes, suffix, trim_duration=None):
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_in:
+        temp_in.write(input_bytes)
+        input_filename = temp_in.name
+    output_filename = input_filename + ".wav"
+    command = ["ffmpeg", "-i", input_filename, "-acodec", "pcm_s16le", "-ar", "16000", "-ac", "1", "-y"]
+    if trim_duration:
+        command.extend(["-t", str(trim_duration)])
+    command.append(output_filename)
+    subprocess.run(command, check=True, capture_output=True, text=True)
+    with open(output_filename, "rb") as f:
+        output_bytes = f.read()
+    os.remove(input_filename)
+    os.remove(output_filename)
+    return output_bytes
+
+
+def run_legacy(input_bytes, suffix, trim_duration):
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_in:
+        temp_in.write(input_bytes); input_filename = temp_in.name
+    duration = legacy_get_audio_duration(input_filename)
+    os.remove(input_filename)
+    trim = trim_duration if trim_duration and duration > trim_duration else None
+    pcm = legacy_convert_audio_with_ffmpeg(input_bytes, suffix, trim)
+    return duration, len(pcm)
+
+
+def run_ingest(input_bytes, suffix, trim_duration):
+    from longsorn.ingest import ingest_media
+    result, error = ingest_media(input_bytes, suffix, trim_duration=trim_duration)
+    if error:
+        raise RuntimeError(error)
+    return result.duration, len(result.pcm)
+
+
+MODES = {"legacy": run_legacy, "ingest": run_ingest}
+
+
+def make_synthetic_video(path, seconds):
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+               "-f", "lavfi", "-i", f"testsrc=size=640x360:rate=25:duration={seconds}",
+               "-f", "lavfi", "-i", f"sine=frequency=220:duration={seconds}",
+               "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-shortest", path]
+    subprocess.run(command, check=True)
+
+
+def worker(mode, path, trim_duration):
+    """รันโหมดเดียวแล้วพิมพ์ผลเป็น JSON (ถูกเรียกจาก process แม่)"""
+    with open(path, "rb") as f:
+        input_bytes = f.read()
+    suffix = os.path.splitext(path)[1]
+    start = time.perf_counter()
+    duration, pcm_bytes = MODES[mode](input_bytes, suffix, trim_duration)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "mode": mode,
+        "seconds": elapsed,
+        "source_duration": duration,
+        "pcm_bytes": pcm_bytes,
+        # ru_maxrss บน Linux มีหน่วยเป็น KB
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "peak_child_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", help="ไฟล์เสียง/วิดีโอที่ใช้ทดสอบ (ถ้าไม่ระบุจะสร้างวิดีโอสังเคราะห์)")
+    parser.add_argument("--minutes", type=float, default=10, help="ความยาววิดีโอสังเคราะห์")
+    parser.add_argument("--trim", type=float, default=60, help="ค่า trim_duration (0 = ไม่ตัด)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="พิมพ์ผลทั้งหมดเป็น JSON")
+    parser.add_argument("--worker", choices=sorted(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    trim_duration = args.trim or None
+
+    if args.worker:
+        worker(args.worker, args.input, trim_duration)
+        return
+
+    input_path = args.input
+    cleanup = None
+    if not input_path:
+        cleanup = tempfile.mkdtemp(prefix="longsorn_bench_")
+        input_path = os.path.join(cleanup, "synthetic.mp4")
+        make_synthetic_video(input_path, int(args.minutes * 60))
+
+    results = []
+    try:
+        for mode in MODES:
+            for _ in range(args.repeat):
+                out = subprocess.run([sys.executable, __file__, "--worker", mode, "--input", input_path, "--trim", str(args.trim)],
+                                     check=True, capture_output=True, text=True)
+                results.append(json.loads(out.stdout))
+    finally:
+        if cleanup:
+            os.remove(input_path); os.rmdir(cleanup)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"input: {args.input or f'synthetic {args.minutes:g} min video'}")
+    print(f"{'mode':<8} {'best (s)':>9} {'mean (s)':>9} {'peak RSS':>10} {'ffmpeg RSS':>11}")
+    for mode in MODES:
+        runs = [r for r in results if r["mode"] == mode]
+        times = [r["seconds"] for r in runs]
+        print(f"{mode:<8} {min(times):>9.3f} {sum(times) / len(times):>9.3f} "
+              f"{max(r['peak_rss_mb'] for r in runs):>8.1f}MB {max(r['peak_child_rss_mb'] for r in runs):>9.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
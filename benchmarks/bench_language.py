@@ -0,0 +1,66 @@
+"""
+เวลาที่ใช้ตรวจภาษาจากเสียง (run_language_detection) เทียบกับการถอดเสียงทั้งไฟล์ด้วย FakeSpeechClient (offline)
+- detect: ถอดเสียง --windows ช่วง ช่วงละ --window-seconds วินาที พร้อมกัน
+- cache: ไฟล์เดิมครั้งถัดไป (อ่านจาก TranscriptCache ไม่เรียก STT)
+- full STT: หนึ่งรอบการถอดเสียงทั้งไฟล์ = ที่เสียไปเมื่อเลือกภาษาผิดแล้วต้องรันใหม่แบบเดิม
+
+    python benchmarks/bench_language.py --minutes 10 30 60 --latency 0.3
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from longsorn.fakes import FakeSpeechClient, fake_stt_caller, synthetic_speech_pcm
+from longsorn.ingest import TRANSPORT_ENCODINGS
+from longsorn.language import SUPPORTED_LANGUAGE_CODES
+from longsorn.pipeline import run_language_detection
+from longsorn.stt import build_recognition_config, transcribe_long_audio
+from longsorn.transcript_cache import TranscriptCache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, nargs="+", default=[10, 30, 60])
+    parser.add_argument("--latency", type=float, default=0.3, help="latency ต่อการเรียก recognize (วินาที)")
+    parser.add_argument("--realtime-factor", type=float, default=0.01, help="เวลาประมวลผลเพิ่มต่อวินาทีเสียง")
+    parser.add_argument("--spoken", default="en-US", choices=SUPPORTED_LANGUAGE_CODES, help="ภาษาที่ fake client \"ได้ยิน\"")
+    parser.add_argument("--encoding", default="LINEAR16", choices=TRANSPORT_ENCODINGS, help="FLAC/OGG_OPUS ต้องมี ffmpeg")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="longsorn_language_")
+    try:
+        cache = TranscriptCache(work_dir)
+        print(f"{'minutes':>7} {'detected':>9} {'correct':>8} {'detect (s)':>11} {'sampled (s)':>12} {'cache (ms)':>11} {'full STT (s)':>13}")
+        for minutes in args.minutes:
+            pcm = synthetic_speech_pcm(minutes * 60)
+
+            def client():
+                return FakeSpeechClient(latency=args.latency, realtime_factor=args.realtime_factor, spoken_language=args.spoken)
+
+            detection = run_language_detection(pcm, client, cache, encoding=args.encoding, caller=fake_stt_caller)
+            if detection["source"] != "detected":
+                sys.exit(f"detection failed: {detection.get('error')}")
+            start = time.perf_counter()
+            cached = run_language_detection(pcm, client, cache, encoding=args.encoding, caller=fake_stt_caller)
+            cache_ms = (time.perf_counter() - start) * 1000
+            assert cached["source"] == "cache"
+
+            start = time.perf_counter()
+            _, error = transcribe_long_audio(client(), pcm, language_code=detection["language_code"],
+                                             config=build_recognition_config(detection["language_code"], encoding=args.encoding), caller=fake_stt_caller)
+            full_seconds = time.perf_counter() - start
+            if error:
+                sys.exit(f"transcription failed: {error}")
+            print(f"{minutes:>7g} {detection['language_code']:>9} {str(detection['language_code'] == args.spoken):>8} "
+                  f"{detection['detect_seconds']:>11.2f} {detection['sampled_seconds']:>12.0f} {cache_ms:>11.2f} {full_seconds:>13.2f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+วัดโหมด Live coaching แบบ offline ด้วย FakeStreamingSpeechClient (ป้อนเสียงเร็วกว่า real-time)
+
+    python benchmarks/bench_live.py --minutes 60
+    python benchmarks/bench_live.py --minutes 10 --speed 20    # ป้อนเฟรมเร็วกว่าเวลาจริง 20 เท่า
+
+1) streaming end-to-end: throughput (วินาทีเสียงต่อวินาทีจริง), จำนวน stream ที่เปิดใหม่, เวลาอัปเดตสถิติต่อคำ
+2) LiveStats (O(1) ต่อคำ) เทียบกับการเรียก compute_delivery_stats ใหม่ทุกครั้งที่ได้ผล final
+   และตรวจว่าค่าสุดท้ายตรงกับ compute_delivery_stats บน transcript ภาษาไทยที่มี filler
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from longsorn.fakes import FakeStreamingSpeechClient, synthetic_speech_pcm
+from longsorn.live import LiveStats, iter_pcm_frames, live_transcribe
+from longsorn.timeline import WordTimeline, compute_delivery_stats
+
+STT_FIXTURE = os.path.join(ROOT, "benchmarks", "fixtures", "stt_th_lecture.json")
+
+
+def fixture_words(minutes):
+    """คำจาก fixture ภาษาไทยวนซ้ำให้ยาว minutes นาที"""
+    with open(STT_FIXTURE, encoding="utf-8") as f:
+        fixture = json.load(f)
+    cycle = fixture["duration_s"] + 2.5  # เว้นช่วงเงียบระหว่างรอบให้มี long pause
+    words = []
+    for n in range(int(minutes * 60 // cycle) + 1):
+        words.extend((w, n * cycle + s / 1000, n * cycle + e / 1000) for w, s, e in zip(fixture["w"], fixture["s"], fixture["e"]))
+    return words
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=60)
+    parser.add_argument("--speed", type=float, default=None, help="อัตราป้อนเฟรมเทียบเวลาจริง (ไม่ระบุ = เร็วที่สุด)")
+    parser.add_argument("--final-seconds", type=float, default=3.0, help="ความยาวเสียงต่อผล final ของ fake")
+    args = parser.parse_args()
+
+    # --- 1) streaming end-to-end ---
+    pcm = synthetic_speech_pcm(args.minutes * 60)
+    client = FakeStreamingSpeechClient(final_seconds=args.final_seconds)
+    stats = LiveStats()
+    update_seconds = 0.0
+    start = time.perf_counter()
+    for words in live_transcribe(client, iter_pcm_frames(pcm, speed=args.speed)):
+        t = time.perf_counter()
+        stats.add_words(words)
+        update_seconds += time.perf_counter() - t
+    elapsed = time.perf_counter() - start
+    audio_seconds = len(pcm) / 32000
+    print(f"streaming: {audio_seconds / 60:.0f} min audio in {elapsed:.2f}s ({audio_seconds / elapsed:.0f} audio-s/s), "
+          f"{client.streams} streams, {stats.word_count} words, {update_seconds / max(stats.word_count, 1) * 1e6:.2f} µs/word update")
+
+    # --- 2) incremental vs recompute ---
+    words = fixture_words(args.minutes)
+    batch_size = max(1, int(len(words) / (args.minutes * 60 / args.final_seconds)))  # คำต่อผล final
+    stats = LiveStats("th")
+    start = time.perf_counter()
+    for i in range(0, len(words), batch_size):
+        stats.add_words(words[i:i + batch_size])
+        stats.snapshot()
+    incremental = time.perf_counter() - start
+
+    # การคำนวณเดิม: สร้าง timeline และคำนวณใหม่ทั้งหมดทุกครั้งที่มีคำใหม่ (จำกัดจำนวนรอบเพื่อไม่ให้รันนานเกินไป)
+    word_timestamps = [{"Word": w, "Start (s)": s, "End (s)": e} for w, s, e in words]
+    updates = range(batch_size, len(words) + 1, batch_size)
+    sampled = updates[::max(1, len(updates) // 200)]
+    start = time.perf_counter()
+    for end in sampled:
+        compute_delivery_stats(WordTimeline.from_word_timestamps(word_timestamps[:end]), "th")
+    recompute = (time.perf_counter() - start) / len(sampled) * len(updates)
+    print(f"{len(words)} words, {len(updates)} updates: incremental {incremental * 1000:.1f} ms, "
+          f"recompute every update ~{recompute * 1000:.0f} ms ({recompute / incremental:.0f}x)")
+
+    batch = compute_delivery_stats(WordTimeline.from_word_timestamps(word_timestamps), "th")
+    live = stats.snapshot()
+    for name in ("word_count", "filler_word_count", "long_pauses", "wpm", "longest_pause"):
+        same = abs(live[name] - batch[name]) < 1e-6
+        print(f"  {name:<18} live={live[name]:<12.6g} batch={batch[name]:<12.6g} {'ok' if same else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    main()
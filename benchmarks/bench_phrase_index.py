@@ -0,0 +1,79 @@
+"""
+เทียบการหาเวลาของวลีแบบเดิม (nested loop ทุกตำแหน่ง) กับ PhraseIndex บน transcript สังเคราะห์
+
+    python benchmarks/bench_phrase_index.py --words 50000 --phrases 5
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from longsorn.phrase_index import PhraseIndex, format_timestamp
+
+THAI_SYLLABLES = ["การ", "สอน", "นักเรียน", "ความ", "รู้", "เรื่อง", "ตลาด", "ครับ", "ที่", "จะ", "เรา", "ต้อง", "เข้าใจ", "ข้อมูล"]
+
+
+def legacy_find_timestamp_for_phrase(phrase, word_timestamps):
+    """เวอร์ชันเดิมใน app.py"""
+    clean_phrase = phrase.replace("...", "").strip()
+    words_in_phrase = clean_phrase.lower().split()
+    if not words_in_phrase: return "N/A"
+    for i in range(len(word_timestamps) - len(words_in_phrase) + 1):
+        match = True
+        for j in range(len(words_in_phrase)):
+            if word_timestamps[i+j]['Word'].lower() != words_in_phrase[j]:
+                match = False; break
+        if match:
+            start_seconds = float(word_timestamps[i]['Start (s)'])
+            minutes = int(start_seconds // 60); seconds = int(start_seconds % 60)
+            return f"{minutes:01d}:{seconds:02d}"
+    return "N/A"
+
+
+def synthetic_transcript(n_words, seed=0):
+    rng = random.Random(seed)
+    words, t = [], 0.0
+    for _ in range(n_words):
+        duration = rng.uniform(0.15, 0.6)
+        words.append({"Word": rng.choice(THAI_SYLLABLES), "Start (s)": t, "End (s)": t + duration})
+        t += duration + rng.uniform(0.0, 0.3)
+    return words
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, default=50000)
+    parser.add_argument("--phrases", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    words = synthetic_transcript(args.words)
+    # วลีที่อยู่ช่วงท้าย transcript (กรณีแย่สุดของ nested loop) และแบบที่ Gemini เว้นวรรคต่างจาก STT
+    positions = [rng.randrange(args.words * 3 // 4, args.words - 8) for _ in range(args.phrases)]
+    exact_phrases = [" ".join(w["Word"] for w in words[p:p + 6]) for p in positions]
+    spaced_phrases = ["".join(w["Word"] for w in words[p:p + 3]) + " " + "".join(w["Word"] for w in words[p + 3:p + 6]) for p in positions]
+
+    start = time.perf_counter()
+    legacy = [legacy_find_timestamp_for_phrase(p, words) for p in exact_phrases + spaced_phrases]
+    legacy_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    index = PhraseIndex(words)
+    build_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    indexed = [format_timestamp(index.lookup(p)) for p in exact_phrases + spaced_phrases]
+    lookup_ms = (time.perf_counter() - start) * 1000
+
+    legacy_found = sum(t != "N/A" for t in legacy)
+    indexed_found = sum(t != "N/A" for t in indexed)
+    print(f"{args.words} words, {len(legacy)} phrases ({args.phrases} exact + {args.phrases} re-spaced)")
+    print(f"legacy nested loop : {legacy_ms:9.1f} ms   found {legacy_found}/{len(legacy)}")
+    print(f"PhraseIndex        : {build_ms:9.1f} ms build + {lookup_ms:.2f} ms lookups   found {indexed_found}/{len(indexed)}")
+    print(f"exact results agree: {legacy[:args.phrases] == indexed[:args.phrases]}")
+
+
+if __name__ == "__main__":
+    main()
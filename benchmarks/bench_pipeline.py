@@ -0,0 +1,189 @@
+"""
+Benchmark ทั้ง pipeline แบบ end-to-end ด้วยไฟล์สังเคราะห์จาก ffmpeg และ fake ที่เล่นซ้ำผล STT/Gemini ที่บันทึกไว้
+
+    python benchmarks/bench_pipeline.py                          # เสียงและวิดีโอ 1, 10, 60 นาที
+    python benchmarks/bench_pipeline.py --minutes 1 10 --kinds audio --output results.json
+    python benchmarks/bench_pipeline.py --compare baseline.json results.json
+
+วัดแต่ละขั้นตอน: ingest (ffmpeg), vad, stt, stats, nlp, phrase_lookup
+ผลเป็น JSON (latency, throughput = วินาทีเสียงต่อวินาทีจริง, peak memory) เพื่อเทียบระหว่างการรันได้
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from longsorn.fakes import ReplayGenerativeModel, ReplaySpeechClient, fake_gemini_caller, fake_stt_caller
+from longsorn.ingest import ingest_media
+from longsorn.phrase_index import PhraseIndex, find_timestamp_for_phrase
+from longsorn.pipeline import run_real_nlp_analysis, run_stt_transcription
+from longsorn.timeline import WordTimeline, compute_delivery_stats
+from longsorn.vad import compress_silence
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+STT_FIXTURE = os.path.join(FIXTURE_DIR, "stt_th_lecture.json")
+GEMINI_FIXTURE = os.path.join(FIXTURE_DIR, "gemini_th_lecture.txt")
+# เสียง 220 Hz ที่ถูกตัดเป็นช่วง ๆ (ประมาณพูด 6 วินาที เงียบ 2-4 วินาที) เพื่อให้มีช่วงเงียบให้ตัด chunk
+SPEECH_EXPR = "0.3*sin(2*PI*220*t)*gt(sin(2*PI*t/9)+0.3*sin(2*PI*t/3.7),-0.2)"
+
+
+def make_media(path, seconds, kind):
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+               "-f", "lavfi", "-i", f"aevalsrc={SPEECH_EXPR}:s=44100:d={seconds}"]
+    if kind == "video":
+        command += ["-f", "lavfi", "-i", f"testsrc=size=640x360:rate=25:duration={seconds}",
+                    "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-shortest"]
+    else:
+        command += ["-c:a", "libmp3lame", "-b:a", "64k"]
+    subprocess.run(command + [path], check=True)
+
+
+def measure(stage, fn, report):
+    """รัน fn แล้วบันทึกเวลาและ peak memory ฝั่ง Python (tracemalloc) ของขั้นตอนนั้น"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    report[stage] = {"seconds": elapsed, "peak_python_mb": peak / 1e6}
+    return result
+
+
+def bench_file(path, kind, minutes, stt_fixture, gemini_text, args):
+    stages = {}
+    ingest_result, error = measure("ingest", lambda: ingest_media(path), stages)
+    if error:
+        raise RuntimeError(error)
+    audio_seconds = ingest_result.duration
+
+    vad_result = measure("vad", lambda: compress_silence(ingest_result.pcm), stages)
+
+    speech_client = ReplaySpeechClient(stt_fixture, latency=args.stt_latency)
+    stt_result, error = measure("stt", lambda: run_stt_transcription(vad_result.pcm, "th-TH", lambda: speech_client, caller=fake_stt_caller), stages)
+    if error:
+        raise RuntimeError(error)
+    words = vad_result.map_words(stt_result["word_timestamps"])
+
+    timeline = measure("stats", lambda: WordTimeline.from_word_timestamps(words), stages)
+    measure("stats_compute", lambda: compute_delivery_stats(timeline, "th"), stages)
+    stages["stats"]["seconds"] += stages.pop("stats_compute")["seconds"]
+
+    model = ReplayGenerativeModel(gemini_text, latency=args.gemini_latency)
+    results = measure("nlp", lambda: run_real_nlp_analysis(stt_result["transcript"], words, "", "th-TH", lambda: model, timeline,
+                                                           caller=fake_gemini_caller), stages)
+
+    originals = [rec["original"] for rec in results["ai_recommendations"]]
+    measure("phrase_lookup", lambda: [find_timestamp_for_phrase(o, PhraseIndex(words)) for o in originals], stages)
+
+    total = sum(stage["seconds"] for stage in stages.values())
+    for stage in stages.values():
+        stage["throughput_audio_s_per_s"] = audio_seconds / stage["seconds"] if stage["seconds"] else None
+    return {
+        "kind": kind,
+        "minutes": minutes,
+        "file_mb": os.path.getsize(path) / 1e6,
+        "audio_seconds": audio_seconds,
+        "words": len(words),
+        "vad_saved_seconds": vad_result.saved_seconds,
+        "stt_calls": speech_client.calls,
+        "gemini_calls": model.calls,
+        "stages": stages,
+        "total_seconds": total,
+        "throughput_audio_s_per_s": audio_seconds / total,
+        "peak_child_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report):
+    print(f"{'case':<12} {'words':>7} {'ingest':>8} {'vad':>8} {'stt':>8} {'stats':>8} {'nlp':>8} {'lookup':>8} {'total':>8} {'audio-s/s':>10} {'RSS MB':>7}")
+    for run in report["runs"]:
+        s = run["stages"]
+        print(f"{run['kind'] + ' ' + format(run['minutes'], 'g') + 'm':<12} {run['words']:>7} "
+              + " ".join(f"{s[name]['seconds']:>8.2f}" for name in ("ingest", "vad", "stt", "stats", "nlp", "phrase_lookup"))
+              + f" {run['total_seconds']:>8.2f} {run['throughput_audio_s_per_s']:>10.0f} {run['peak_rss_mb']:>7.0f}")
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f: old = json.load(f)
+    with open(new_path) as f: new = json.load(f)
+    old_runs = {(r["kind"], r["minutes"]): r for r in old["runs"]}
+    print(f"{old.get('git_revision')} -> {new.get('git_revision')}")
+    for run in new["runs"]:
+        base = old_runs.get((run["kind"], run["minutes"]))
+        if base is None:
+            continue
+        deltas = []
+        for name, stage in run["stages"].items():
+            if name in base["stages"] and base["stages"][name]["seconds"]:
+                change = (stage["seconds"] / base["stages"][name]["seconds"] - 1) * 100
+                deltas.append(f"{name} {change:+.0f}%")
+        print(f"{run['kind']} {run['minutes']:g}m: " + ", ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, nargs="+", default=[1, 10, 60])
+    parser.add_argument("--kinds", nargs="+", choices=["audio", "video"], default=["audio", "video"])
+    parser.add_argument("--stt-latency", type=float, default=0.3, help="latency จำลองต่อการเรียก recognize")
+    parser.add_argument("--gemini-latency", type=float, default=1.0, help="latency จำลองต่อการเรียก Gemini")
+    parser.add_argument("--output", help="บันทึกผลเป็น JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="เทียบผล JSON สองไฟล์")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if shutil.which("ffmpeg") is None:
+        sys.exit("ffmpeg not found (ดู packages.txt)")
+
+    with open(STT_FIXTURE, encoding="utf-8") as f:
+        stt_fixture = json.load(f)
+    with open(GEMINI_FIXTURE, encoding="utf-8") as f:
+        gemini_text = f.read()
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": [],
+    }
+    work_dir = tempfile.mkdtemp(prefix="longsorn_bench_")
+    try:
+        for minutes in args.minutes:
+            for kind in args.kinds:
+                path = os.path.join(work_dir, f"{kind}_{minutes:g}m." + ("mp4" if kind == "video" else "mp3"))
+                make_media(path, int(minutes * 60), kind)
+                report["runs"].append(bench_file(path, kind, minutes, stt_fixture, gemini_text, args))
+                os.remove(path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+วัด latency (p50/p99) และอัตราสำเร็จของการเรียก Gemini ผ่าน ResilientCaller เมื่อ fake API ล้มเหลว (429/503) และช้าเป็นบางครั้ง
+เทียบการเรียกตรง, retry แบบ backoff + jitter และ retry + hedged request โดยมีหลาย session เรียกพร้อมกันผ่าน limiter ตัวเดียว
+
+    python benchmarks/bench_resilience.py --calls 400 --sessions 8 --error-rate 0.1 --slow-rate 0.05 --slow-seconds 1
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from longsorn.fakes import FakeGenerativeModel, FlakyProxy
+from longsorn.resilience import ResilientCaller, TokenBucket
+
+PROMPT = 'Full Transcript:\n"""\n' + " ".join(f"w{i}" for i in range(300)) + '\n"""'
+
+
+def direct_call(fn, *args, **kwargs):
+    return fn(*args, **kwargs)
+
+
+def run(strategy, args):
+    """คืนค่า (latency ของการเรียกที่สำเร็จ, จำนวนที่ล้มเหลว, จำนวน request ที่ fake ได้รับ, stats ของ caller)"""
+    model = FlakyProxy(FakeGenerativeModel(latency=args.latency, seconds_per_1k_chars=0), error_rate=args.error_rate,
+                       slow_rate=args.slow_rate, slow_seconds=args.slow_seconds, seed=args.seed)
+    caller = None
+    if strategy != "direct":
+        caller = ResilientCaller(strategy, TokenBucket(args.qps) if args.qps else None, base_delay=args.base_delay,
+                                 deadline_seconds=args.deadline, hedge_after_seconds=args.hedge_after if strategy == "hedge" else None,
+                                 max_concurrent=args.sessions * 2, seed=args.seed)
+    call = caller.call if caller else direct_call
+
+    def one(_):
+        start = time.perf_counter()
+        try:
+            call(model.generate_content, PROMPT)
+            return time.perf_counter() - start
+        except Exception:
+            return None
+
+    with ThreadPoolExecutor(max_workers=args.sessions) as executor:
+        results = list(executor.map(one, range(args.calls)))
+    latencies = np.array([r for r in results if r is not None])
+    return latencies, results.count(None), model.calls, caller.stats() if caller else {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--sessions", type=int, default=8, help="จำนวน thread ที่เรียกพร้อมกัน")
+    parser.add_argument("--latency", type=float, default=0.05, help="เวลาตอบปกติของ fake (วินาที)")
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-seconds", type=float, default=1.0)
+    parser.add_argument("--qps", type=float, default=0, help="token bucket ร่วม (0 = ไม่จำกัด)")
+    parser.add_argument("--base-delay", type=float, default=0.05)
+    parser.add_argument("--deadline", type=float, default=10.0)
+    parser.add_argument("--hedge-after", type=float, default=0.15)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{args.calls} calls, {args.sessions} sessions, error {args.error_rate:.0%}, slow {args.slow_rate:.0%} (+{args.slow_seconds:g}s)")
+    print(f"{'strategy':<8} {'ok':>6} {'failed':>6} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'upstream':>8}  stats")
+    for strategy in ("direct", "retry", "hedge"):
+        latencies, failed, upstream, stats = run(strategy, args)
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1000 if len(latencies) else (0, 0, 0)
+        print(f"{strategy:<8} {len(latencies):>6} {failed:>6} {p50:>8.0f} {p90:>8.0f} {p99:>8.0f} {upstream:>8}  "
+              f"{ {k: v for k, v in stats.items() if v} }")
+
+
+if __name__ == "__main__":
+    main()
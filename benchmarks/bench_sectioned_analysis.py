@@ -0,0 +1,71 @@
+"""
+เทียบเวลาการวิเคราะห์ transcript ยาวแบบ prompt เดียวกับ map-reduce ทีละช่วง โดยใช้ FakeGenerativeModel (offline)
+
+    python benchmarks/bench_sectioned_analysis.py --minutes 60 --workers 1 2 4 8
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from longsorn.analysis import apply_feedback_event, build_analysis_prompt, new_analysis_results, sectioned_feedback_events, stream_feedback_events
+from longsorn.fakes import FakeGenerativeModel, fake_gemini_caller
+from longsorn.phrase_index import PhraseIndex
+from longsorn.timeline import WordTimeline, compute_delivery_stats
+
+VOCAB = ["market", "students", "today", "pricing", "customer", "segment", "brand", "channel", "survey", "growth"]
+
+
+def synthetic_words(minutes, seed=0):
+    rng = random.Random(seed)
+    words, t = [], 0.0
+    while t < minutes * 60:
+        duration = rng.uniform(0.2, 0.5)
+        words.append({"Word": rng.choice(VOCAB), "Start (s)": t, "End (s)": t + duration})
+        t += duration + rng.uniform(0.0, 0.2)
+    return words
+
+
+def run(events, stats):
+    results = new_analysis_results(stats)
+    for event in events:
+        apply_feedback_event(results, event)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=60)
+    parser.add_argument("--section-seconds", type=float, default=300)
+    parser.add_argument("--latency", type=float, default=1.0, help="latency คงที่ต่อการเรียก (วินาที)")
+    parser.add_argument("--seconds-per-1k-chars", type=float, default=0.02, help="เวลาเพิ่มตามความยาว prompt")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    words = synthetic_words(args.minutes)
+    stats = compute_delivery_stats(WordTimeline.from_word_timestamps(words), "en")
+    transcript = " ".join(w["Word"] for w in words)
+
+    model = FakeGenerativeModel(latency=args.latency, seconds_per_1k_chars=args.seconds_per_1k_chars)
+    timings = {}
+    start = time.perf_counter()
+    results = run(stream_feedback_events(model, build_analysis_prompt(transcript, "", ""), PhraseIndex(words), timings, fake_gemini_caller), stats)
+    print(f"{args.minutes:g} min transcript, {len(words)} words")
+    print(f"{'mode':<22} {'wall (s)':>9} {'first (s)':>10} {'calls':>6} {'suggestions':>12}")
+    print(f"{'single prompt':<22} {time.perf_counter() - start:>9.2f} {timings.get('first_feedback_s', 0):>10.2f} "
+          f"{model.calls:>6} {len(results['ai_recommendations']):>12}")
+
+    for workers in args.workers:
+        model = FakeGenerativeModel(latency=args.latency, seconds_per_1k_chars=args.seconds_per_1k_chars)
+        timings = {}
+        start = time.perf_counter()
+        results = run(sectioned_feedback_events(model, words, "", "en-US", timings, args.section_seconds, workers, fake_gemini_caller), stats)
+        print(f"{f'sectioned x{workers}':<22} {time.perf_counter() - start:>9.2f} {timings.get('first_feedback_s', 0):>10.2f} "
+              f"{model.calls:>6} {len(results['ai_recommendations']):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+เทียบจำนวนการเรียก Gemini เมื่อคำตอบผิดรูปแบบ: JSON mode ที่เรียกซ้ำเฉพาะช่วงที่ตรวจไม่ผ่าน
+กับการเรียกใหม่ทั้งการวิเคราะห์ (full retry) และวัดเวลา parse แบบ JSON เทียบกับ parser แบบบรรทัด
+
+    python benchmarks/bench_structured_output.py --minutes 60 --invalid-rate 0 0.05 0.2 --runs 20
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from longsorn.analysis import parse_feedback_line, parse_structured_feedback, split_sections, structured_feedback_events
+from longsorn.fakes import FakeGenerativeModel, fake_gemini_caller
+from longsorn.phrase_index import PhraseIndex
+
+
+def synthetic_words(minutes):
+    return [{"Word": f"w{i % 997}", "Start (s)": i * 0.4, "End (s)": i * 0.4 + 0.3} for i in range(int(minutes * 150))]
+
+
+def calls_per_analysis(words, invalid_rate, runs, max_retries):
+    """คืนค่า (การเรียกเฉลี่ยต่อการวิเคราะห์, parse failure rate, สัดส่วนการวิเคราะห์ที่ยังมีช่วงล้มเหลว)"""
+    calls = failures = incomplete = 0
+    for seed in range(runs):
+        model = FakeGenerativeModel(latency=0, seconds_per_1k_chars=0, invalid_json_rate=invalid_rate, seed=seed)
+        while True:
+            timings = {}
+            list(structured_feedback_events(model, words, "", "th-TH", timings, max_retries=max_retries, caller=fake_gemini_caller))
+            failures += timings.get("parse_failures", 0)
+            # full retry: เรียกใหม่ทั้งหมดจนกว่าทุกช่วงจะผ่าน (จำกัด 10 รอบ)
+            if max_retries or not timings["failed_sections"] or model.calls >= 10 * timings["sections"]:
+                break
+        calls += model.calls
+        incomplete += bool(timings["failed_sections"])
+    return calls / runs, failures / calls, incomplete / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=60)
+    parser.add_argument("--invalid-rate", type=float, nargs="+", default=[0.0, 0.05, 0.2])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--max-retries", type=int, default=2)
+    args = parser.parse_args()
+
+    words = synthetic_words(args.minutes)
+    sections = len(split_sections(words))
+    print(f"{args.minutes:g} min, {len(words)} words, {sections} sections")
+    print(f"{'invalid':>7} {'strategy':<16} {'calls/analysis':>14} {'wasted':>7} {'parse fail':>10} {'incomplete':>10}")
+    for rate in args.invalid_rate:
+        for name, retries in (("section retry", args.max_retries), ("full retry", 0)):
+            calls, failure_rate, incomplete = calls_per_analysis(words, rate, args.runs, retries)
+            print(f"{rate:>7.2f} {name:<16} {calls:>14.2f} {calls - sections:>7.2f} {failure_rate:>10.1%} {incomplete:>10.1%}")
+
+    model = FakeGenerativeModel()
+    prompt = f'Full Transcript:\n"""\n{" ".join(w["Word"] for w in words[:1000])}\n"""'
+    text, json_text = model.respond(prompt), model.respond_json(prompt)
+    phrase_index = PhraseIndex(words[:1000])
+    for name, parse in (("lines", lambda: [parse_feedback_line(line, phrase_index) for line in text.splitlines()]),
+                        ("json", lambda: parse_structured_feedback(json_text, phrase_index))):
+        start = time.perf_counter()
+        for _ in range(1000):
+            parse()
+        print(f"parse {name:<5} {(time.perf_counter() - start) * 1000:.1f} µs/response")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+เทียบ encoding ที่ใช้ส่งเสียงไป STT (LINEAR16 / FLAC / OGG_OPUS): ขนาด payload, เวลาบีบอัด และเวลาทั้งหมด
+เมื่อจำลองความเร็วอัปโหลด (ต้องมี ffmpeg ที่รองรับ flac และ libopus)
+
+    python benchmarks/bench_stt_transport.py --minutes 10 --uplink-mbps 5
+    python benchmarks/bench_stt_transport.py --input lecture.mp4 --uplink-mbps 2 10 50
+
+เสียงสังเคราะห์เป็น noise ซึ่งบีบอัดได้น้อยกว่าเสียงพูดจริง ใช้ --input เพื่อวัดกับไฟล์จริง
+ตรวจด้วยว่าผลลัพธ์มีรูปแบบเดียวกันทุก encoding และ FLAC ได้คำเหมือน LINEAR16 ทุกคำ (lossless)
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from longsorn.fakes import FakeSpeechClient, fake_stt_caller, synthetic_speech_pcm
+from longsorn.ingest import encode_pcm, ingest_media
+from longsorn.stt import TRANSPORT_ENCODINGS, build_recognition_config, split_on_silence, transcribe_long_audio
+
+
+def result_shape(result):
+    return sorted(result), [sorted(word) for word in result["word_timestamps"][:1]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", help="ไฟล์เสียง/วิดีโอจริง (ถ้าไม่ระบุใช้เสียงสังเคราะห์)")
+    parser.add_argument("--minutes", type=float, default=10)
+    parser.add_argument("--uplink-mbps", type=float, nargs="+", default=[2, 10, 50])
+    parser.add_argument("--latency", type=float, default=0.3, help="latency ต่อการเรียก recognize (วินาที)")
+    parser.add_argument("--encodings", nargs="+", default=list(TRANSPORT_ENCODINGS), choices=TRANSPORT_ENCODINGS)
+    args = parser.parse_args()
+
+    if args.input:
+        ingest_result, error = ingest_media(args.input)
+        if error:
+            sys.exit(f"ffmpeg failed: {error}")
+        pcm = ingest_result.pcm
+    else:
+        pcm = synthetic_speech_pcm(args.minutes * 60)
+    audio_seconds = len(pcm) / 32000
+    chunks = split_on_silence(pcm)
+    print(f"audio: {audio_seconds / 60:.1f} min, {len(chunks)} chunks, PCM {len(pcm) / 1e6:.1f} MB")
+
+    print(f"{'encoding':<9} {'payload MB':>10} {'ratio':>6} {'encode (s)':>10}")
+    for encoding in args.encodings:
+        start = time.perf_counter()
+        payload = sum(len(encode_pcm(pcm[begin * 2:end * 2], encoding)) for begin, end in chunks)
+        print(f"{encoding:<9} {payload / 1e6:>10.2f} {len(pcm) / payload:>6.1f} {time.perf_counter() - start:>10.2f}")
+
+    print(f"\n{'uplink':>7} {'encoding':<9} {'wall (s)':>9} {'sent MB':>8} {'words':>7} {'same shape':>10} {'same words':>10}")
+    for mbps in args.uplink_mbps:
+        baseline = None
+        for encoding in args.encodings:
+            # max_workers=1: อัปโหลดทีละ chunk เหมือนใช้ uplink เส้นเดียวกัน
+            client = FakeSpeechClient(latency=args.latency, upload_bytes_per_second=mbps * 1e6 / 8)
+            start = time.perf_counter()
+            result, error = transcribe_long_audio(client, pcm, config=build_recognition_config("th-TH", encoding=encoding), max_workers=1,
+                                                  caller=fake_stt_caller)
+            elapsed = time.perf_counter() - start
+            if error:
+                sys.exit(f"{encoding} failed: {error}")
+            baseline = baseline or result
+            print(f"{mbps:>5g}Mb {encoding:<9} {elapsed:>9.2f} {client.bytes_received / 1e6:>8.2f} {len(result['word_timestamps']):>7} "
+                  f"{str(result_shape(result) == result_shape(baseline)):>10} {str(result == baseline):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+วัดเวลาดึง thumbnail ณ เวลาของ feedback (ค่าเริ่มต้น 20 จุด) บนวิดีโอยาว เทียบ 3 แบบ
+- per-process: ffmpeg หนึ่ง process ต่อหนึ่งเวลา (-ss ก่อน -i)
+- batched: ThumbnailCache.get_many (ffmpeg process เดียว, -ss ก่อน -i ของทุก input)
+- cached: เรียก get_many ซ้ำกับไฟล์เดิม (ไม่รัน ffmpeg)
+และ output seek (-ss หลัง -i ซึ่งต้องถอดรหัสตั้งแต่ต้นไฟล์) สำหรับเวลาเดียวเป็นค่าอ้างอิง
+
+    python benchmarks/bench_thumbnails.py                          # สร้างวิดีโอทดสอบ 60 นาทีให้อัตโนมัติ
+    python benchmarks/bench_thumbnails.py --input lecture.mp4 --count 20
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from longsorn.ingest import ingest_media
+from longsorn.thumbnails import THUMBNAIL_WIDTH, ThumbnailCache, build_thumbnail_command
+
+
+def make_synthetic_video(path, seconds):
+    """วิดีโอ 1280x720 ที่มี keyframe ทุก 2 วินาที (ใกล้เคียงไฟล์จากกล้อง/โปรแกรมอัดจอ)"""
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+               "-f", "lavfi", "-i", f"testsrc=size=1280x720:rate=25:duration={seconds}",
+               "-f", "lavfi", "-i", f"sine=frequency=220:duration={seconds}",
+               "-c:v", "libx264", "-preset", "ultrafast", "-g", "50", "-c:a", "aac", "-shortest", path]
+    subprocess.run(command, check=True)
+
+
+def per_process(video_path, seconds_list, output_dir):
+    for seconds in seconds_list:
+        command = build_thumbnail_command(video_path, [seconds], output_dir)
+        subprocess.run(command, check=True, capture_output=True)
+
+
+def output_seek(video_path, seconds, output_dir):
+    command = ["ffmpeg", "-hide_banner", "-nostdin", "-loglevel", "error", "-y", "-i", video_path, "-ss", f"{seconds:.3f}",
+               "-frames:v", "1", "-vf", f"scale={THUMBNAIL_WIDTH}:-2", os.path.join(output_dir, "output_seek.jpg")]
+    subprocess.run(command, check=True, capture_output=True)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", help="วิดีโอที่ใช้ทดสอบ (ถ้าไม่ระบุจะสร้างวิดีโอสังเคราะห์)")
+    parser.add_argument("--minutes", type=float, default=60, help="ความยาววิดีโอสังเคราะห์")
+    parser.add_argument("--count", type=int, default=20, help="จำนวนเวลาที่ดึงภาพ")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="longsorn_thumbs_")
+    try:
+        video_path = args.input
+        if not video_path:
+            video_path = os.path.join(work_dir, "synthetic.mp4")
+            print(f"creating {args.minutes:g} min synthetic video...")
+            make_synthetic_video(video_path, int(args.minutes * 60))
+        result, error = ingest_media(video_path, trim_duration=1)
+        if error:
+            raise SystemExit(error)
+        duration = result.duration
+        # กระจายเวลาทั่วทั้งไฟล์แบบเดียวกับ feedback จริง (เวลาเต็มวินาทีจาก "m:ss")
+        seconds_list = [int(duration * (i + 0.5) / args.count) for i in range(args.count)]
+        print(f"{os.path.basename(video_path)}: {duration / 60:.1f} min, {args.count} timestamps")
+
+        per_process_dir = os.path.join(work_dir, "per_process")
+        os.makedirs(per_process_dir)
+        per_process_seconds, _ = timed(per_process, video_path, seconds_list, per_process_dir)
+
+        cache = ThumbnailCache(os.path.join(work_dir, "cache"))
+        batched_seconds, (thumbnails, error) = timed(cache.get_many, video_path, "bench", seconds_list)
+        if error:
+            raise SystemExit(error)
+        cached_seconds, _ = timed(cache.get_many, video_path, "bench", seconds_list)
+        output_seek_seconds, _ = timed(output_seek, video_path, seconds_list[-1], work_dir)
+
+        size = sum(os.path.getsize(path) for path in thumbnails.values())
+        print(f"{'per-process':<22} {per_process_seconds * 1000:>9.0f} ms  ({args.count} ffmpeg processes)")
+        print(f"{'batched':<22} {batched_seconds * 1000:>9.0f} ms  ({len(thumbnails)} frames, {size / 1024:.0f} KiB)")
+        print(f"{'cached':<22} {cached_seconds * 1000:>9.1f} ms")
+        print(f"{'output seek (1 frame)':<22} {output_seek_seconds * 1000:>9.0f} ms  (at {seconds_list[-1]}s)")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+วัดหน่วยความจำ (RSS) เมื่อมีหลาย session ถือไฟล์อัปโหลดอยู่พร้อมกัน
+legacy = เก็บ uploaded_file.getvalue() ไว้ใน session_state, store = เก็บลงดิสก์ด้วย UploadStore แล้วถือแค่ handle
+แล้วเปิดหน้าผลลัพธ์ทุก session: st.video(path) อ่านไฟล์เข้า MemoryMediaFileStorage ของ Streamlit
+store = ไม่ตั้ง base_url (เล่น inline เฉพาะไฟล์ไม่เกิน LONGSORN_MAX_INLINE_PLAYBACK_MB), store+url = ตั้ง LONGSORN_UPLOAD_BASE_URL
+
+    python benchmarks/bench_upload_memory.py --sessions 20 --mb 200
+    python benchmarks/bench_upload_memory.py --sessions 20 --mb 15
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def current_rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+
+def open_results_pages(mode, store, session_states, media_storage):
+    """เลียนแบบ st.video ของหน้าผลลัพธ์ คืนค่าจำนวน session ที่เล่นวิดีโอผ่านหน่วยความจำของ Streamlit"""
+    inline = 0
+    for state in session_states:
+        source = state["uploaded_file_content"] if mode == "legacy" else store.playback_source(state["upload"])
+        # URL ส่งให้เบราว์เซอร์โหลดจาก web server ตรงๆ, None = ไม่แสดงวิดีโอ
+        if isinstance(source, bytes) or (source and not source.startswith(("http://", "https://"))):
+            media_storage.load_and_get_id(source, "video/mp4", "media")
+            inline += 1
+    return inline
+
+
+def worker(mode, sessions, mb):
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+
+    from longsorn.uploads import UploadStore
+
+    media_storage = MemoryMediaFileStorage("/media")
+    store = None
+    if mode != "legacy":
+        store = UploadStore(root=tempfile.mkdtemp(prefix="longsorn_bench_uploads_"),
+                            base_url="http://localhost/uploads" if mode == "store+url" else "")
+    baseline = current_rss_mb()
+    session_states = []
+    start = time.perf_counter()
+    for i in range(sessions):
+        # Streamlit ถือ UploadedFile ไว้ระหว่าง rerun ที่อัปโหลด จากนั้นปล่อยทิ้ง
+        uploaded_file = io.BytesIO(os.urandom(1024) * (mb * 1024))
+        if mode == "legacy":
+            session_states.append({"uploaded_file_content": uploaded_file.getvalue()})
+        else:
+            session_states.append({"upload": store.save(f"session{i}", uploaded_file, "lecture.mp4")})
+        del uploaded_file
+    elapsed = time.perf_counter() - start
+    held_mb = current_rss_mb() - baseline
+    inline = open_results_pages(mode, store, session_states, media_storage)
+    print(json.dumps({"mode": mode, "held_mb": held_mb, "seconds": elapsed,
+                      "page_held_mb": current_rss_mb() - baseline, "inline": inline}))
+    if store:
+        for state in session_states:
+            store.discard(state["upload"])
+        os.rmdir(store.root)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--mb", type=int, default=100, help="ขนาดไฟล์ต่อ session (MB)")
+    parser.add_argument("--worker", choices=["legacy", "store", "store+url"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        worker(args.worker, args.sessions, args.mb)
+        return
+
+    print(f"{args.sessions} sessions x {args.mb} MB")
+    for mode in ("legacy", "store", "store+url"):
+        out = subprocess.run([sys.executable, __file__, "--worker", mode, "--sessions", str(args.sessions), "--mb", str(args.mb)],
+                             check=True, capture_output=True, text=True)
+        result = json.loads(out.stdout)
+        print(f"{mode:<9} RSS held after uploads: {result['held_mb']:>8.1f} MB   ({result['seconds']:.2f}s to store)   "
+              f"after results page: {result['page_held_mb']:>8.1f} MB   ({result['inline']}/{args.sessions} played inline)")
+
+
+if __name__ == "__main__":
+    main()
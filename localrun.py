@@ -1,222 +1,222 @@
 import streamlit as st
+import logging
 import os
-import json
-import requests
 from dotenv import load_dotenv
-from google.cloud import speech
-import google.generativeai as genai
 import time
-import pandas as pd
-import subprocess
-import tempfile
-from collections import Counter
+import uuid
+from dataclasses import asdict
+from datetime import datetime
+from longsorn.clients import get_gemini_model, get_speech_client, registry as client_registry
+from longsorn.ingest import DEFAULT_TRANSPORT_ENCODING, TRANSPORT_ENCODINGS, ingest_media
+from longsorn.history import AnalysisStore
+from longsorn.jobs import JOB_DONE, JOB_FAILED, JobExecutor
+from longsorn.language import AUTO, SUPPORTED_LANGUAGE_CODES
+from longsorn.phrase_index import parse_timestamp
+from longsorn.thumbnails import ThumbnailCache
+from longsorn.tracing import metrics
+from longsorn.transcript_cache import TranscriptCache
+from longsorn.uploads import UploadHandle, UploadStore
+
+JOB_POLL_SECONDS = 1.0
+LANGUAGE_LABELS = {AUTO: "ตรวจจากเสียงอัตโนมัติ", "th-TH": "ไทย (th-TH)", "en-US": "English (en-US)"}
+HISTORY_LIMIT = 200
+logger = logging.getLogger("longsorn.localrun")
 
 # --- Page Configuration & ENV Loading ---
 st.set_page_config(page_title="LongSorn AI Demo", page_icon="🖊️", layout="wide")
 load_dotenv()
 
-# --- โค้ดนักสืบ (เพิ่มตรงนี้) ---
-credential_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
-print(f"🕵️‍♂️ Path ที่อ่านได้จาก .env คือ: {credential_path}")
-
-if credential_path:
-    is_file_found = os.path.exists(credential_path)
-    print(f"🤔 ไฟล์นี้มีอยู่จริงไหม?: {is_file_found}")
-else:
-    print("❌ ไม่เจอตัวแปร GOOGLE_APPLICATION_CREDENTIALS เลย!")
-# --- จบโค้ดนักสืบ ---
-
 # --- Backend Functions (AI Calls) ---
-def get_audio_duration(file_path):
-    """ใช้ ffprobe เพื่อหาความยาวของไฟล์เสียง/วิดีโอ"""
-    command = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", file_path]
-    try:
-        result = subprocess.run(command, check=True, capture_output=True, text=True)
-        return float(result.stdout.strip())
-    except Exception as e:
-        st.warning(f"Could not get audio duration: {e}")
-        return 0
-
-def convert_audio_with_ffmpeg(input_bytes, suffix, trim_duration=None):
-    """ใช้ FFmpeg เพื่อแปลงไฟล์ที่รับเข้ามาให้เป็นรูปแบบ WAV และจำกัดความยาว"""
-    try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_in:
-            temp_in.write(input_bytes)
-            input_filename = temp_in.name
-        
-        output_filename = input_filename + ".wav"
-        command = ["ffmpeg", "-i", input_filename, "-acodec", "pcm_s16le", "-ar", "16000", "-ac", "1", "-y"]
-        if trim_duration:
-            command.extend(["-t", str(trim_duration)])
-        command.append(output_filename)
-
-        subprocess.run(command, check=True, capture_output=True, text=True)
-        
-        with open(output_filename, "rb") as f:
-            output_bytes = f.read()
-            
-        os.remove(input_filename)
-        os.remove(output_filename)
-        return output_bytes, None
-    except Exception as e:
-        st.error(f"FFmpeg Error: {e}")
-        return None, str(e)
-
-@st.cache_data
-def run_stt_transcription(audio_file_content, language_code="th-TH"):
-    """ฟังก์ชันสำหรับเรียกใช้ Google STT API จริง (สำหรับไฟล์สั้น < 1 นาที)"""
-    try:
-        client = speech.SpeechClient()
-        audio = speech.RecognitionAudio(content=audio_file_content)
-        config = speech.RecognitionConfig(
-            encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-            sample_rate_hertz=16000,
-            language_code=language_code,
-            enable_automatic_punctuation=True,
-            enable_word_time_offsets=True,
-        )
-        response = client.recognize(config=config, audio=audio)
-        return response, None
-    except Exception as e:
-        st.error(f"Google STT API Error: {e}")
-        return None, str(e)
-
-def find_timestamp_for_phrase(phrase, word_timestamps):
-    """ค้นหาเวลาเริ่มต้นของวลีจาก word_timestamps"""
-    clean_phrase = phrase.replace("...", "").strip()
-    words_in_phrase = clean_phrase.lower().split()
-    if not words_in_phrase: return "N/A"
-    for i in range(len(word_timestamps) - len(words_in_phrase) + 1):
-        match = True
-        for j in range(len(words_in_phrase)):
-            if word_timestamps[i+j]['Word'].lower() != words_in_phrase[j]:
-                match = False; break
-        if match:
-            start_seconds = float(word_timestamps[i]['Start (s)'])
-            minutes = int(start_seconds // 60); seconds = int(start_seconds % 60)
-            return f"{minutes:01d}:{seconds:02d}"
-    return "N/A"
-
-def run_real_nlp_analysis(transcript: str, word_timestamps: list, description: str, lang_code_for_stt: str):
+@st.cache_resource
+def check_credentials():
     """
-    ฟังก์ชันสำหรับเรียกใช้ Gemini วิเคราะห์ Transcript
-    (เวอร์ชัน 4 - Upgraded with Statistical Summary & Pause Analysis)
+    ตรวจ credentials ครั้งเดียวต่อ process (cache_resource: เรียกซ้ำจาก worker/Live session ได้ผลเดิมโดยไม่ตรวจใหม่)
+    คืนค่า True ถ้า GOOGLE_APPLICATION_CREDENTIALS ชี้ไปยังไฟล์ที่มีอยู่ ไม่เช่นนั้นบันทึก warning ผ่าน logging (ไม่แสดง path)
     """
-    context_prompt = f"User's context for this presentation: {description}\n\n" if description else ""
-    
-    # --- Pre-calculation of all statistics ---
-    word_count = len(word_timestamps)
-    duration_seconds = float(word_timestamps[-1]['End (s)']) if word_timestamps and float(word_timestamps[-1]['End (s)']) > 0 else 1.0
-    wpm = (word_count / duration_seconds) * 60 if duration_seconds > 0 else 0
-    detected_language = lang_code_for_stt.split('-')[0].lower()
-
-    # Filler word calculation
-    if "th" in detected_language:
-        fillers_list = ['เอ่อ', 'อ่า', 'คือ', 'แบบว่า', 'แบบ', 'ก็คือ', 'นะครับ', 'นะคะ', 'อะ', 'เอิ่ม', 'อืม']
-    else:
-        fillers_list = ['um', 'uh', 'er', 'ah', 'like', 'actually', 'basically', 'so', 'you know', 'i mean', 'right']
-    filler_word_count = sum(1 for word in transcript.lower().split() if word in fillers_list)
-
-    # NEW: Pause Analysis
-    long_pauses = 0
-    pause_threshold = 2.0  # วินาที
-    for i in range(1, len(word_timestamps)):
-        pause_duration = word_timestamps[i]['Start (s)'] - word_timestamps[i-1]['End (s)']
-        if pause_duration >= pause_threshold:
-            long_pauses += 1
-            
-    # --- Construct the Data Summary for the AI ---
-    data_summary = f"""
-    Here is a statistical summary of the speech delivery:
-    - Speaking Pace: {wpm:.0f} words per minute.
-    - Filler Words Count: {filler_word_count} times.
-    - Long Pauses (>{pause_threshold}s): {long_pauses} times.
+    credential_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
+    if not credential_path:
+        logger.warning("GOOGLE_APPLICATION_CREDENTIALS is not set; Google clients fall back to application default credentials")
+        return False
+    if not os.path.isfile(credential_path):
+        logger.warning("GOOGLE_APPLICATION_CREDENTIALS does not point to an existing file")
+        return False
+    logger.info("Google service account credentials found")
+    return True
+
+@st.cache_resource
+def get_upload_store():
+    """ที่เก็บไฟล์อัปโหลดบนดิสก์ (แยกโฟลเดอร์ต่อ session, ลบอัตโนมัติเมื่อหมดอายุ)"""
+    return UploadStore()
+
+@st.cache_resource
+def get_transcript_cache():
+    """Cache ผลถอดเสียงบนดิสก์ ใช้ร่วมกันทุก session ใน process"""
+    return TranscriptCache()
+
+@st.cache_resource
+def get_response_cache():
+    """Cache คำตอบของ Gemini บนดิสก์ วิเคราะห์ transcript เดิมซ้ำจะไม่เรียก Gemini อีก"""
+    from longsorn.response_cache import ResponseCache  # ใช้ NumPy: import เมื่อเริ่มวิเคราะห์
+    return ResponseCache()
+
+@st.cache_resource
+def get_thumbnail_cache():
+    """ภาพตัวอย่างของวิดีโอ ณ เวลาของ feedback เก็บตาม hash ของไฟล์"""
+    return ThumbnailCache()
+
+@st.cache_resource
+def get_analysis_store():
+    """ประวัติผลวิเคราะห์ของผู้สอน (SQLite) ใช้ดูความก้าวหน้าข้ามหลาย session"""
+    return AnalysisStore()
+
+@st.cache_resource
+def get_job_executor():
+    """Worker pool เบื้องหลังที่รัน pipeline (ใช้ร่วมกันทุก session) งานที่ไฟล์และคำอธิบายเหมือนกันจะถูกรวมเป็นงานเดียว"""
+    check_credentials()
+    gemini_api_key = os.getenv("GOOGLE_GEMINI_API_KEY")
+    transcript_cache = get_transcript_cache()
+    response_cache = get_response_cache()
+    thumbnail_cache = get_thumbnail_cache()
+
+    def handle_job(job, progress, on_event):
+        # pipeline (NumPy และ SDK ของ Google) ถูก import ตอนเริ่มวิเคราะห์งานแรก ไม่ใช่ตอนเปิดหน้าเว็บ
+        from longsorn.pipeline import run_pipeline
+        return run_pipeline(job.payload["upload"]["path"], job.payload["description"],
+                            lambda: get_speech_client(), lambda: get_gemini_model(gemini_api_key),
+                            transcript_cache, progress=progress, on_event=on_event,
+                            encoding=job.payload.get("encoding", DEFAULT_TRANSPORT_ENCODING),
+                            output_mode=job.payload.get("output_mode", "text"), response_cache=response_cache,
+                            thumbnail_cache=thumbnail_cache, file_hash=job.payload["upload"]["sha256"], language=job.payload.get("language", AUTO))
+
+    return JobExecutor(handle_job)
+
+def reset_session():
+    """กลับไปหน้าอัปโหลด โดยคง ?debug และ Teacher ID ใน URL ไว้"""
+    kept = {key: st.query_params[key] for key in ("debug", "teacher") if key in st.query_params}
+    st.session_state.clear(); st.query_params.clear()
+    st.query_params.update(kept)
+    st.rerun()
+
+def render_feedback_event(event):
+    """แสดง feedback แต่ละรายการทันทีระหว่างที่ Gemini ยังตอบไม่จบ"""
+    kind, payload = event
+    if kind == "clarity":
+        st.metric("Clarity Score", f"{payload['score']:.1f} / 10", help=payload['justification'])
+    elif kind == "recommendation":
+        with st.container(border=True):
+            r1_col1, r1_col2 = st.columns([1, 4])
+            with r1_col1: st.write(f"**{payload['timestamp']}**")
+            with r1_col2: st.write(f"**{payload['type']}**")
+            st.info(f"**Suggestion:** {payload['suggestion']}")
+    elif kind == "keywords":
+        st.write("**Main Keywords:** " + ", ".join(payload))
+
+def render_live_page():
     """
-
-    # --- Create the new "Smarter" Prompt ---
-    gemini_feedback = "Not available"
-    try:
-        genai.configure(api_key=os.getenv("GOOGLE_GEMINI_API_KEY"))
-        model = genai.GenerativeModel('gemini-1.5-flash')
-
-        # NEW: The prompt now instructs the AI to use the data summary
-        smarter_prompt = f"""
-        {context_prompt}
-        You are an expert speech coach reviewing a presentation. Your analysis MUST be based on BOTH the provided statistical summary and the full transcript.
-
-        {data_summary}
-
-        Based on ALL the information above (statistics and transcript), perform the following analysis:
-
-        1. Overall Clarity Score (1-10): Provide a score and a justification that REFERENCES the statistical data. For example, if the pace is too fast or there are many pauses, mention it as a reason for a lower score.
-        - A clear, competent speaker should score 7-8. Reserve scores below 5 for speakers who are genuinely hard to follow.
-        Use this exact format:
-        Clarity: [Your Score] | Justification: [Your brief reason for the score, referencing the statistics]
-
-        2. Key Improvement Suggestions: Identify up to 5 specific phrases or moments from the transcript that could be improved.
-        Use this exact format, with each entry on a new line:
-        ORIGINAL: [original phrase] | REASON: [reason for improvement] | SUGGESTION: [suggested alternative]
-
-        3. Main Keywords: Extract up to 5 main keywords or topics.
-        Use this exact format:
-        KEYWORDS: [keyword1, keyword2, keyword3]
-        """
-        
-        full_prompt = f"{smarter_prompt}\n\nFull Transcript:\n\"\"\"\n{transcript}\n\"\"\""
-        
-        response = model.generate_content(full_prompt)
-        gemini_feedback = response.text
-    except Exception as e:
-        st.warning(f"Could not connect to Gemini API: {e}")
-
-    # --- Parsing the results (mostly the same) ---
-    clarity = 0.0
-    clarity_justification = "N/A"
-    keywords = []
-    timeline_feedback = []
-    ai_recommendations = []
-    
-    if wpm < 60: pace = "Very Slow"
-    elif wpm < 100: pace = "Relaxed Pace"
-    elif wpm <= 140: pace = "Good Conversational Pace"
-    elif wpm <= 180: pace = "Energetic Pace"
-    else: pace = "Very Fast"
-
-    for line in gemini_feedback.splitlines():
-        if "Clarity:" in line and "Justification:" in line:
-            try:
-                parts = line.split('|'); clarity_str = parts[0].replace("Clarity:", "").strip(); clarity = float(clarity_str)
-                clarity_justification = parts[1].replace("Justification:", "").strip()
-            except:
-                clarity = 0.0; clarity_justification = "Could not parse score."
-        elif "KEYWORDS:" in line:
-            keywords_str = line.split("KEYWORDS:")[1].strip().replace('[', '').replace(']', ''); keywords = [k.strip() for k in keywords_str.split(',') if k.strip()]
-        elif "ORIGINAL:" in line:
-            parts = [p.strip() for p in line.split('|')]
-            if len(parts) == 3:
-                original = parts[0].replace("ORIGINAL:", "").strip(); reason = parts[1].replace("REASON:", "").strip(); suggestion = parts[2].replace("SUGGESTION:", "").strip()
-                ai_recommendations.append({"original": original, "suggestion": suggestion})
-                timestamp = find_timestamp_for_phrase(original, word_timestamps)
-                timeline_feedback.append({"timestamp": timestamp, "type": reason, "suggestion": suggestion})
-
-    return {
-        "speech_analysis": {
-            "Filler Words Detected": filler_word_count, "Speaking Pace": pace, "Clarity Score": clarity,
-            "Clarity Justification": clarity_justification, "Long Pauses": long_pauses
-        },
-        "keywords": keywords, "timeline_feedback": timeline_feedback, "ai_recommendations": ai_recommendations
-    }
+    โหมด Live coaching: ส่งเสียงเข้า streaming recognition และอัปเดตสถิติทุกครั้งที่ได้ผล final
+    เสียงที่อัด/เลือกมาจบแล้วจึงส่งเร็วที่สุด (speed=None) ไม่ต้องรอเล่นซ้ำตามความยาวคลิป
+    """
+    with st.container(border=True):
+        st.header("Live Coaching (ทดลอง)")
+        st.caption("อัดเสียงจากไมโครโฟนหรือเลือกไฟล์ ระบบจะส่งเสียงเข้า Speech-to-Text แบบ streaming และแสดงสถิติทีละช่วงที่ถอดเสียงเสร็จ")
+        language_code = st.radio("ภาษา", ["th-TH", "en-US"], horizontal=True)
+        recorded = st.audio_input("อัดเสียงจากไมโครโฟน")
+        uploaded = st.file_uploader("หรือเลือกไฟล์เสียง/วิดีโอ", type=["mp4", "mov", "mp3", "wav", "m4a"])
+        source = recorded or uploaded
+        if not source or not st.button("Start Live Session", type="primary", use_container_width=True):
+            return
+        from longsorn.live import LiveStats, iter_pcm_frames, run_live_session
+
+        ingest_result, ffmpeg_error = ingest_media(source.getvalue())
+        if ffmpeg_error:
+            st.error(f"FFmpeg Error: {ffmpeg_error}")
+            return
+        interim_box = st.empty()
+        stats_box = st.empty()
+
+        def show_stats(stats):
+            snapshot = stats.snapshot()
+            with stats_box.container():
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Speaking Pace", snapshot["pace"], f"{snapshot['current_wpm']:.0f} WPM", delta_color="off")
+                col2.metric("Filler Words", f"{snapshot['filler_word_count']} times")
+                col3.metric("Long Pauses (>2s)", f"{snapshot['long_pauses']} times")
+                st.write(" ".join(word for word, _, _ in list(stats.timeline)[-40:]))
+
+        check_credentials()
+        stats = LiveStats(language_code.split("-")[0])
+        try:
+            run_live_session(get_speech_client(), iter_pcm_frames(ingest_result.pcm, speed=None), language_code, stats,
+                             on_update=show_stats, on_interim=lambda text: interim_box.caption(f"🎙️ {text}"))
+        except Exception as e:
+            st.error(f"Google STT API Error: {e}")
+            return
+        interim_box.empty()
+        show_stats(stats)
+        st.success("จบ Live session")
+
+def render_history_page(teacher_id):
+    """แนวโน้ม WPM / filler words ต่อนาที / clarity และประวัติการวิเคราะห์ทั้งหมดของผู้สอน"""
+    with st.container(border=True):
+        st.header("ความก้าวหน้าของผู้สอน")
+        if not teacher_id:
+            st.info("ใส่ Teacher ID ที่แถบด้านซ้าย ผลการวิเคราะห์ครั้งต่อไปจะถูกบันทึกไว้ดูย้อนหลังที่หน้านี้")
+            return
+        store = get_analysis_store()
+        history = store.history(teacher_id, limit=HISTORY_LIMIT)
+        if not history:
+            st.info(f"ยังไม่มีผลการวิเคราะห์ที่บันทึกด้วย Teacher ID **{teacher_id}**")
+            return
+        buckets = {"ทุกครั้ง": None, "รายสัปดาห์": "week", "รายเดือน": "month"}
+        bucket = buckets[st.radio("รวมผล", list(buckets), horizontal=True)]
+        columns = st.columns(3)
+        for column, metric, label in zip(columns, ("wpm", "filler_per_minute", "clarity"), ("WPM", "Filler Words / min", "Clarity Score")):
+            points = [point for point in store.trend(teacher_id, metric, bucket) if point["value"] is not None]
+            with column:
+                st.write(f"**{label}**")
+                st.line_chart({"date": [datetime.fromtimestamp(point["start"]) for point in points], label: [point["value"] for point in points]},
+                              x="date", height=200)
+
+        st.subheader(f"ประวัติการวิเคราะห์ ({len(history)} ครั้งล่าสุด)")
+        st.dataframe([
+            {"date": datetime.fromtimestamp(row["created_at"]), "file": row["file_name"], "WPM": row["wpm"], "pace": row["pace"],
+             "filler words": row["filler_count"], "long pauses": row["long_pauses"], "clarity": row["clarity"]}
+            for row in history
+        ], use_container_width=True)
 
 # --- Main UI and Processing Logic ---
 st.title("🖊️ LongSorn AI Demo")
 st.caption("เครื่องมือสาธิตการทำงานของ AI รีวิวการสอนที่มี UI ใกล้เคียงกับผลิตภัณฑ์จริง")
 st.divider()
 
+# Teacher ID อยู่ใน URL ด้วย: refresh หรือกด Analyze Another แล้วไม่ต้องกรอกใหม่
+teacher_id = st.sidebar.text_input("Teacher ID", value=st.query_params.get("teacher", ""), help="ใช้บันทึกผลการวิเคราะห์ไว้ดูความก้าวหน้าย้อนหลัง").strip()
+if teacher_id:
+    st.query_params["teacher"] = teacher_id
+elif "teacher" in st.query_params:
+    del st.query_params["teacher"]
+
+mode = st.sidebar.radio("โหมด", ["วิเคราะห์ไฟล์", "Live Coaching", "ความก้าวหน้า"])
+if mode == "Live Coaching":
+    render_live_page()
+    st.stop()
+if mode == "ความก้าวหน้า":
+    render_history_page(teacher_id)
+    st.stop()
+
+# Refresh หน้าเว็บจะได้ session ใหม่ ใช้ job id ใน URL เพื่อกลับไปติดตามงานเดิม
+if 'job_id' not in st.session_state and 'job' in st.query_params:
+    restored_job = get_job_executor().get(st.query_params["job"])
+    if restored_job is not None:
+        st.session_state.job_id = restored_job.id
+        st.session_state.upload = UploadHandle(**restored_job.payload["upload"])
+        st.session_state.analysis_triggered = True
+
 if 'results_ready' in st.session_state and st.session_state.results_ready:
     # --- UI: แสดงหน้าผลลัพธ์ ---
     st.header("AI Analysis Results")
-    if st.session_state.get("is_trimmed", False):
-        st.warning("⚠️ ไฟล์ของคุณมีความยาวเกิน 1 นาที ระบบได้ทำการวิเคราะห์เฉพาะ 60 วินาทีแรกเท่านั้น หากต้องการวิเคราะห์ไฟล์เต็ม กรุณาอัปเกรดแพ็กเกจ")
+    for warning in st.session_state.nlp_results.get("warnings", []):
+        st.warning(warning)
 
     nlp_res = st.session_state.nlp_results
     
@@ -224,16 +224,51 @@ if 'results_ready' in st.session_state and st.session_state.results_ready:
 
     with left_col:
         st.subheader("Video Playback")
-        st.video(st.session_state.uploaded_file_content)
+        upload = st.session_state.upload
+        playback = None
+        if upload.exists():
+            get_upload_store().touch(upload)
+            playback = get_upload_store().playback_source(upload)
+            if playback:
+                # กด "เล่นจากตรงนี้" ที่การ์ด feedback แล้ววิดีโอจะเริ่มที่เวลานั้น
+                st.video(playback, start_time=st.session_state.get("video_start", 0))
+            else:
+                st.info(f"ไฟล์ขนาด {upload.size / (1024 * 1024):.0f} MB ใหญ่เกินกว่าจะเล่นในหน้านี้ "
+                        "(ตั้ง LONGSORN_UPLOAD_BASE_URL เพื่อให้ web server ส่งวิดีโอแทน) ผลการวิเคราะห์ยังแสดงได้ตามปกติ")
+        else:
+            st.warning("ไฟล์วิดีโอหมดอายุแล้ว (ถูกลบจากเซิร์ฟเวอร์) แต่ผลการวิเคราะห์ยังแสดงได้ตามปกติ")
         
         st.subheader("Timeline Feedback")
         if nlp_res["timeline_feedback"]:
-            for feedback in nlp_res["timeline_feedback"]:
+            thumbnails = nlp_res.get("thumbnails", {})
+            for index, feedback in enumerate(nlp_res["timeline_feedback"]):
                 with st.container(border=True):
                     r1_col1, r1_col2 = st.columns([1, 4])
-                    with r1_col1: st.write(f"**{feedback['timestamp']}**")
+                    with r1_col1:
+                        st.write(f"**{feedback['timestamp']}**")
+                        thumbnail = thumbnails.get(feedback["timestamp"])
+                        if thumbnail and os.path.exists(thumbnail): st.image(thumbnail, use_container_width=True)
                     with r1_col2: st.write(f"**{feedback['type']}**")
                     st.info(f"**Suggestion:** {feedback['suggestion']}")
+                    start_seconds = parse_timestamp(feedback["timestamp"])
+                    if start_seconds is not None and playback and st.button(f"▶ เล่นจาก {feedback['timestamp']}", key=f"seek_{index}"):
+                        st.session_state.video_start = start_seconds
+                        st.rerun()
+
+        # --- เส้นกราฟ pitch / ความดัง / อัตราพูด จากเสียงโดยตรง (ต่อวินาที) ---
+        speech_features = nlp_res.get("speech_features")
+        if speech_features and speech_features["timeline"]:
+            st.subheader("Delivery Timeline")
+            timeline = speech_features["timeline"]
+            seconds = [row["start"] for row in timeline]
+            pitch_tab, volume_tab, rate_tab = st.tabs(["Pitch", "Volume", "Speaking Rate"])
+            with pitch_tab: st.line_chart({"time (s)": seconds, "pitch (Hz)": [row["pitch_hz"] for row in timeline]}, x="time (s)", height=200)
+            with volume_tab: st.line_chart({"time (s)": seconds, "volume (dB)": [row["energy_db"] for row in timeline]}, x="time (s)", height=200)
+            with rate_tab: st.line_chart({"time (s)": seconds, "syllables/s": [row["syllable_rate"] for row in timeline]}, x="time (s)", height=200)
+            summary = speech_features["summary"]
+            if summary["pitch_variability_semitones"] is not None:
+                st.caption(f"Pitch เฉลี่ย {summary['mean_pitch_hz']:.0f} Hz · ความแปรผันของเสียงสูงต่ำ {summary['pitch_variability_semitones']:.1f} semitones"
+                           f" · {summary['syllables_per_second']:.1f} พยางค์/วินาที")
 
     with right_col:
         st.subheader("Speech Analysis")
@@ -260,63 +295,70 @@ if 'results_ready' in st.session_state and st.session_state.results_ready:
                     st.success(f"**Suggestion:** \"_{rec['suggestion']}_\"")
                     st.divider()
 
-    if st.button("Analyze Another"): st.session_state.clear(); st.rerun()
+    language = nlp_res.get("language")
+    if language and language["source"] == "detected":
+        st.caption(f"🌐 ภาษาที่ตรวจจากเสียง: {LANGUAGE_LABELS.get(language['language_code'], language['language_code'])}"
+                   f" (ใช้เวลา {language['detect_seconds']:.1f}s จากเสียง {language['sampled_seconds']:.0f}s)")
+    elif language and language["source"] == "cache":
+        st.caption(f"🌐 ภาษา: {LANGUAGE_LABELS.get(language['language_code'], language['language_code'])} (ตรวจจากไฟล์นี้ไว้แล้ว)")
+    vad = nlp_res.get("vad")
+    if vad and vad["saved_seconds"] >= 1:
+        st.caption(f"ตัดช่วงเงียบก่อนถอดเสียง: ส่ง STT {vad['sent_seconds']:.0f}s จาก {vad['original_seconds']:.0f}s (ประหยัด {vad['saved_seconds']:.0f}s)")
+    timings = nlp_res.get("timings", {})
+    if timings.get("response_cache") in ("exact", "near"):
+        st.caption(f"♻️ ใช้ผลวิเคราะห์ของ Gemini จาก cache ({'transcript ที่คล้ายกัน' if timings['response_cache'] == 'near' else 'transcript เดียวกัน'})"
+                   f" · hit ratio {get_response_cache().stats()['hit_ratio']:.0%}")
+    elif "total_s" in timings:
+        st.caption(f"Gemini: first token {timings.get('ttfb_s', 0):.1f}s · first feedback {timings.get('first_feedback_s', 0):.1f}s · total {timings['total_s']:.1f}s"
+                   f" · {timings.get('llm_calls', 0)} calls ({timings.get('parse_failures', 0)} parse failures)")
+
+    # --- Debug panel (เปิดด้วย ?debug=1 ใน URL) ---
+    if st.query_params.get("debug") == "1":
+        with st.expander("🔧 Pipeline trace & metrics", expanded=False):
+            trace = nlp_res.get("trace", {})
+            st.caption(f"trace_id: {trace.get('trace_id', 'N/A')}")
+            st.dataframe([
+                {"stage": span["name"], "duration (ms)": round(span["duration"] * 1000, 1), "error": span["error"] or "",
+                 **{key: str(value) for key, value in span["attributes"].items()}}
+                for span in trace.get("spans", [])
+            ], use_container_width=True)
+            from longsorn.resilience import call_stats  # อ่าน LONGSORN_*_QPS หลัง load_dotenv
+            st.json({"transcript_cache": get_transcript_cache().stats(), "response_cache": get_response_cache().stats(), "thumbnails": get_thumbnail_cache().stats(), "clients": client_registry.stats(), "api_calls": call_stats()}, expanded=False)
+            st.code(metrics.to_prometheus(), language="text")
+
+    if st.button("Analyze Another"):
+        get_upload_store().discard(st.session_state.upload)
+        reset_session()
 
 elif 'analysis_triggered' in st.session_state and st.session_state.analysis_triggered:
     # --- UI: แสดงหน้ากำลังประมวลผล ---
     with st.container(border=True):
         st.subheader("กำลังประมวลผล...")
-        progress_bar = st.progress(0, text="Starting...")
-        
-        progress_bar.progress(10, text="กำลังตรวจสอบและแปลงไฟล์เสียง...")
-        file_suffix = os.path.splitext(st.session_state.file_name)[1]
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_suffix) as temp_in:
-            temp_in.write(st.session_state.uploaded_file_content); input_filename = temp_in.name
-        
-        duration = get_audio_duration(input_filename)
-        is_trimmed = duration > 60
-        st.session_state.is_trimmed = is_trimmed
-        os.remove(input_filename)
-
-        trim_duration = 60 if is_trimmed else None
-        if is_trimmed: progress_bar.progress(20, text="ไฟล์ยาวเกิน 1 นาที กำลังตัดให้เหลือ 60 วินาที...")
-        
-        converted_audio, ffmpeg_error = convert_audio_with_ffmpeg(st.session_state.uploaded_file_content, file_suffix, trim_duration)
-        if ffmpeg_error: st.error(f"FFmpeg Error: {ffmpeg_error}"); st.stop()
-        
-        # --- Language Detection Step ---
-        progress_bar.progress(30, text="กำลังตรวจสอบภาษา...")
-        # A simple heuristic for language detection
-        lang_code_for_stt = "th-TH" # Default to Thai
-        if st.session_state.get("user_description", "").lower().strip() == "english":
-            lang_code_for_stt = "en-US"
-
-        progress_bar.progress(40, text=f"กำลังแปลงเสียงเป็นข้อความ... ({lang_code_for_stt})...")
-        stt_response, stt_error = run_stt_transcription(converted_audio, lang_code_for_stt)
-        if stt_error: st.error(f"STT Error: {stt_error}"); st.stop()
-        
-        full_transcript = " ".join([res.alternatives[0].transcript for res in stt_response.results if res.alternatives])
-        # --- NEW: Add this check for empty transcript ---
-        if not full_transcript.strip():
-            st.error("Error: ไม่สามารถตรวจจับคำพูดใดๆ ในไฟล์เสียงได้ กรุณาตรวจสอบไฟล์แล้วลองอีกครั้ง")
-            st.stop() # Stop the execution
-        word_timestamps = []
-        for result in stt_response.results:
-            for word_info in result.alternatives[0].words:
-                word_timestamps.append({
-                    "Word": word_info.word,
-                    "Start (s)": word_info.start_time.total_seconds(),
-                    "End (s)": word_info.end_time.total_seconds()
-                })
-        st.session_state.word_timestamps_df = pd.DataFrame(word_timestamps)
-
-        progress_bar.progress(70, text="กำลังวิเคราะห์ด้วยโมเดลภาษา...")
-        nlp_results = run_real_nlp_analysis(full_transcript, word_timestamps, st.session_state.get("user_description", ""), lang_code_for_stt)
-        st.session_state.nlp_results = nlp_results
-        
-        progress_bar.progress(100, text="การวิเคราะห์เสร็จสิ้น!")
-        time.sleep(1)
+        job = get_job_executor().get(st.session_state.job_id)
+        if job is None:
+            st.error("ไม่พบงานวิเคราะห์นี้ (อาจหมดอายุแล้ว) กรุณาอัปโหลดไฟล์อีกครั้ง")
+            if st.button("Start Over"): reset_session()
+            st.stop()
+        progress_bar = st.progress(job.progress, text=job.message or "Starting...")
+
+        # feedback ที่ Gemini ส่งมาแล้วระหว่างที่งานยังไม่เสร็จ
+        for event in job.events:
+            render_feedback_event(event)
+
+        if job.status == JOB_FAILED:
+            st.error(job.error)
+            if st.button("Start Over"): reset_session()
+            st.stop()
+        if job.status != JOB_DONE:
+            time.sleep(JOB_POLL_SECONDS)
+            st.rerun()
+
+        st.session_state.nlp_results = job.result
+        if teacher_id:
+            # บันทึกครั้งเดียวต่อ (ผู้สอน, job) refresh แล้วกลับมาที่งานเดิมจะไม่เกิดประวัติซ้ำ
+            upload = st.session_state.upload
+            get_analysis_store().add(teacher_id, upload.sha256, job.result, job_id=job.id, file_name=upload.file_name,
+                                     description=job.payload["description"])
         
         st.session_state.analysis_triggered = False
         st.session_state.results_ready = True
@@ -327,15 +369,36 @@ else:
     with st.container(border=True):
         st.header("Upload Your Content")
         st.subheader("Provide context for AI")
-        st.text_area("บอก AI ว่าการสอนนี้เกี่ยวกับอะไร หรืออยากให้เน้นเรื่องไหนเป็นพิเศษ (หากเป็นภาษาอังกฤษ ให้พิมพ์ 'english' ที่นี่)", key="user_description", placeholder="e.g. นี่คือการสอนเรื่องการตลาดสำหรับผู้เริ่มต้น, ช่วยวิเคราะห์การใช้ศัพท์เทคนิค")
+        st.text_area("บอก AI ว่าการสอนนี้เกี่ยวกับอะไร หรืออยากให้เน้นเรื่องไหนเป็นพิเศษ", key="user_description", placeholder="e.g. นี่คือการสอนเรื่องการตลาดสำหรับผู้เริ่มต้น, ช่วยวิเคราะห์การใช้ศัพท์เทคนิค")
         
         st.subheader("Upload your file")
         uploaded_file = st.file_uploader("Click to upload or drag and drop", type=["mp4", "mov", "mp3", "wav", "m4a"], label_visibility="collapsed")
+        with st.expander("ตัวเลือกขั้นสูง"):
+            st.selectbox("ภาษาของการสอน", [AUTO, *SUPPORTED_LANGUAGE_CODES], format_func=LANGUAGE_LABELS.get, key="stt_language",
+                         help="อัตโนมัติ: ถอดเสียงช่วงสั้น ๆ 3 ช่วงเพื่อเลือกภาษาก่อนถอดเสียงทั้งไฟล์ (จำผลไว้ตามไฟล์) · เลือกเองเพื่อข้ามขั้นตอนนี้")
+            st.selectbox("รูปแบบเสียงที่ส่งไป Speech-to-Text", TRANSPORT_ENCODINGS, index=TRANSPORT_ENCODINGS.index(DEFAULT_TRANSPORT_ENCODING), key="stt_encoding",
+                         help="FLAC: ไฟล์เล็กกว่าและผลเหมือนเดิม (lossless) · OGG_OPUS: เล็กที่สุดแต่บีบอัดแบบสูญเสียข้อมูล · LINEAR16: ไม่บีบอัด")
+            st.radio("รูปแบบคำตอบของ Gemini", ["text", "json"], horizontal=True, key="output_mode",
+                     help="text: แสดงคำแนะนำทีละบรรทัดระหว่างที่ Gemini ตอบ (streaming) · json: ตอบตาม schema และตรวจสอบก่อนใช้ "
+                          "เรียกซ้ำเฉพาะช่วงที่ผิดรูปแบบ แต่แสดงผลเมื่อทุกช่วงเสร็จแล้ว")
 
         if uploaded_file:
             st.info(f"Selected File: **{uploaded_file.name}**")
             if st.button("Upload & Analyze", type="primary", use_container_width=True):
                 st.session_state.analysis_triggered = True
-                st.session_state.uploaded_file_content = uploaded_file.getvalue()
+                # เก็บไฟล์ลงดิสก์ทีละ chunk แล้วเก็บแค่ handle ไว้ใน session_state
+                session_id = st.session_state.setdefault("upload_session_id", uuid.uuid4().hex)
+                upload = get_upload_store().save(session_id, uploaded_file, uploaded_file.name)
+                st.session_state.upload = upload
                 st.session_state.file_name = uploaded_file.name
+                description = st.session_state.get("user_description", "")
+                encoding = st.session_state.get("stt_encoding", DEFAULT_TRANSPORT_ENCODING)
+                output_mode = st.session_state.get("output_mode", "text")
+                language = st.session_state.get("stt_language", AUTO)
+                job = get_job_executor().submit(session_id, upload.sha256,
+                                                {"upload": asdict(upload), "description": description, "encoding": encoding, "output_mode": output_mode,
+                                                 "language": language},
+                                                description=description, encoding=encoding, output_mode=output_mode, language=language)
+                st.session_state.job_id = job.id
+                st.query_params["job"] = job.id
                 st.rerun()
@@ -0,0 +1 @@
+"""Backend ของ LongSorn AI Demo (ส่วนที่ไม่ขึ้นกับ Streamlit UI)"""
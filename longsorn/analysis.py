@@ -0,0 +1,463 @@
+"""การวิเคราะห์ transcript ด้วย Gemini: สร้าง prompt, อ่านผลแบบ streaming หรือ JSON ตาม schema และแปลงเป็นผลลัพธ์ที่ UI ใช้"""
+import json
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from longsorn.phrase_index import PhraseIndex, find_timestamp_for_phrase, format_timestamp
+from longsorn.resilience import gemini_caller as shared_gemini_caller
+from longsorn.timeline import WordTimeline, compute_delivery_stats
+
+
+def build_data_summary(wpm, filler_word_count, pause_threshold, long_pauses):
+    data_summary = f"""
+    Here is a statistical summary of the speech delivery:
+    - Speaking Pace: {wpm:.0f} words per minute.
+    - Filler Words Count: {filler_word_count} times.
+    - Long Pauses (>{pause_threshold}s): {long_pauses} times.
+    """
+    return data_summary
+
+
+def build_analysis_prompt(transcript, description, data_summary):
+    context_prompt = f"User's context for this presentation: {description}\n\n" if description else ""
+
+    # NEW: The prompt now instructs the AI to use the data summary
+    smarter_prompt = f"""
+        {context_prompt}
+        You are an expert speech coach reviewing a presentation. Your analysis MUST be based on BOTH the provided statistical summary and the full transcript.
+
+        {data_summary}
+
+        Based on ALL the information above (statistics and transcript), perform the following analysis:
+
+        1. Overall Clarity Score (1-10): Provide a score and a justification that REFERENCES the statistical data. For example, if the pace is too fast or there are many pauses, mention it as a reason for a lower score.
+        - A clear, competent speaker should score 7-8. Reserve scores below 5 for speakers who are genuinely hard to follow.
+        Use this exact format:
+        Clarity: [Your Score] | Justification: [Your brief reason for the score, referencing the statistics]
+
+        2. Key Improvement Suggestions: Identify up to 5 specific phrases or moments from the transcript that could be improved.
+        Use this exact format, with each entry on a new line:
+        ORIGINAL: [original phrase] | REASON: [reason for improvement] | SUGGESTION: [suggested alternative]
+
+        3. Main Keywords: Extract up to 5 main keywords or topics.
+        Use this exact format:
+        KEYWORDS: [keyword1, keyword2, keyword3]
+        """
+
+    full_prompt = f"{smarter_prompt}\n\nFull Transcript:\n\"\"\"\n{transcript}\n\"\"\""
+    return full_prompt
+
+
+def classify_pace(wpm):
+    if wpm < 60: pace = "Very Slow"
+    elif wpm < 100: pace = "Relaxed Pace"
+    elif wpm <= 140: pace = "Good Conversational Pace"
+    elif wpm <= 180: pace = "Energetic Pace"
+    else: pace = "Very Fast"
+    return pace
+
+
+def new_analysis_results(delivery_stats):
+    """ผลลัพธ์ตั้งต้น (ก่อนได้ feedback จาก Gemini) ในรูปแบบเดียวกับที่หน้า Results ใช้"""
+    return {
+        "speech_analysis": {
+            "Filler Words Detected": delivery_stats["filler_word_count"], "Speaking Pace": classify_pace(delivery_stats["wpm"]),
+            "Clarity Score": 0.0, "Clarity Justification": "N/A", "Long Pauses": delivery_stats["long_pauses"]
+        },
+        "keywords": [], "timeline_feedback": [], "ai_recommendations": [],
+        "pace_timeline": delivery_stats["pace_windows"],
+        "delivery_stats": {key: delivery_stats[key] for key in ("word_count", "duration_seconds", "wpm", "filler_word_count", "long_pauses", "longest_pause")}
+    }
+
+
+def parse_feedback_line(line, phrase_index):
+    """แปลงหนึ่งบรรทัดของคำตอบ Gemini เป็น event: ("clarity" | "keywords" | "recommendation", payload) หรือ None"""
+    if "Clarity:" in line and "Justification:" in line:
+        try:
+            parts = line.split('|'); clarity = float(parts[0].replace("Clarity:", "").strip())
+            clarity_justification = parts[1].replace("Justification:", "").strip()
+        except (ValueError, IndexError):
+            clarity = 0.0; clarity_justification = "Could not parse score."
+        return "clarity", {"score": clarity, "justification": clarity_justification}
+    if "KEYWORDS:" in line:
+        keywords_str = line.split("KEYWORDS:")[1].strip().replace('[', '').replace(']', '')
+        return "keywords", [k.strip() for k in keywords_str.split(',') if k.strip()]
+    if "ORIGINAL:" in line:
+        parts = [p.strip() for p in line.split('|')]
+        if len(parts) == 3:
+            original = parts[0].replace("ORIGINAL:", "").strip(); reason = parts[1].replace("REASON:", "").strip(); suggestion = parts[2].replace("SUGGESTION:", "").strip()
+            timestamp = find_timestamp_for_phrase(original, phrase_index)
+            return "recommendation", {"timestamp": timestamp, "type": reason, "original": original, "suggestion": suggestion}
+    return None
+
+
+def apply_feedback_event(results, event):
+    kind, payload = event
+    if kind == "clarity":
+        results["speech_analysis"]["Clarity Score"] = payload["score"]
+        results["speech_analysis"]["Clarity Justification"] = payload["justification"]
+    elif kind == "keywords":
+        results["keywords"] = payload
+    elif kind == "recommendation":
+        results["ai_recommendations"].append({"original": payload["original"], "suggestion": payload["suggestion"]})
+        results["timeline_feedback"].append({"timestamp": payload["timestamp"], "type": payload["type"], "suggestion": payload["suggestion"]})
+
+
+def record_token_usage(timings, response):
+    """เก็บจำนวน token จาก usage_metadata (chunk สุดท้ายของ stream มีค่ารวมทั้งคำตอบ)"""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        timings["prompt_tokens"] = getattr(usage, "prompt_token_count", 0) or 0
+        timings["output_tokens"] = getattr(usage, "candidates_token_count", 0) or 0
+
+
+def record_parse_result(timings, ok):
+    """นับจำนวนการเรียก LLM และจำนวนคำตอบที่ parse ไม่ผ่าน (parse_failure_rate = parse_failures / llm_calls)"""
+    timings["llm_calls"] = timings.get("llm_calls", 0) + 1
+    timings["parse_failures"] = timings.get("parse_failures", 0) + (0 if ok else 1)
+    timings["parse_failure_rate"] = timings["parse_failures"] / timings["llm_calls"]
+
+
+def iter_complete_lines(text_chunks):
+    """รวม chunk ข้อความที่ stream มา แล้วคืนทีละบรรทัดทันทีที่บรรทัดนั้นจบ"""
+    buffer = ""
+    for text in text_chunks:
+        buffer += text
+        *lines, buffer = buffer.split("\n")
+        yield from lines
+    if buffer:
+        yield buffer
+
+
+def stream_feedback_events(model, full_prompt, phrase_index, timings=None, caller=None):
+    """
+    เรียก Gemini แบบ stream=True แล้ว yield event ทันทีที่แต่ละบรรทัดสมบูรณ์
+    timings (dict) จะถูกเติม ttfb_s (chunk แรก), first_feedback_s (event แรก) และ total_s
+    caller: ResilientCaller ที่ใช้เรียก (None = gemini_caller ที่ใช้ร่วมกันทั้ง process)
+    """
+    timings = {} if timings is None else timings
+    caller = shared_gemini_caller if caller is None else caller
+    start = time.perf_counter()
+
+    def chunk_texts():
+        for chunk in caller.call_stream(model.generate_content, full_prompt, stream=True, stats=timings):
+            timings.setdefault("ttfb_s", time.perf_counter() - start)
+            record_token_usage(timings, chunk)
+            yield chunk.text
+
+    events = []
+    try:
+        for line in iter_complete_lines(chunk_texts()):
+            event = parse_feedback_line(line, phrase_index)
+            if event is not None:
+                timings.setdefault("first_feedback_s", time.perf_counter() - start)
+                events.append(event)
+                yield event
+        record_parse_result(timings, has_clarity_score(events))
+    finally:
+        timings["total_s"] = time.perf_counter() - start
+
+
+# --- Map-reduce สำหรับ transcript ยาว ---
+SECTION_SECONDS = 300.0
+# transcript สั้นกว่านี้ใช้การเรียก Gemini ครั้งเดียวแบบ streaming
+SECTIONED_MIN_SECONDS = 600.0
+DEFAULT_SECTION_WORKERS = 4
+# คำแนะนำรวมทั้งไฟล์ไม่เกินเท่านี้ แบ่งโควตาให้ทุกช่วงเท่า ๆ กัน (อย่างน้อยช่วงละ 1) เพื่อให้ครอบคลุมทั้งไฟล์
+MAX_TOTAL_SUGGESTIONS = 12
+
+
+def split_sections(word_timestamps, section_seconds=SECTION_SECONDS):
+    """แบ่ง word_timestamps เป็นช่วงเวลาละ section_seconds คืนค่า list ของ (start_index, end_index)"""
+    sections = []
+    start = 0
+    for i, word in enumerate(word_timestamps):
+        if word["Start (s)"] - word_timestamps[start]["Start (s)"] >= section_seconds:
+            sections.append((start, i))
+            start = i
+    if start < len(word_timestamps):
+        sections.append((start, len(word_timestamps)))
+    return sections
+
+
+def _section_label(words):
+    return f"{format_timestamp(words[0]['Start (s)'])}–{format_timestamp(words[-1]['End (s)'])}"
+
+
+def build_section_prompt(words, description, lang_code_for_stt, section_number, section_count, prompt_builder=build_analysis_prompt):
+    """prompt ของหนึ่งช่วง: สถิติเฉพาะช่วงและหมายเหตุว่าเป็นช่วงไหนของไฟล์"""
+    stats = compute_delivery_stats(WordTimeline.from_word_timestamps(words), lang_code_for_stt.split('-')[0].lower())
+    data_summary = build_data_summary(stats["wpm"], stats["filler_word_count"], stats["pause_threshold"], stats["long_pauses"])
+    section_note = f"This is section {section_number} of {section_count} ({_section_label(words)}) of a longer presentation."
+    section_description = f"{description} {section_note}" if description else section_note
+    transcript = " ".join(w["Word"] for w in words)
+    return prompt_builder(transcript, section_description, data_summary)
+
+
+def has_clarity_score(events):
+    """คำตอบที่อ่านคะแนน clarity ไม่ได้ถือว่า parse ไม่สำเร็จ"""
+    return any(kind == "clarity" and payload["score"] > 0 for kind, payload in events)
+
+
+def analyze_section(model, words, description, lang_code_for_stt, section_number, section_count, stats=None, caller=None):
+    """
+    วิเคราะห์หนึ่งช่วง: สถิติเฉพาะช่วง + prompt เดิม คืนค่า (list ของ event, จำนวน token)
+    timestamp ของคำแนะนำอ้างอิงคำในช่วงนี้เท่านั้น
+    """
+    caller = shared_gemini_caller if caller is None else caller
+    response = caller.call(model.generate_content, build_section_prompt(words, description, lang_code_for_stt, section_number, section_count),
+                           stats=stats)
+    usage = {}
+    record_token_usage(usage, response)
+    phrase_index = PhraseIndex(words)
+    events = [parse_feedback_line(line, phrase_index) for line in response.text.splitlines()]
+    return [event for event in events if event is not None], usage
+
+
+def _suggestion_key(payload):
+    return " ".join(payload["original"].lower().split())
+
+
+class SuggestionLimiter:
+    """
+    กรองคำแนะนำจากหลายช่วง: ตัดคำแนะนำที่ original ซ้ำกับที่แสดงไปแล้ว และจำกัดจำนวนต่อช่วงและทั้งไฟล์
+    ช่วงเดียวกัน Gemini เรียงคำแนะนำที่สำคัญไว้ก่อน จึงเก็บลำดับต้นของแต่ละช่วง
+    """
+
+    def __init__(self, section_count, max_total=MAX_TOTAL_SUGGESTIONS):
+        self.max_total = max_total
+        self.per_section = max(1, max_total // max(1, section_count))
+        self.seen = set()
+
+    def select(self, events):
+        """คืนค่า event คำแนะนำของหนึ่งช่วงที่ผ่านการกรอง (ตามลำดับเดิม)"""
+        selected = []
+        for kind, payload in events:
+            if kind != "recommendation" or len(self.seen) >= self.max_total or len(selected) >= self.per_section:
+                continue
+            key = _suggestion_key(payload)
+            if key in self.seen:
+                continue
+            self.seen.add(key)
+            selected.append((kind, payload))
+        return selected
+
+
+def merge_section_events(section_events, section_sizes, max_keywords=5):
+    """
+    รวมผลของทุกช่วง: clarity เฉลี่ยถ่วงด้วยจำนวนคำ (ไม่นับช่วงที่อ่านคะแนนไม่ได้), keywords เรียงตามจำนวนช่วงที่พบ
+    คืนค่า event ("clarity", ...) และ ("keywords", ...) ของทั้งไฟล์
+    """
+    weighted, weights, justifications = 0.0, 0, []
+    keyword_counts = Counter()
+    for events, size in zip(section_events, section_sizes):
+        for kind, payload in events:
+            if kind == "clarity" and payload["score"] > 0:
+                weighted += payload["score"] * size; weights += size
+                justifications.append(payload["justification"])
+            elif kind == "keywords":
+                keyword_counts.update(dict.fromkeys(payload, 1))
+    clarity = {"score": round(weighted / weights, 1) if weights else 0.0,
+               "justification": " / ".join(justifications) if justifications else "Could not parse score."}
+    return [("clarity", clarity), ("keywords", [k for k, _ in keyword_counts.most_common(max_keywords)])]
+
+
+def sectioned_feedback_events(model, word_timestamps, description, lang_code_for_stt, timings=None,
+                              section_seconds=SECTION_SECONDS, max_workers=DEFAULT_SECTION_WORKERS, caller=None):
+    """
+    Map-reduce: วิเคราะห์แต่ละช่วงพร้อมกัน (thread pool จำกัดจำนวน) แล้ว yield คำแนะนำของแต่ละช่วงตามลำดับเวลา
+    (ไม่ซ้ำกันและรวมไม่เกิน MAX_TOTAL_SUGGESTIONS) ช่วงที่ล้มเหลวจะถูกข้ามไป ส่วน clarity/keywords ของทั้งไฟล์ yield ตอนท้าย
+    """
+    timings = {} if timings is None else timings
+    start = time.perf_counter()
+    sections = [word_timestamps[a:b] for a, b in split_sections(word_timestamps, section_seconds)]
+    timings["sections"] = len(sections)
+    suggestions = SuggestionLimiter(len(sections))
+
+    def run(numbered):
+        number, words = numbered
+        try:
+            events, usage = analyze_section(model, words, description, lang_code_for_stt, number, len(sections), timings, caller)
+            return events, usage, None
+        except Exception as e:
+            return [], {}, str(e)
+
+    section_events = []
+    section_errors = []
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sections)))) as executor:
+            for events, usage, error in executor.map(run, enumerate(sections, start=1)):
+                timings.setdefault("ttfb_s", time.perf_counter() - start)
+                for name, count in usage.items():
+                    timings[name] = timings.get(name, 0) + count
+                if error:
+                    section_errors.append(error)
+                else:
+                    record_parse_result(timings, has_clarity_score(events))
+                section_events.append(events)
+                for event in suggestions.select(events):
+                    timings.setdefault("first_feedback_s", time.perf_counter() - start)
+                    yield event
+        timings["failed_sections"] = len(section_errors)
+        if section_errors and len(section_errors) == len(sections):
+            raise RuntimeError(section_errors[0])
+        yield from merge_section_events(section_events, [len(words) for words in sections])
+    finally:
+        timings["total_s"] = time.perf_counter() - start
+
+
+# --- Structured output: ขอคำตอบเป็น JSON ตาม schema แล้ว decode + ตรวจสอบครั้งเดียว ---
+OUTPUT_MODES = ("text", "json")
+# text แสดงคำแนะนำระหว่างที่ Gemini ตอบ ส่วน json แสดงได้เมื่อทุกช่วงตรวจผ่านแล้วเท่านั้น
+DEFAULT_OUTPUT_MODE = "text"
+# เปลี่ยนเลขเมื่อแก้ prompt หรือ schema เพื่อไม่ให้ใช้คำตอบเก่าจาก response cache
+PROMPT_VERSIONS = {"text": "text-6", "json": "json-2"}
+STRUCTURED_MAX_RETRIES = 2
+MAX_SUGGESTIONS = 5
+
+FEEDBACK_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "clarity_score": {"type": "number"},
+        "clarity_justification": {"type": "string"},
+        "suggestions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"original": {"type": "string"}, "reason": {"type": "string"}, "suggestion": {"type": "string"}},
+                "required": ["original", "reason", "suggestion"],
+            },
+        },
+        "keywords": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["clarity_score", "clarity_justification", "suggestions", "keywords"],
+}
+JSON_GENERATION_CONFIG = {"response_mime_type": "application/json", "response_schema": FEEDBACK_SCHEMA}
+
+
+class FeedbackValidationError(ValueError):
+    """คำตอบ JSON ของ Gemini ไม่ตรงกับ FEEDBACK_SCHEMA"""
+
+
+def build_structured_prompt(transcript, description, data_summary):
+    """prompt เดียวกับ build_analysis_prompt แต่ให้ตอบเป็น JSON ตาม FEEDBACK_SCHEMA แทนรูปแบบบรรทัด"""
+    context_prompt = f"User's context for this presentation: {description}\n\n" if description else ""
+    structured_prompt = f"""
+        {context_prompt}
+        You are an expert speech coach reviewing a presentation. Your analysis MUST be based on BOTH the provided statistical summary and the full transcript.
+
+        {data_summary}
+
+        Based on ALL the information above (statistics and transcript), return a JSON object with:
+        - "clarity_score": Overall Clarity Score (1-10). A clear, competent speaker should score 7-8. Reserve scores below 5 for speakers who are genuinely hard to follow.
+        - "clarity_justification": a brief reason for the score that REFERENCES the statistical data.
+        - "suggestions": up to {MAX_SUGGESTIONS} specific phrases or moments that could be improved, each with "original" (the phrase copied exactly from the transcript), "reason" and "suggestion".
+        - "keywords": up to 5 main keywords or topics.
+        """
+    return f"{structured_prompt}\n\nFull Transcript:\n\"\"\"\n{transcript}\n\"\"\""
+
+
+def _require(condition, message):
+    if not condition:
+        raise FeedbackValidationError(message)
+
+
+def parse_structured_feedback(text, phrase_index):
+    """decode JSON ครั้งเดียวแล้วตรวจตาม FEEDBACK_SCHEMA คืนค่า list ของ event เหมือน parse_feedback_line"""
+    try:
+        data = json.loads(text)
+    except (TypeError, json.JSONDecodeError) as e:
+        raise FeedbackValidationError(f"invalid JSON: {e}") from e
+    _require(isinstance(data, dict), "response is not a JSON object")
+    score = data.get("clarity_score")
+    _require(isinstance(score, (int, float)) and not isinstance(score, bool) and 1 <= score <= 10, f"clarity_score out of range: {score!r}")
+    _require(isinstance(data.get("clarity_justification"), str), "clarity_justification is not a string")
+    suggestions, keywords = data.get("suggestions"), data.get("keywords")
+    _require(isinstance(suggestions, list), "suggestions is not a list")
+    _require(isinstance(keywords, list) and all(isinstance(k, str) for k in keywords), "keywords is not a list of strings")
+    for item in suggestions:
+        _require(isinstance(item, dict) and all(isinstance(item.get(key), str) for key in ("original", "reason", "suggestion")),
+                 f"invalid suggestion: {item!r}")
+
+    events = [("clarity", {"score": float(score), "justification": data["clarity_justification"].strip()})]
+    for item in suggestions[:MAX_SUGGESTIONS]:
+        original = item["original"].strip()
+        events.append(("recommendation", {"timestamp": find_timestamp_for_phrase(original, phrase_index), "type": item["reason"].strip(),
+                                          "original": original, "suggestion": item["suggestion"].strip()}))
+    events.append(("keywords", [k.strip() for k in keywords if k.strip()][:5]))
+    return events
+
+
+def structured_feedback_events(model, word_timestamps, description, lang_code_for_stt, timings=None, transcript=None, data_summary=None,
+                               section_seconds=SECTION_SECONDS, max_workers=DEFAULT_SECTION_WORKERS, max_retries=STRUCTURED_MAX_RETRIES, caller=None):
+    """
+    JSON mode: ถ้าส่ง transcript และ data_summary มาจะเรียก Gemini ครั้งเดียวทั้งไฟล์ ไม่งั้นแบ่งช่วงแบบ map-reduce
+    ช่วงที่ JSON ไม่ผ่านการตรวจสอบจะถูกเรียกซ้ำเฉพาะช่วงนั้น (ไม่เกิน max_retries รอบ)
+    yield คำแนะนำตามลำดับช่วงเมื่อทุกช่วงเสร็จ (กรองด้วย SuggestionLimiter) แล้วตามด้วย clarity/keywords ของทั้งไฟล์
+    """
+    timings = {} if timings is None else timings
+    caller = shared_gemini_caller if caller is None else caller
+    start = time.perf_counter()
+    if transcript is not None:
+        sections = [word_timestamps]
+        prompts = [build_structured_prompt(transcript, description, data_summary)]
+    else:
+        sections = [word_timestamps[a:b] for a, b in split_sections(word_timestamps, section_seconds)]
+        prompts = [build_section_prompt(words, description, lang_code_for_stt, number, len(sections), build_structured_prompt)
+                   for number, words in enumerate(sections, start=1)]
+    timings["sections"] = len(sections)
+
+    def run(index):
+        """คืนค่า (index, events, usage, error, responded) โดย responded=False เมื่อเรียก API ไม่สำเร็จ"""
+        try:
+            response = caller.call(model.generate_content, prompts[index], generation_config=JSON_GENERATION_CONFIG, stats=timings)
+        except Exception as e:
+            return index, None, {}, str(e), False
+        usage = {}
+        record_token_usage(usage, response)
+        try:
+            return index, parse_structured_feedback(response.text, PhraseIndex(sections[index])), usage, None, True
+        except FeedbackValidationError as e:
+            return index, None, usage, str(e), True
+
+    section_events = [None] * len(sections)
+    errors = {}
+    invalid = set()
+    pending = list(range(len(sections)))
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sections)))) as executor:
+            for attempt in range(max_retries + 1):
+                if attempt:
+                    timings["retried_sections"] = timings.get("retried_sections", 0) + len(pending)
+                for index, events, usage, error, responded in executor.map(run, pending):
+                    timings.setdefault("ttfb_s", time.perf_counter() - start)
+                    for name, count in usage.items():
+                        timings[name] = timings.get(name, 0) + count
+                    if responded:
+                        record_parse_result(timings, events is not None)
+                    if error:
+                        errors[index] = error
+                    else:
+                        errors.pop(index, None)
+                        section_events[index] = events
+                    if error and responded:
+                        invalid.add(index)
+                    else:
+                        invalid.discard(index)
+                # เรียกซ้ำเฉพาะช่วงที่ได้คำตอบแต่ไม่ผ่าน schema (ช่วงที่ API ล้มเหลวไม่นับ)
+                pending = sorted(invalid)
+                if not pending:
+                    break
+
+        timings["failed_sections"] = len(errors)
+        if len(errors) == len(sections):
+            raise RuntimeError(next(iter(errors.values())))
+        suggestions = SuggestionLimiter(len(sections))
+        for events in section_events:
+            for event in suggestions.select(events or []):
+                timings.setdefault("first_feedback_s", time.perf_counter() - start)
+                yield event
+        yield from merge_section_events([events or [] for events in section_events], [len(words) for words in sections])
+    finally:
+        timings["total_s"] = time.perf_counter() - start
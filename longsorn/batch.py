@@ -0,0 +1,283 @@
+"""
+วิเคราะห์ไฟล์การสอนจำนวนมากแบบ headless (ไม่ต้องผ่านหน้า Streamlit)
+
+    python -m longsorn.batch recordings/ --output results.jsonl
+    python -m longsorn.batch manifest.csv --output results.jsonl --parquet results.parquet
+    python -m longsorn.batch recordings/ --output results.jsonl --fake      # ทดลองแบบ offline
+
+input เป็นโฟลเดอร์ (หาไฟล์เสียง/วิดีโอทุกชั้น) หรือ manifest (.csv / .jsonl ที่มีคอลัมน์ path และ description ถ้ามี)
+ffmpeg รันใน process pool ส่วนการเรียก STT/Gemini รันใน thread pool, ผลแต่ละไฟล์ต่อท้าย JSONL ทันทีที่เสร็จ
+รันซ้ำด้วย --output เดิมจะข้ามไฟล์ที่วิเคราะห์สำเร็จแล้ว (เทียบจาก SHA-256 ของไฟล์และพารามิเตอร์)
+--user บันทึกผลที่สำเร็จลงประวัติของผู้สอนคนนั้น (longsorn.history) ครั้งละหลายไฟล์ใน transaction เดียว
+credentials อ่านจาก GOOGLE_APPLICATION_CREDENTIALS และ GOOGLE_GEMINI_API_KEY (หรือไฟล์ .env)
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from longsorn.analysis import DEFAULT_OUTPUT_MODE, OUTPUT_MODES
+from longsorn.history import AnalysisStore
+from longsorn.ingest import ingest_media
+from longsorn.jobs import job_key
+from longsorn.language import AUTO, SUPPORTED_LANGUAGE_CODES
+from longsorn.pipeline import run_pipeline
+from longsorn.response_cache import ResponseCache
+from longsorn.stt import DEFAULT_TRANSPORT_ENCODING, TRANSPORT_ENCODINGS
+from longsorn.transcript_cache import TranscriptCache, audio_fingerprint
+
+MEDIA_EXTENSIONS = (".mp4", ".mov", ".mp3", ".wav", ".m4a")
+DEFAULT_API_WORKERS = 4
+HISTORY_FLUSH_SIZE = 50  # จำนวนผลที่รวมเขียนลงประวัติต่อหนึ่ง transaction
+
+
+def discover_inputs(target, description=""):
+    """รายการ {"path", "description"} จากโฟลเดอร์หรือ manifest (path ใน manifest อ้างอิงจากโฟลเดอร์ของ manifest)"""
+    if os.path.isdir(target):
+        paths = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(target)
+            for name in names if name.lower().endswith(MEDIA_EXTENSIONS)
+        )
+        return [{"path": path, "description": description} for path in paths]
+
+    with open(target, encoding="utf-8", newline="") as f:
+        if target.lower().endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+    base = os.path.dirname(os.path.abspath(target))
+    return [{"path": os.path.join(base, row["path"]), "description": row.get("description") or description} for row in rows]
+
+
+def load_completed(output_path):
+    """key ของไฟล์ที่วิเคราะห์สำเร็จแล้วใน output เดิม"""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # บรรทัดสุดท้ายที่เขียนไม่เสร็จตอนโปรแกรมถูกหยุด
+            if record.get("status") == "ok":
+                completed.add(record["key"])
+    return completed
+
+
+def file_sha256(path):
+    with open(path, "rb") as f:
+        return audio_fingerprint(f)
+
+
+def build_record(item, nlp_results, error, audio_seconds, elapsed):
+    record = {
+        "key": item["key"],
+        "path": item["path"],
+        "file_sha256": item["sha256"],
+        "description": item["description"],
+        "encoding": item["encoding"],
+        "output_mode": item["output_mode"],
+        "language": item["language"],
+        "status": "error" if error else "ok",
+        "error": error,
+        "audio_seconds": audio_seconds,
+        "elapsed_seconds": elapsed,
+    }
+    if nlp_results:
+        stt_span = next((span for span in nlp_results["trace"]["spans"] if span["name"] == "stt"), None)
+        record.update({
+            "language_code": stt_span["attributes"].get("language_code") if stt_span else None,
+            "language_detection": nlp_results.get("language"),
+            **{key.lower().replace(" ", "_"): value for key, value in nlp_results["speech_analysis"].items()},
+            "keywords": nlp_results["keywords"],
+            "timeline_feedback": nlp_results["timeline_feedback"],
+            "ai_recommendations": nlp_results["ai_recommendations"],
+            "pace_timeline": nlp_results.get("pace_timeline", []),
+            "vad": nlp_results.get("vad"),
+            "speech_features": nlp_results.get("speech_features", {}).get("summary"),
+            "warnings": nlp_results["warnings"],
+            "timings": nlp_results["timings"],
+            "trace_id": nlp_results["trace"]["trace_id"],
+        })
+    return record
+
+
+def write_parquet(jsonl_path, parquet_path):
+    """แปลง JSONL ทั้งไฟล์เป็น Parquet (ต้องมี pandas + pyarrow) เก็บเฉพาะผลล่าสุดของแต่ละ key"""
+    import pandas as pd
+
+    frame = pd.read_json(jsonl_path, lines=True, dtype=False)
+    frame = frame.drop_duplicates("key", keep="last")
+    # column ที่เป็น dict/list ซ้อนกันหลายชั้นเก็บเป็น JSON string ให้อ่านได้ทุกเครื่องมือ
+    for column in ("timeline_feedback", "ai_recommendations", "pace_timeline", "vad", "speech_features", "language_detection", "timings"):
+        if column in frame:
+            frame[column] = frame[column].map(lambda value: json.dumps(value, ensure_ascii=False))
+    frame.to_parquet(parquet_path, index=False)
+
+
+class BatchRunner:
+    """ส่งไฟล์เข้า process pool (ffmpeg) แล้วต่อด้วย thread pool (STT + Gemini) โดยจำกัดจำนวน PCM ที่ค้างในหน่วยความจำ"""
+
+    def __init__(self, speech_client_factory, model_factory, output_path, ffmpeg_workers=None, api_workers=DEFAULT_API_WORKERS,
+                 transcript_cache=None, encoding=DEFAULT_TRANSPORT_ENCODING, output_mode=DEFAULT_OUTPUT_MODE, log=print,
+                 response_cache=None, analysis_store=None, user_id=None, language=AUTO, stt_caller=None, gemini_caller=None):
+        self.speech_client_factory = speech_client_factory
+        self.model_factory = model_factory
+        self.output_path = output_path
+        self.ffmpeg_workers = ffmpeg_workers or os.cpu_count() or 1
+        self.api_workers = api_workers
+        self.transcript_cache = transcript_cache
+        self.encoding = encoding
+        self.output_mode = output_mode
+        self.language = language
+        self.response_cache = response_cache
+        self.analysis_store = analysis_store
+        self.user_id = user_id
+        self.log = log
+        self.stt_caller = stt_caller
+        self.gemini_caller = gemini_caller
+        self._write_lock = threading.Lock()
+        self._history_pending = []
+
+    def _analyze(self, item, ingest_result):
+        start = time.perf_counter()
+        nlp_results, error = run_pipeline(ingest_result, item["description"], self.speech_client_factory, self.model_factory,
+                                          self.transcript_cache, encoding=self.encoding, output_mode=self.output_mode,
+                                          response_cache=self.response_cache, language=self.language,
+                                          stt_caller=self.stt_caller, gemini_caller=self.gemini_caller)
+        return nlp_results, error, time.perf_counter() - start
+
+    def _write(self, record):
+        with self._write_lock, open(self.output_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    def run(self, items):
+        """วิเคราะห์ทุกไฟล์ใน items ที่ยังไม่อยู่ใน output คืนค่าสรุป throughput"""
+        started = time.perf_counter()
+        completed = load_completed(self.output_path)
+        with ThreadPoolExecutor(max_workers=self.api_workers) as api_pool:
+            for item, sha256 in zip(items, api_pool.map(file_sha256, [item["path"] for item in items])):
+                item.update(sha256=sha256, encoding=self.encoding, output_mode=self.output_mode, language=self.language,
+                            key=job_key(sha256, description=item["description"], encoding=self.encoding, output_mode=self.output_mode,
+                                        language=self.language))
+        pending = [item for item in items if item["key"] not in completed]
+        summary = {"files": len(items), "skipped": len(items) - len(pending), "ok": 0, "failed": 0,
+                   "audio_seconds": 0.0, "ffmpeg_seconds": 0.0, "api_seconds": 0.0}
+        self.log(f"{len(items)} files, {summary['skipped']} already done, {len(pending)} to analyze")
+
+        # ffmpeg ทำล่วงหน้าได้ไม่เกิน max_ahead ไฟล์ เพื่อไม่ให้ PCM ของทั้งโฟลเดอร์ค้างในหน่วยความจำ
+        max_ahead = self.ffmpeg_workers + self.api_workers
+        queue = list(reversed(pending))
+        with ProcessPoolExecutor(max_workers=self.ffmpeg_workers) as ffmpeg_pool, \
+                ThreadPoolExecutor(max_workers=self.api_workers) as api_pool:
+            ingesting, analyzing = {}, {}
+            while queue or ingesting or analyzing:
+                while queue and len(ingesting) + len(analyzing) < max_ahead:
+                    item = queue.pop()
+                    ingesting[ffmpeg_pool.submit(ingest_media, item["path"])] = (item, time.perf_counter())
+                done, _ = wait([*ingesting, *analyzing], return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in ingesting:
+                        item, submitted = ingesting.pop(future)
+                        summary["ffmpeg_seconds"] += time.perf_counter() - submitted
+                        ingest_result, ffmpeg_error = future.result()
+                        if ffmpeg_error:
+                            self._finish(item, None, f"FFmpeg Error: {ffmpeg_error}", 0.0, 0.0, summary)
+                        else:
+                            analyzing[api_pool.submit(self._analyze, item, ingest_result)] = (item, ingest_result.duration)
+                    else:
+                        item, audio_seconds = analyzing.pop(future)
+                        try:
+                            nlp_results, error, elapsed = future.result()
+                        except Exception as e:
+                            nlp_results, error, elapsed = None, str(e), 0.0
+                        summary["api_seconds"] += elapsed
+                        self._finish(item, nlp_results, error, audio_seconds, elapsed, summary)
+        self._flush_history()
+
+        summary["wall_seconds"] = time.perf_counter() - started
+        processed = summary["ok"] + summary["failed"]
+        summary["files_per_minute"] = processed / summary["wall_seconds"] * 60 if processed else 0.0
+        summary["audio_seconds_per_second"] = summary["audio_seconds"] / summary["wall_seconds"]
+        return summary
+
+    def _finish(self, item, nlp_results, error, audio_seconds, elapsed, summary):
+        self._write(build_record(item, nlp_results, error, audio_seconds, elapsed))
+        summary["failed" if error else "ok"] += 1
+        if self.analysis_store is not None and not error:
+            self._history_pending.append((self.user_id, item["sha256"], nlp_results,
+                                          {"job_id": item["key"], "file_name": os.path.basename(item["path"]), "description": item["description"]}))
+            if len(self._history_pending) >= HISTORY_FLUSH_SIZE:
+                self._flush_history()
+        summary["audio_seconds"] += audio_seconds
+        done = summary["ok"] + summary["failed"]
+        self.log(f"[{done}/{summary['files'] - summary['skipped']}] {'FAILED' if error else 'ok'} "
+                 f"{os.path.basename(item['path'])} ({audio_seconds / 60:.1f} min audio, {elapsed:.1f}s)" + (f": {error}" if error else ""))
+
+    def _flush_history(self):
+        if self._history_pending:
+            self.analysis_store.add_many(self._history_pending)
+            self._history_pending = []
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m longsorn.batch", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="โฟลเดอร์ไฟล์เสียง/วิดีโอ หรือ manifest .csv/.jsonl")
+    parser.add_argument("--output", required=True, help="ไฟล์ JSONL สำหรับผลลัพธ์ (ใช้ต่อจากรอบก่อนได้)")
+    parser.add_argument("--parquet", help="เขียนผลทั้งหมดเป็น Parquet เพิ่มเมื่อรันเสร็จ")
+    parser.add_argument("--description", default="", help="คำอธิบายสำหรับไฟล์ที่ manifest ไม่ได้ระบุ")
+    parser.add_argument("--language", default=AUTO, choices=(AUTO, *SUPPORTED_LANGUAGE_CODES), help="ภาษาของการสอน (auto = ตรวจจากเสียงของแต่ละไฟล์)")
+    parser.add_argument("--ffmpeg-workers", type=int, default=None, help="จำนวน process สำหรับ ffmpeg (ค่าเริ่มต้น = จำนวน CPU)")
+    parser.add_argument("--api-workers", type=int, default=DEFAULT_API_WORKERS, help="จำนวนไฟล์ที่เรียก STT/Gemini พร้อมกัน")
+    parser.add_argument("--encoding", default=DEFAULT_TRANSPORT_ENCODING, choices=TRANSPORT_ENCODINGS)
+    parser.add_argument("--output-mode", default=DEFAULT_OUTPUT_MODE, choices=OUTPUT_MODES, help="รูปแบบคำตอบของ Gemini")
+    parser.add_argument("--no-cache", action="store_true", help="ไม่ใช้ transcript cache และ response cache บนดิสก์")
+    parser.add_argument("--user", help="Teacher ID: บันทึกผลที่สำเร็จลงประวัติของผู้สอนคนนี้ (ดูได้ในหน้าความก้าวหน้า)")
+    parser.add_argument("--history-db", help="ไฟล์ SQLite ของประวัติ (ค่าเริ่มต้น LONGSORN_HISTORY_DB หรือ ~/.cache/longsorn/history.sqlite3)")
+    parser.add_argument("--fake", action="store_true", help="ใช้ fake STT/Gemini (offline, ไม่ต้องมี credentials)")
+    args = parser.parse_args(argv)
+
+    items = discover_inputs(args.input, args.description)
+    if not items:
+        sys.exit(f"ไม่พบไฟล์เสียง/วิดีโอใน {args.input}")
+
+    if args.fake:
+        from longsorn.fakes import FakeGenerativeModel, FakeSpeechClient, fake_gemini_caller, fake_stt_caller
+        speech_client, model = FakeSpeechClient(), FakeGenerativeModel()
+        speech_client_factory, model_factory = (lambda: speech_client), (lambda: model)
+        callers = {"stt_caller": fake_stt_caller, "gemini_caller": fake_gemini_caller}
+    else:
+        from longsorn.clients import get_gemini_model, get_speech_client
+        try:
+            from dotenv import load_dotenv
+            load_dotenv()
+        except ImportError:
+            pass
+        gemini_api_key = os.getenv("GOOGLE_GEMINI_API_KEY")
+        speech_client_factory, model_factory = get_speech_client, (lambda: get_gemini_model(gemini_api_key))
+        callers = {}
+
+    runner = BatchRunner(speech_client_factory, model_factory, args.output, args.ffmpeg_workers, args.api_workers,
+                         None if args.no_cache else TranscriptCache(), args.encoding, args.output_mode,
+                         log=lambda message: print(message, file=sys.stderr, flush=True),
+                         response_cache=None if args.no_cache else ResponseCache(),
+                         analysis_store=AnalysisStore(args.history_db) if args.user else None, user_id=args.user, language=args.language, **callers)
+    summary = runner.run(items)
+    if args.parquet:
+        write_parquet(args.output, args.parquet)
+
+    print(f"\n{summary['ok']} ok, {summary['failed']} failed, {summary['skipped']} skipped "
+          f"in {summary['wall_seconds']:.1f}s: {summary['files_per_minute']:.1f} files/min, "
+          f"{summary['audio_seconds'] / 3600:.2f} h audio ({summary['audio_seconds_per_second']:.0f} audio-s/s)")
+    print(json.dumps(summary))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
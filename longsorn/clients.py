@@ -0,0 +1,145 @@
+"""Registry ของ client (Speech-to-Text / Gemini) ที่สร้างครั้งเดียวแล้วใช้ซ้ำทั้ง process"""
+import hashlib
+import json
+import threading
+import time
+
+# สร้าง client ใหม่เป็นระยะ เพื่อรับ credentials ที่ถูก rotate (token ภายในถูก refresh อัตโนมัติอยู่แล้ว)
+DEFAULT_MAX_AGE_SECONDS = 6 * 60 * 60
+# client ที่ถูกแทนที่อาจยังถูกใช้อยู่ใน request ที่ค้าง (เช่นถอดเสียงไฟล์ยาว) จึงปิดหลังพ้นช่วงนี้
+DEFAULT_RETIRED_GRACE_SECONDS = 30 * 60
+GEMINI_MODEL_NAME = "gemini-1.5-flash"
+
+
+def _fingerprint(value):
+    if value is None:
+        return "default"
+    if not isinstance(value, str):
+        value = json.dumps(dict(value), sort_keys=True)
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:16]
+
+
+def build_speech_client(credentials_info=None):
+    """credentials_info: JSON ของ service account (str หรือ dict) ถ้าเป็น None จะใช้ default credentials"""
+    from google.cloud import speech
+    if credentials_info is None:
+        return speech.SpeechClient()
+    from google.oauth2 import service_account
+    if isinstance(credentials_info, str):
+        credentials_info = json.loads(credentials_info)
+    credentials = service_account.Credentials.from_service_account_info(dict(credentials_info))
+    return speech.SpeechClient(credentials=credentials)
+
+
+def build_gemini_model(api_key, model_name=GEMINI_MODEL_NAME):
+    import google.generativeai as genai
+    # genai.configure เป็น global state จึงเรียกเฉพาะตอนสร้าง model ใหม่ (เมื่อ key เปลี่ยน)
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model_name)
+
+
+def close_client(client):
+    """ปิด channel ของ client (SpeechClient ปิดผ่าน transport) client ที่ไม่มี close เช่น GenerativeModel ข้ามไป"""
+    close = getattr(client, "close", None) or getattr(getattr(client, "transport", None), "close", None)
+    if close is None:
+        return
+    try:
+        close()
+    except Exception:
+        pass
+
+
+class ClientRegistry:
+    def __init__(self, max_age_seconds=DEFAULT_MAX_AGE_SECONDS, retired_grace_seconds=DEFAULT_RETIRED_GRACE_SECONDS):
+        self.max_age_seconds = max_age_seconds
+        self.retired_grace_seconds = retired_grace_seconds
+        self._entries = {}
+        self._key_locks = {}
+        self._retired = []  # (client, เวลาที่ถูกแทนที่)
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _fresh(self, kind, key, stats, start):
+        """เรียกขณะถือ _lock คืน client ที่ยังไม่หมดอายุ (นับเป็น reuse) หรือ None"""
+        entry = self._entries.get((kind, key))
+        if entry is not None and time.monotonic() - entry[1] < self.max_age_seconds:
+            stats["reused"] += 1
+            stats["lookup_seconds"] += time.perf_counter() - start
+            return entry[0]
+        return None
+
+    def _pop_retired(self):
+        """เรียกขณะถือ _lock คืน client ที่ถูกแทนที่นานเกิน retired_grace_seconds เพื่อปิดนอก lock"""
+        if not self._retired:
+            return []
+        now = time.monotonic()
+        expired = [client for client, retired_at in self._retired if now - retired_at >= self.retired_grace_seconds]
+        self._retired = [item for item in self._retired if now - item[1] < self.retired_grace_seconds]
+        return expired
+
+    def get(self, kind, key, factory):
+        """คืน client ที่ cache ไว้สำหรับ (kind, key) หรือสร้างใหม่ด้วย factory() ถ้ายังไม่มี/หมดอายุ"""
+        with self._lock:
+            stats = self._stats.setdefault(kind, {"created": 0, "reused": 0, "build_seconds": 0.0, "lookup_seconds": 0.0})
+            start = time.perf_counter()
+            expired = self._pop_retired()
+            client = self._fresh(kind, key, stats, start)
+            key_lock = self._key_locks.setdefault((kind, key), threading.Lock())
+        for old in expired:
+            close_client(old)
+        if client is not None:
+            return client
+        # lock ต่อ key: session ที่ขอ key เดียวกันรอ client ตัวเดียว แต่ key อื่นไม่ต้องรอการสร้าง channel นี้
+        with key_lock:
+            with self._lock:
+                client = self._fresh(kind, key, stats, start)
+            if client is not None:
+                return client
+            build_start = time.perf_counter()
+            client = factory()
+            now = time.monotonic()
+            with self._lock:
+                stats["created"] += 1
+                stats["build_seconds"] += time.perf_counter() - build_start
+                previous = self._entries.get((kind, key))
+                self._entries[(kind, key)] = (client, now)
+                if previous is not None:
+                    self._retired.append((previous[0], now))
+        return client
+
+    def clear(self):
+        """ลบและปิด client ทั้งหมด (รวมตัวที่รอปิด)"""
+        with self._lock:
+            clients = [client for client, _ in self._entries.values()] + [client for client, _ in self._retired]
+            self._entries.clear()
+            self._retired = []
+        for client in clients:
+            close_client(client)
+
+    def stats(self):
+        """จำนวนครั้งที่สร้าง/ใช้ซ้ำ และเวลาที่ประหยัดได้ (ประมาณจากเวลาสร้างเฉลี่ย x จำนวนครั้งที่ใช้ซ้ำ)"""
+        with self._lock:
+            report = {}
+            for kind, stats in self._stats.items():
+                avg_build_ms = stats["build_seconds"] * 1000 / stats["created"] if stats["created"] else 0.0
+                avg_lookup_ms = stats["lookup_seconds"] * 1000 / stats["reused"] if stats["reused"] else 0.0
+                report[kind] = {
+                    "created": stats["created"],
+                    "reused": stats["reused"],
+                    "avg_build_ms": avg_build_ms,
+                    "avg_reuse_ms": avg_lookup_ms,
+                    "saved_ms_per_request": avg_build_ms - avg_lookup_ms if stats["reused"] else 0.0,
+                    "saved_ms_total": (avg_build_ms - avg_lookup_ms) * stats["reused"],
+                }
+            return report
+
+
+registry = ClientRegistry()
+
+
+def get_speech_client(credentials_info=None):
+    return registry.get("speech", _fingerprint(credentials_info), lambda: build_speech_client(credentials_info))
+
+
+def get_gemini_model(api_key, model_name=GEMINI_MODEL_NAME):
+    return registry.get("gemini", f"{model_name}:{_fingerprint(api_key)}", lambda: build_gemini_model(api_key, model_name))
@@ -0,0 +1,120 @@
+"""Cache บนดิสก์แบบหนึ่งไฟล์ต่อรายการ (<key>.json.gz) ใช้ร่วมกันได้ข้าม restart และข้าม replica ที่แชร์ volume"""
+import gzip
+import json
+import os
+import threading
+
+
+class DiskCache:
+    """
+    เก็บแต่ละรายการเป็นไฟล์ <key>.json.gz และไล่รายการที่ใช้ล่าสุดนานที่สุดออก (LRU ตาม mtime) เมื่อเกิน max_bytes
+    subclass แปลงข้อมูลก่อนเก็บ/หลังอ่านผ่าน get_raw/put_raw และล้างข้อมูลประกอบของ key ที่ถูกลบได้ใน _removed
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._total_bytes = sum(size for _, _, size in self._entries())
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json.gz")
+
+    def _key(self, path):
+        return os.path.basename(path)[:-len(".json.gz")]
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json.gz"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+        return entries
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get_raw(self, key, count=True):
+        """อ่านรายการ (ไม่มีหรืออ่านไม่ได้คืนค่า None) count=False ไม่นับเป็น hit/miss"""
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)  # แตะ mtime เพื่อให้เป็นรายการที่ใช้ล่าสุด
+        except (OSError, ValueError):
+            value = None
+        if count:
+            self._count(value is not None)
+        return value
+
+    def put_raw(self, key, value):
+        path = self._path(key)
+        data = gzip.compress(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        removed = []
+        with self._lock:
+            # เขียนทับ key เดิม: หักขนาดไฟล์เก่าออก ไม่งั้น _total_bytes โตเกินจริงและ evict ก่อนเวลา
+            try:
+                previous_size = os.path.getsize(path)
+            except OSError:
+                previous_size = 0
+            os.replace(temp_path, path)  # atomic เพื่อให้ process อื่นไม่อ่านไฟล์ที่เขียนไม่เสร็จ
+            self._total_bytes += len(data) - previous_size
+            if self._total_bytes > self.max_bytes:
+                removed = self._evict()
+        if removed:
+            self._removed(removed)
+
+    def discard(self, key):
+        path = self._path(key)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self._total_bytes -= size
+            self.evictions += 1
+        self._removed([key])
+
+    def _evict(self):
+        """ลบรายการเก่าจนไม่เกิน max_bytes (เรียกขณะถือ _lock) คืนค่า key ที่ถูกลบ"""
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        removed = []
+        for _, path, size in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+            removed.append(self._key(path))
+        self._total_bytes = total
+        return removed
+
+    def _removed(self, keys):
+        """เรียกหลังรายการถูกลบ (evict, discard) นอก _lock ให้ subclass ล้างข้อมูลที่อ้างถึง key เหล่านี้"""
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "bytes": self._total_bytes,
+            }
@@ -0,0 +1,303 @@
+"""Fake ของบริการ Google ที่ใช้ทดสอบ/วัดประสิทธิภาพแบบ offline (ไม่ต้องมี credentials หรือเน็ต)"""
+import json
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import timedelta
+from types import SimpleNamespace
+
+import numpy as np
+
+from longsorn.ingest import SAMPLE_RATE, decode_audio
+from longsorn.resilience import GEMINI_DEADLINE_SECONDS, STT_DEADLINE_SECONDS, ResilientCaller
+
+# fake ไม่มี quota: retry/deadline/hedge ทำงานเหมือนเดิมแต่ไม่ผ่าน token bucket ที่ใช้ร่วมกันทั้ง process
+# (ส่งเป็น caller=... / stt_caller=... / gemini_caller=... ของ run_pipeline)
+fake_stt_caller = ResilientCaller("fake-stt", deadline_seconds=STT_DEADLINE_SECONDS)
+fake_gemini_caller = ResilientCaller("fake-gemini", deadline_seconds=GEMINI_DEADLINE_SECONDS)
+
+
+def _audio_content(audio):
+    return audio["content"] if isinstance(audio, dict) else audio.content
+
+
+class FakeSpeechClient:
+    """
+    ทำตัวเหมือน speech.SpeechClient.recognize: สร้าง "คำ" ทุก ๆ 1/words_per_second วินาทีในช่วงที่มีเสียง
+    ข้อความของคำคำนวณจากเนื้อเสียงช่วงนั้น เสียงเดียวกันจึงได้ผลเหมือนเดิมทุกครั้ง
+    เสียงที่บีบอัด (FLAC/OGG_OPUS) ถูกถอดกลับเป็น PCM ก่อน, upload_bytes_per_second จำลองเวลาอัปโหลดตามขนาด payload
+    spoken_language: ภาษาที่ "พูด" ในเสียง ถ้าอยู่ใน language_code/alternative_language_codes ของ config จะถูกรายงานใน result.language_code
+    """
+
+    def __init__(self, latency=0.2, realtime_factor=0.0, words_per_second=2.5, silence_rms=200.0, sample_rate=SAMPLE_RATE,
+                 upload_bytes_per_second=None, spoken_language=None):
+        self.latency = latency
+        self.realtime_factor = realtime_factor  # เวลาประมวลผลเพิ่มต่อวินาทีเสียง
+        self.upload_bytes_per_second = upload_bytes_per_second
+        self.spoken_language = spoken_language
+        self.bytes_received = 0
+        self.words_per_second = words_per_second
+        self.silence_rms = silence_rms
+        self.sample_rate = sample_rate
+        self.calls = 0
+        self.max_concurrency = 0
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def _words(self, content):
+        samples = np.frombuffer(content, dtype="<i2")
+        step = int(self.sample_rate / self.words_per_second)
+        words = []
+        for start in range(0, len(samples) - step + 1, step):
+            segment = samples[start:start + step]
+            if np.sqrt(np.mean(segment.astype(np.float32) ** 2)) < self.silence_rms:
+                continue
+            token = f"w{zlib.crc32(segment.tobytes()) % 10000}"
+            words.append(SimpleNamespace(
+                word=token,
+                start_time=timedelta(seconds=start / self.sample_rate),
+                end_time=timedelta(seconds=(start + step * 0.8) / self.sample_rate),
+            ))
+        return words
+
+    def recognize(self, config=None, audio=None, **kwargs):
+        content = _audio_content(audio)
+        with self._lock:
+            self.calls += 1
+            self.bytes_received += len(content)
+            self._active += 1
+            self.max_concurrency = max(self.max_concurrency, self._active)
+        try:
+            if self.upload_bytes_per_second:
+                time.sleep(len(content) / self.upload_bytes_per_second)
+            config = config if isinstance(config, dict) else {}
+            content = decode_audio(content, config.get("encoding", "LINEAR16"), self.sample_rate)
+            time.sleep(self.latency + self.realtime_factor * len(content) / (2 * self.sample_rate))
+            words = self._words(content)
+            if not words:
+                return SimpleNamespace(results=[])
+            language_codes = [config.get("language_code", "th-TH"), *config.get("alternative_language_codes", [])]
+            language_code = self.spoken_language if self.spoken_language in language_codes else language_codes[0]
+            alternative = SimpleNamespace(transcript=" ".join(w.word for w in words), words=words)
+            return SimpleNamespace(results=[SimpleNamespace(alternatives=[alternative], language_code=language_code.lower())])
+        finally:
+            with self._lock:
+                self._active -= 1
+
+
+def synthetic_speech_pcm(seconds, sample_rate=SAMPLE_RATE, seed=0):
+    """PCM สังเคราะห์: ช่วง "พูด" (noise) สลับช่วงเงียบแบบสุ่ม เพื่อใช้ทดสอบการตัดตามช่วงเงียบ"""
+    rng = np.random.default_rng(seed)
+    total = int(seconds * sample_rate)
+    out = np.zeros(total, dtype="<i2")
+    pos = 0
+    while pos < total:
+        speech_len = int(rng.uniform(2.0, 12.0) * sample_rate)
+        out[pos:pos + speech_len] = (rng.standard_normal(min(speech_len, total - pos)) * 3000).astype("<i2")
+        pos += speech_len + int(rng.uniform(0.2, 1.5) * sample_rate)
+    return out.tobytes()
+
+
+class FakeGenerativeModel:
+    """
+    ทำตัวเหมือน genai.GenerativeModel.generate_content: ตอบในรูปแบบที่ prompt กำหนด (Clarity/ORIGINAL/KEYWORDS)
+    โดยหยิบวลีจริงจาก transcript ใน prompt เวลาตอบ = latency + seconds_per_1k_chars x ความยาว prompt
+    ถ้าขอ response_mime_type="application/json" จะตอบเป็น JSON ตาม FEEDBACK_SCHEMA, invalid_json_rate จำลองคำตอบที่ผิดรูปแบบ
+    """
+
+    def __init__(self, latency=0.5, seconds_per_1k_chars=0.002, stream_chunk_chars=40, suggestions=5, invalid_json_rate=0.0, seed=0):
+        self.latency = latency
+        self.seconds_per_1k_chars = seconds_per_1k_chars
+        self.stream_chunk_chars = stream_chunk_chars
+        self.suggestions = suggestions
+        self.invalid_json_rate = invalid_json_rate
+        self.calls = 0
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    def respond(self, prompt):
+        transcript = prompt.split('Full Transcript:\n"""\n', 1)[-1].rsplit('\n"""', 1)[0]
+        words = transcript.split()
+        lines = [f"Clarity: {6 + len(words) % 4} | Justification: Pace and pauses are within a normal range."]
+        step = max(1, len(words) // self.suggestions)
+        for i in range(0, min(len(words), step * self.suggestions), step):
+            phrase = " ".join(words[i:i + 4])
+            lines.append(f"ORIGINAL: {phrase} | REASON: Wordy phrasing | SUGGESTION: {phrase.upper()}")
+        keywords = [word for word, _ in Counter(w for w in words if len(w) > 3).most_common(5)]
+        lines.append(f"KEYWORDS: [{', '.join(keywords)}]")
+        return "\n".join(lines)
+
+    def respond_json(self, prompt):
+        """คำตอบเดียวกับ respond ในรูป JSON (แปลงจากบรรทัด Clarity/ORIGINAL/KEYWORDS)"""
+        from longsorn.analysis import parse_feedback_line
+        from longsorn.phrase_index import PhraseIndex
+
+        data = {"clarity_score": 0, "clarity_justification": "", "suggestions": [], "keywords": []}
+        for line in self.respond(prompt).splitlines():
+            event = parse_feedback_line(line, PhraseIndex([]))
+            if event is None:
+                continue
+            kind, payload = event
+            if kind == "clarity":
+                data["clarity_score"], data["clarity_justification"] = payload["score"], payload["justification"]
+            elif kind == "keywords":
+                data["keywords"] = payload
+            else:
+                data["suggestions"].append({"original": payload["original"], "reason": payload["type"], "suggestion": payload["suggestion"]})
+        text = json.dumps(data, ensure_ascii=False)
+        with self._lock:
+            invalid = self._rng.random() < self.invalid_json_rate
+        return text[:len(text) // 2] if invalid else text
+
+    def _stream(self, text, generation_seconds):
+        chunks = [text[i:i + self.stream_chunk_chars] for i in range(0, len(text), self.stream_chunk_chars)]
+        time.sleep(self.latency)
+        for chunk in chunks:
+            time.sleep(generation_seconds / len(chunks))
+            yield SimpleNamespace(text=chunk)
+
+    def generate_content(self, prompt, stream=False, generation_config=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+        if (generation_config or {}).get("response_mime_type") == "application/json":
+            text = self.respond_json(prompt)
+        else:
+            text = self.respond(prompt)
+        generation_seconds = self.seconds_per_1k_chars * len(prompt) / 1000
+        if stream:
+            return self._stream(text, generation_seconds)
+        time.sleep(self.latency + generation_seconds)
+        return SimpleNamespace(text=text)
+
+
+class ReplaySpeechClient(FakeSpeechClient):
+    """
+    เล่นซ้ำผล STT ที่บันทึกไว้ (รูปแบบเดียวกับ transcript cache: t/w/s/e เป็นมิลลิวินาที)
+    คำของ fixture ถูกวนซ้ำให้เต็มความยาวของเสียงแต่ละ chunk
+    """
+
+    def __init__(self, fixture, latency=0.3, realtime_factor=0.02, sample_rate=SAMPLE_RATE):
+        super().__init__(latency=latency, realtime_factor=realtime_factor, sample_rate=sample_rate)
+        self.fixture = fixture
+        self.cycle_seconds = fixture.get("duration_s") or fixture["e"][-1] / 1000
+
+    def _words(self, content):
+        duration = len(content) / (2 * self.sample_rate)
+        words = []
+        cycle = 0
+        while cycle * self.cycle_seconds < duration:
+            base = cycle * self.cycle_seconds
+            for word, start, end in zip(self.fixture["w"], self.fixture["s"], self.fixture["e"]):
+                if base + end / 1000 > duration:
+                    return words
+                words.append(SimpleNamespace(word=word, start_time=timedelta(seconds=base + start / 1000),
+                                             end_time=timedelta(seconds=base + end / 1000)))
+            cycle += 1
+        return words
+
+
+class ReplayGenerativeModel(FakeGenerativeModel):
+    """ตอบด้วยข้อความที่บันทึกจาก Gemini จริงทุกครั้ง (ยังคงจำลอง latency ตามความยาว prompt)"""
+
+    def __init__(self, recorded_text, **kwargs):
+        super().__init__(**kwargs)
+        self.recorded_text = recorded_text
+
+    def respond(self, prompt):
+        return self.recorded_text
+
+
+class FakeStreamingSpeechClient(FakeSpeechClient):
+    """
+    ทำตัวเหมือน SpeechClient.streaming_recognize: สะสมเฟรมเสียงแล้วส่งผล interim ทุก interim_seconds
+    และผล final ทุก final_seconds ของเสียง (คำจาก _words เหมือน FakeSpeechClient) ไม่รอตามเวลาจริง
+    จึงป้อนเสียงได้เร็วกว่า real-time เท่าที่ผู้เรียกส่งเฟรมมา
+    """
+
+    def __init__(self, final_seconds=3.0, interim_seconds=1.0, latency=0.0, **kwargs):
+        super().__init__(latency=latency, **kwargs)
+        self.final_seconds = final_seconds
+        self.interim_seconds = interim_seconds
+        self.streams = 0
+
+    def _result(self, words, is_final):
+        alternative = SimpleNamespace(transcript=" ".join(w.word for w in words), words=words if is_final else [])
+        return SimpleNamespace(results=[SimpleNamespace(alternatives=[alternative], is_final=is_final)])
+
+    def _final(self, buffer, offset_samples):
+        time.sleep(self.latency)
+        offset = timedelta(seconds=offset_samples / self.sample_rate)
+        words = [SimpleNamespace(word=w.word, start_time=w.start_time + offset, end_time=w.end_time + offset)
+                 for w in self._words(bytes(buffer))]
+        return self._result(words, True)
+
+    def streaming_recognize(self, config, requests, **kwargs):
+        with self._lock:
+            self.streams += 1
+        final_bytes = int(self.final_seconds * self.sample_rate) * 2
+        interim_bytes = int(self.interim_seconds * self.sample_rate) * 2
+        buffer = bytearray()
+        offset_samples = 0  # ตำแหน่งของ buffer ภายใน stream นี้
+        next_interim = interim_bytes
+        for request in requests:
+            content = request["audio_content"] if isinstance(request, dict) else request.audio_content
+            buffer.extend(content)
+            with self._lock:
+                self.bytes_received += len(content)
+            if len(buffer) >= final_bytes:
+                yield self._final(buffer, offset_samples)
+                offset_samples += len(buffer) // 2
+                buffer.clear()
+                next_interim = interim_bytes
+            elif len(buffer) >= next_interim:
+                yield self._result(self._words(bytes(buffer)), False)
+                next_interim += interim_bytes
+        if buffer:
+            yield self._final(buffer, offset_samples)
+
+
+class FakeAPIError(Exception):
+    """error ในรูปแบบเดียวกับ google.api_core.exceptions (.code เป็น HTTP status)"""
+
+    def __init__(self, code, message=""):
+        super().__init__(f"{code} {message}".strip())
+        self.code = code
+
+
+class FlakyProxy:
+    """
+    ห่อ fake client/model ตัวใดก็ได้: ทุกครั้งที่เรียก method มีโอกาส error_rate ที่จะล้มเหลวทันที
+    (429 ในสัดส่วน rate_limited_share ที่เหลือเป็น 503) และโอกาส slow_rate ที่จะช้าเพิ่ม slow_seconds (tail latency)
+    """
+
+    def __init__(self, target, error_rate=0.1, rate_limited_share=0.5, slow_rate=0.05, slow_seconds=2.0, seed=0):
+        self._target = target
+        self.error_rate = error_rate
+        self.rate_limited_share = rate_limited_share
+        self.slow_rate = slow_rate
+        self.slow_seconds = slow_seconds
+        self.calls = 0
+        self.errors = 0
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attribute = getattr(self._target, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            with self._lock:
+                self.calls += 1
+                fail, rate_limited, slow = self._rng.random(3)
+                if fail < self.error_rate:
+                    self.errors += 1
+            if fail < self.error_rate:
+                if rate_limited < self.rate_limited_share:
+                    raise FakeAPIError(429, "Resource has been exhausted (e.g. check quota).")
+                raise FakeAPIError(503, "The service is currently unavailable.")
+            if slow < self.slow_rate:
+                time.sleep(self.slow_seconds)
+            return attribute(*args, **kwargs)
+        return call
@@ -0,0 +1,190 @@
+"""
+คุณลักษณะของเสียงพูดจาก PCM (ไม่ต้องใช้ STT): ความดัง (RMS), zero-crossing, pitch จาก autocorrelation และอัตราพยางค์
+คำนวณแบบ vectorized ทีละเฟรม บน block ของ PCM ทีละช่วง (หน่วยความจำคงที่ไม่ขึ้นกับความยาวไฟล์) แล้วสรุปเป็นค่าต่อหน้าต่างเวลา
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from longsorn.ingest import SAMPLE_RATE
+from longsorn.vad import MIN_SPEECH_DB, SPEECH_MARGIN_DB
+
+FRAME_SECONDS = 0.04  # ยาวพอสำหรับ 2 คาบของ pitch ต่ำสุด
+WINDOW_SECONDS = 1.0  # ความละเอียดของ time series ที่ส่งให้หน้า Results
+BLOCK_SECONDS = 60.0
+PITCH_MIN_HZ = 75.0
+PITCH_MAX_HZ = 400.0
+PITCH_SAMPLE_RATE = 8000  # หา pitch บนเสียงที่ลด sample rate ลงครึ่งหนึ่ง (ช่วง pitch พูดอยู่ต่ำกว่า 4 kHz มาก)
+VOICING_THRESHOLD = 0.45  # autocorrelation ที่ lag ของ pitch เทียบกับ lag 0
+MAX_VOICED_ZCR = 0.25  # เฟรมที่ zero-crossing สูงกว่านี้เป็นเสียงเสียดแทรก (ส, ฟ) ไม่ใช่เสียงก้อง
+# peak ของความดังที่สูงที่สุดในช่วง ±PEAK_RADIUS เฟรม (±80 ms) นับเป็นหนึ่งพยางค์
+PEAK_RADIUS = 2
+
+
+def frame_features(frames, sample_rate=SAMPLE_RATE):
+    """
+    frames: int16 รูป (n_frames, frame_size) คืนค่า (energy_db, zcr, pitch_hz)
+    pitch เป็น NaN ในเฟรมที่ไม่ใช่เสียงก้อง, autocorrelation คำนวณผ่าน FFT เฉพาะเฟรมที่ดังพอ
+    """
+    x = frames.astype(np.float32)
+    energy_db = 10 * np.log10(np.mean(x * x, axis=1) + 1e-9)
+    signs = np.signbit(x)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frames.shape[1] - 1)
+    pitch_hz = np.full(len(frames), np.nan, dtype=np.float32)
+
+    candidates = np.flatnonzero((energy_db >= MIN_SPEECH_DB) & (zcr <= MAX_VOICED_ZCR))
+    if len(candidates):
+        step = max(1, sample_rate // PITCH_SAMPLE_RATE)
+        rate = sample_rate / step
+        # ลด sample rate ด้วยค่าเฉลี่ยทีละ step sample (low-pass อย่างง่าย) แล้วลบ DC
+        y = x[candidates, :x.shape[1] // step * step].reshape(len(candidates), -1, step).mean(axis=2)
+        y -= y.mean(axis=1, keepdims=True)
+        min_lag, max_lag = int(rate / PITCH_MAX_HZ), int(np.ceil(rate / PITCH_MIN_HZ))
+        n_fft = 1 << int(np.ceil(np.log2(y.shape[1] + max_lag + 1)))
+        spectrum = np.fft.rfft(y, n_fft, axis=1)
+        autocorr = np.fft.irfft(spectrum.real ** 2 + spectrum.imag ** 2, n_fft, axis=1)[:, :max_lag + 2]
+        best = min_lag + np.argmax(autocorr[:, min_lag:max_lag + 1], axis=1)
+        rows = np.arange(len(candidates))
+        strength = autocorr[rows, best] / np.maximum(autocorr[:, 0], 1e-9)
+        # parabolic interpolation รอบ peak ให้ได้ lag ละเอียดกว่า 1 sample
+        left, center, right = autocorr[rows, best - 1], autocorr[rows, best], autocorr[rows, best + 1]
+        denominator = left - 2 * center + right
+        shift = np.where(np.abs(denominator) > 1e-9, 0.5 * (left - right) / np.where(denominator == 0, 1, denominator), 0.0)
+        voiced = strength >= VOICING_THRESHOLD
+        pitch_hz[candidates[voiced]] = rate / (best[voiced] + np.clip(shift[voiced], -0.5, 0.5))
+    return energy_db.astype(np.float32), zcr.astype(np.float32), pitch_hz
+
+
+@dataclass
+class SpeechFeatures:
+    starts: np.ndarray  # เวลาเริ่มของแต่ละหน้าต่าง (วินาที)
+    energy_db: np.ndarray  # ความดังเฉลี่ย (dBFS ของ int16 ประมาณ 0-90)
+    zcr: np.ndarray  # zero-crossing rate เฉลี่ยของเฟรมที่เป็นเสียงพูด
+    pitch_hz: np.ndarray  # median pitch ของเฟรมเสียงก้อง (NaN = ไม่มี)
+    speech_ratio: np.ndarray  # สัดส่วนเฟรมที่เป็นเสียงพูด
+    syllable_rate: np.ndarray  # พยางค์ต่อวินาที (ประมาณจาก peak ของความดัง)
+    window_seconds: float = WINDOW_SECONDS
+
+    def __len__(self):
+        return len(self.starts)
+
+    def summary(self):
+        """ค่าสรุปทั้งไฟล์: pitch เฉลี่ยและความแปรปรวน (semitone, ต่ำ = พูดเสียงโทนเดียว), ช่วงความดัง และอัตราพยางค์"""
+        speaking = self.speech_ratio >= 0.25
+        pitch = self.pitch_hz[speaking & ~np.isnan(self.pitch_hz)]
+        energy = self.energy_db[speaking]
+        return {
+            "mean_pitch_hz": float(np.median(pitch)) if len(pitch) else None,
+            "pitch_variability_semitones": float(np.std(12 * np.log2(pitch / np.median(pitch)))) if len(pitch) > 1 else None,
+            "energy_range_db": float(np.percentile(energy, 90) - np.percentile(energy, 10)) if len(energy) else None,
+            "syllables_per_second": float(np.mean(self.syllable_rate[speaking])) if speaking.any() else None,
+            "speech_seconds": float(np.sum(self.speech_ratio) * self.window_seconds),
+        }
+
+    def to_records(self):
+        """time series แบบย่อสำหรับ JSON (NaN เป็น None)"""
+        def clean(values, digits):
+            return [None if np.isnan(v) else round(float(v), digits) for v in values]
+        columns = {"start": clean(self.starts, 2), "energy_db": clean(self.energy_db, 1), "pitch_hz": clean(self.pitch_hz, 1),
+                   "zcr": clean(self.zcr, 3), "speech_ratio": clean(self.speech_ratio, 2), "syllable_rate": clean(self.syllable_rate, 2)}
+        return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+
+class FeatureExtractor:
+    """
+    รับ PCM ทีละ block ด้วย push() คืนค่าต่อหน้าต่างที่ครบแล้ว เก็บค้างไว้เฉพาะเฟรมของหน้าต่างที่ยังไม่ครบ
+    (+ เฟรมข้างเคียงที่ใช้ตัดสิน peak) หน่วยความจำจึงไม่ขึ้นกับความยาวไฟล์
+    noise floor ประมาณจาก percentile ที่ 10 ของพลังงานที่เห็นมาแล้ว (ค่าต่ำสุดของทุก block)
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, window_seconds=WINDOW_SECONDS):
+        self.sample_rate = sample_rate
+        self.frame_size = int(FRAME_SECONDS * sample_rate)
+        self.frames_per_window = max(1, int(round(window_seconds / FRAME_SECONDS)))
+        self.window_seconds = self.frames_per_window * FRAME_SECONDS
+        self.noise_floor_db = None
+        self.windows = 0
+        self._leftover = np.zeros(0, dtype="<i2")
+        self._left_context = np.full(PEAK_RADIUS, -np.inf, dtype=np.float32)
+        self._pending = [np.zeros(0, dtype=np.float32)] * 3  # energy_db, zcr, pitch_hz ของเฟรมที่ยังไม่ได้สรุป
+
+    def push(self, samples):
+        """samples: int16 array หรือ bytes คืนค่า dict ของ array ต่อหน้าต่าง (อาจว่าง)"""
+        if isinstance(samples, (bytes, bytearray, memoryview)):
+            samples = np.frombuffer(samples, dtype="<i2")
+        if len(self._leftover):
+            samples = np.concatenate((self._leftover, samples))
+        n_frames = len(samples) // self.frame_size
+        self._leftover = samples[n_frames * self.frame_size:].copy()
+        if n_frames:
+            features = frame_features(samples[:n_frames * self.frame_size].reshape(n_frames, self.frame_size), self.sample_rate)
+            self._pending = [np.concatenate((old, new)) for old, new in zip(self._pending, features)]
+            floor = float(np.percentile(features[0], 10))
+            self.noise_floor_db = floor if self.noise_floor_db is None else min(self.noise_floor_db, floor)
+        return self._emit(final=False)
+
+    def finish(self):
+        """สรุปเฟรมที่เหลือทั้งหมด (หน้าต่างสุดท้ายอาจสั้นกว่า window_seconds)"""
+        return self._emit(final=True)
+
+    def _emit(self, final):
+        energy, zcr, pitch = self._pending
+        n, per_window = len(energy), self.frames_per_window
+        # peak ของเฟรมสุดท้ายยังตัดสินไม่ได้จนกว่าจะเห็นเฟรมถัดไปอีก PEAK_RADIUS เฟรม
+        windows = -(-n // per_window) if final else max(0, n - PEAK_RADIUS) // per_window
+        if windows == 0:
+            return _empty_windows()
+        used = min(n, windows * per_window)
+        right_context = energy[used:used + PEAK_RADIUS]
+        context = np.concatenate((self._left_context, energy[:used], right_context,
+                                  np.full(PEAK_RADIUS - len(right_context), -np.inf, dtype=np.float32)))
+        neighbourhood = np.lib.stride_tricks.sliding_window_view(context, 2 * PEAK_RADIUS + 1)
+        threshold = max(MIN_SPEECH_DB, (self.noise_floor_db or 0.0) + SPEECH_MARGIN_DB)
+        speech = energy[:used] >= threshold
+        # ต้องสูงกว่าเฟรมก่อนหน้าด้วย เพื่อไม่ให้ช่วงความดังคงที่ถูกนับหลายพยางค์
+        peaks = speech & (energy[:used] >= neighbourhood.max(axis=1)) & (energy[:used] > context[PEAK_RADIUS - 1:PEAK_RADIUS - 1 + used])
+
+        def per_window_view(values, fill):
+            padded = np.full(windows * per_window, fill, dtype=np.float32)
+            padded[:used] = values
+            return padded.reshape(windows, per_window)
+
+        speech_frames = per_window_view(speech, 0).astype(bool)
+        frame_counts = np.minimum(per_window, used - np.arange(windows) * per_window)
+        power = per_window_view(10 ** (energy[:used] / 10), 0).sum(axis=1) / frame_counts
+        speech_count = speech_frames.sum(axis=1)
+        # หน้าต่างที่ไม่มีเสียงก้องเลยได้ NaN (ไม่ใช้ warnings.catch_warnings เพราะไม่ thread-safe เมื่อหลายไฟล์วิเคราะห์พร้อมกัน)
+        voiced_pitch = np.where(speech_frames, per_window_view(pitch[:used], np.nan), np.nan)
+        has_pitch = ~np.isnan(voiced_pitch).all(axis=1)
+        window_pitch = np.full(windows, np.nan)
+        if has_pitch.any():
+            window_pitch[has_pitch] = np.nanmedian(voiced_pitch[has_pitch], axis=1)
+        window_zcr = np.where(speech_count > 0, (per_window_view(zcr[:used], 0) * speech_frames).sum(axis=1) / np.maximum(speech_count, 1), np.nan)
+        result = {
+            "starts": (self.windows + np.arange(windows)) * self.window_seconds,
+            "energy_db": 10 * np.log10(power + 1e-9),
+            "zcr": window_zcr,
+            "pitch_hz": window_pitch,
+            "speech_ratio": speech_count / frame_counts,
+            "syllable_rate": per_window_view(peaks, 0).sum(axis=1) / (frame_counts * FRAME_SECONDS),
+        }
+        self.windows += windows
+        self._left_context = context[used:used + PEAK_RADIUS]
+        self._pending = [values[used:] for values in self._pending]
+        return result
+
+
+def _empty_windows():
+    empty = np.zeros(0)
+    return dict.fromkeys(("starts", "energy_db", "zcr", "pitch_hz", "speech_ratio", "syllable_rate"), empty)
+
+
+def extract_features(pcm, sample_rate=SAMPLE_RATE, window_seconds=WINDOW_SECONDS, block_seconds=BLOCK_SECONDS):
+    """คุณลักษณะของทั้งไฟล์ (PCM LINEAR16 mono) โดยอ่านทีละ block_seconds ผ่าน memoryview ไม่คัดลอกทั้งไฟล์"""
+    extractor = FeatureExtractor(sample_rate, window_seconds)
+    block_bytes = int(block_seconds * sample_rate) * 2
+    view = memoryview(pcm)[:len(pcm) // 2 * 2]
+    parts = [extractor.push(view[offset:offset + block_bytes]) for offset in range(0, len(view), block_bytes)]
+    parts.append(extractor.finish())
+    columns = {name: np.concatenate([part[name] for part in parts]) for name in parts[-1]}
+    return SpeechFeatures(window_seconds=extractor.window_seconds, **columns)
@@ -0,0 +1,281 @@
+"""
+ตรวจ filler words ด้วย Aho-Corasick automaton เดียวต่อภาษา สร้างจาก lexicon (longsorn/lexicons/<ภาษา>.json)
+สแกนคำของ transcript ต่อกันในรอบเดียว: ภาษาไทยต่อคำโดยไม่เว้นวรรค จึงเจอ filler ที่ STT รวมไว้กับคำอื่น ('ก็คือว่า')
+หรือแยกเป็นหลายคำ ('แบบ' + 'ว่า') ได้ด้วย
+
+lexicon:
+    join      ตัวคั่นระหว่างคำตอนต่อข้อความ ("" สำหรับภาษาไทย, " " สำหรับภาษาอังกฤษ)
+    match     "word" = ต้องเริ่มและจบตรงขอบคำของ STT, "anywhere" = อยู่กลางคำหรือคร่อมหลายคำได้ (แต่ไม่ตัดกลางพยางค์ไทย)
+    fillers   [{"phrase", "match" (ไม่บังคับ ใช้ค่า match ของ lexicon)}]
+    exclude   คำที่มี filler อยู่ข้างในแต่ไม่ใช่ filler ('เอ่อล้น', 'คะแนน') filler ที่ทับกับคำเหล่านี้ไม่ถูกนับ
+วางไฟล์ <ภาษา>.json ไว้ใน LONGSORN_LEXICON_DIR เพื่อใช้แทน lexicon ที่มากับโปรแกรม
+"""
+import bisect
+import json
+import os
+import threading
+import unicodedata
+from collections import deque
+from dataclasses import dataclass
+
+from longsorn.phrase_index import normalize_token
+
+LEXICON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lexicons")
+WORD = "word"
+ANYWHERE = "anywhere"
+THAI_LEADING_VOWELS = frozenset("เแโใไ")  # เขียนก่อนพยัญชนะ: เป็นส่วนของพยางค์ที่ตามมา
+THAI_TRAILING_VOWELS = frozenset("ะาำๅ")  # เขียนหลังพยัญชนะ: ตัดก่อนตัวนี้ = ตัดกลางพยางค์
+PRUNE_TOKENS = 1024  # ทิ้งคำที่สแกนผ่านแล้วเมื่อเก็บไว้เกิน 2 เท่าของค่านี้ (โหมด Live ใช้หน่วยความจำคงที่)
+
+
+def lexicon_language(language):
+    return "th" if "th" in language else "en"
+
+
+def load_lexicon(language):
+    """lexicon ของภาษา (จาก LONGSORN_LEXICON_DIR ถ้ามีไฟล์ของภาษานั้น ไม่เช่นนั้นใช้ที่มากับโปรแกรม)"""
+    name = f"{lexicon_language(language)}.json"
+    custom_dir = os.getenv("LONGSORN_LEXICON_DIR")
+    path = os.path.join(custom_dir, name) if custom_dir and os.path.exists(os.path.join(custom_dir, name)) else os.path.join(LEXICON_DIR, name)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def splits_syllable(before, after):
+    """ขอบของ match ตัดกลางพยางค์ไทย: ตัวก่อนหน้าเป็นสระหน้า หรือตัวถัดไปเป็นสระหลัง/สระบนล่าง/วรรณยุกต์ของพยัญชนะตัวสุดท้าย"""
+    return before in THAI_LEADING_VOWELS or after in THAI_TRAILING_VOWELS or (after != "" and unicodedata.category(after) == "Mn")
+
+
+@dataclass
+class FillerMatch:
+    first: int  # index ของคำแรกและคำสุดท้ายใน timeline
+    last: int
+    phrase: str
+    start_fraction: float  # ตำแหน่งเริ่ม/จบภายในคำ (0-1) สำหรับ filler ที่อยู่กลางคำที่ STT รวมไว้
+    end_fraction: float
+
+    def times(self, starts, ends):
+        """(เวลาเริ่ม, เวลาจบ) โดยประมาณตามสัดส่วนตัวอักษรภายในคำ"""
+        start = starts[self.first] + (ends[self.first] - starts[self.first]) * self.start_fraction
+        end = starts[self.last] + (ends[self.last] - starts[self.last]) * self.end_fraction
+        return float(start), float(end)
+
+    def to_dict(self, starts, ends):
+        start, end = self.times(starts, ends)
+        return {"phrase": self.phrase, "word_index": self.first, "Start (s)": round(start, 3), "End (s)": round(end, 3)}
+
+
+class FillerMatcher:
+    """Aho-Corasick automaton ของ filler และคำยกเว้นทั้งหมดของภาษาหนึ่ง (แปลงเป็น DFA แล้ว: หนึ่ง dict lookup ต่อตัวอักษร)"""
+
+    def __init__(self, fillers, exclude=(), join=" ", default_match=WORD):
+        self.join = join
+        patterns = []  # (phrase, ข้อความที่ normalize แล้ว, "word" | "anywhere" | None สำหรับคำยกเว้น)
+        for filler in fillers:
+            if isinstance(filler, str):
+                filler = {"phrase": filler}
+            patterns.append((filler["phrase"], self.normalize(filler["phrase"]), filler.get("match", default_match)))
+        patterns.extend((word, self.normalize(word), None) for word in exclude)
+        self.patterns = [pattern for pattern in patterns if pattern[1]]
+        self.max_length = max((len(pattern[1]) for pattern in self.patterns), default=1)
+        self._delta, self._outputs = self._build()
+
+    @classmethod
+    def from_lexicon(cls, lexicon):
+        return cls(lexicon["fillers"], lexicon.get("exclude", ()), lexicon.get("join", " "), lexicon.get("match", WORD))
+
+    def normalize(self, phrase):
+        return self.join.join(normalize_token(token) for token in phrase.split())
+
+    def _build(self):
+        goto, outputs = [{}], [[]]
+        for index, (_, text, _) in enumerate(self.patterns):
+            state = 0
+            for ch in text:
+                if ch not in goto[state]:
+                    goto[state][ch] = len(goto)
+                    goto.append({}); outputs.append([])
+                state = goto[state][ch]
+            outputs[state].append(index)
+
+        # BFS: fail link ของแต่ละ state แล้วรวม transition ของ fail link เข้ามา (ไม่ต้องไล่ fail link ตอนสแกน)
+        fail = [0] * len(goto)
+        delta = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            delta[state] = dict(delta[fail[state]])
+            for ch, child in goto[state].items():
+                fail[child] = delta[fail[state]].get(ch, 0) if state else 0
+                delta[state][ch] = child
+                queue.append(child)
+        return delta, [tuple(output) for output in outputs]
+
+    @property
+    def word_only(self):
+        """
+        ทุก filler ต้องตรงขอบคำ ไม่มีคำยกเว้น และต่อคำด้วยตัวคั่น (เช่นภาษาอังกฤษ): match คือลำดับคำที่ตรงกับคำของวลีพอดี
+        จึงหาได้จาก id ของคำโดยไม่ต้องสแกนทีละตัวอักษร (ดู longsorn.timeline.filler_match_columns)
+        """
+        return bool(self.join) and all(kind == WORD for _, _, kind in self.patterns)
+
+    def token_roles(self, tokens):
+        """
+        บทบาทที่แต่ละคำ (normalize แล้ว) เป็นได้ใน match ของ filler หรือคำยกเว้น คืนค่า list ของ (contains, starts, ends, inside):
+        contains = มี pattern ทั้งตัวอยู่ในคำ, starts = ท้ายคำเป็นต้นของ pattern, ends = ต้นคำเป็นท้ายของ pattern,
+        inside = ทั้งคำเป็นส่วนกลางของ pattern  (match ที่คร่อมหลายคำเป็น starts, inside..., ends ตามลำดับ)
+        """
+        texts = [text for _, text, _ in self.patterns]
+        substrings = {text[i:j] for text in texts for i in range(len(text)) for j in range(i + 1, len(text) + 1)} | {""}
+        suffixes = {text[i:] for text in texts for i in range(len(text))}
+        delta, outputs = self._delta, self._outputs
+        roles = []
+        for token in tokens:
+            state, contains = 0, False
+            for ch in token:
+                state = delta[state].get(ch, 0)
+                contains = contains or bool(outputs[state])
+            ends = any(token[:k] in suffixes for k in range(1, min(len(token), self.max_length) + 1))
+            roles.append((contains, state != 0, ends, token in substrings))
+        return roles
+
+    def scanner(self):
+        return FillerScanner(self)
+
+    def find(self, tokens):
+        """filler ทั้งหมดใน tokens (normalize แล้ว) คืนค่า list ของ FillerMatch เรียงตามตำแหน่ง"""
+        scanner = FillerScanner(self)
+        scanner.feed_many(tokens)
+        return scanner.finish()
+
+
+class FillerScanner:
+    """
+    สแกนทีละคำต่อจาก state เดิม (ใช้ทั้งกับทั้งไฟล์และโหมด Live) match ที่ตัดสินแล้วอยู่ใน matches
+    match ที่ยังอาจถูกคำยกเว้นหรือ filler ที่ยาวกว่าแทนที่ได้รออยู่ใน pending จนสแกนเลยไปอีก max_length ตัวอักษร
+    ทับกันให้ตัวที่เริ่มก่อนได้ก่อน เริ่มพร้อมกันให้ตัวที่ยาวกว่า (เช่น 'แบบว่า' กับ 'แบบ')
+    """
+
+    def __init__(self, matcher):
+        self.matcher = matcher
+        self.matches = []
+        self.pending = []  # (ตำแหน่งเริ่ม, ตำแหน่งจบ, index ของ pattern)
+        self.word_count = 0
+        self._tokens = []  # คำที่ยังต้องใช้ตรวจขอบคำ (เริ่มที่คำ index _first_token)
+        self._token_starts = []  # ตำแหน่งตัวอักษรแรกของแต่ละคำในข้อความที่ต่อกัน
+        self._first_token = 0
+        self._state = 0
+        self._length = 0
+        self._accepted_end = 0  # ตำแหน่งจบของ filler ล่าสุดที่นับแล้ว
+
+    def feed(self, token):
+        """เพิ่มคำ (normalize แล้ว) หนึ่งคำ"""
+        self.feed_many((token,))
+
+    def feed_many(self, tokens):
+        """เพิ่มหลายคำ (normalize แล้ว) โดยต่อเป็นข้อความเดียวแล้วสแกนในรอบเดียว ผลเหมือนเรียก feed ทีละคำ"""
+        tokens = list(tokens)
+        if not tokens:
+            return
+        join = self.matcher.join
+        text = (join if self.word_count else "") + join.join(tokens)
+        position = self._length + len(text) - len(join.join(tokens))
+        for token in tokens:
+            self._token_starts.append(position)
+            position += len(token) + len(join)
+        self._tokens.extend(tokens)
+        self.word_count += len(tokens)
+
+        delta, outputs = self.matcher._delta, self.matcher._outputs
+        state, found = self._state, []
+        for position, ch in enumerate(text, self._length + 1):
+            state = delta[state].get(ch, 0)
+            if outputs[state]:
+                found.append((position, outputs[state]))
+        self._state = state
+        self._length += len(text)
+        patterns = self.matcher.patterns
+        for end, indexes in found:
+            for index in indexes:
+                self._add_candidate(end - len(patterns[index][1]), end, index)
+        self._settle(final=False)
+
+    def finish(self):
+        """ตัดสิน match ที่เหลือทั้งหมด (จบ transcript) คืนค่า matches"""
+        self._settle(final=True)
+        return self.matches
+
+    def provisional(self):
+        """match ใน pending ที่จะถูกนับถ้า transcript จบตรงนี้ (สำหรับแสดงผลระหว่างพูด ไม่เปลี่ยน state)"""
+        accepted, _, _ = self._resolve(final=True)
+        return accepted
+
+    def _token_index(self, position):
+        """index (ใน _tokens) ของคำที่มีตัวอักษรตำแหน่ง position"""
+        return bisect.bisect_right(self._token_starts, position) - 1
+
+    def _add_candidate(self, start, end, index):
+        first, last = self._token_index(start), self._token_index(end - 1)
+        start_offset, end_offset = start - self._token_starts[first], end - self._token_starts[last]
+        at_word_start, at_word_end = start_offset == 0, end_offset == len(self._tokens[last])
+        if self.matcher.patterns[index][2] == WORD:
+            if not (at_word_start and at_word_end):
+                return
+        # ขอบคำของ STT ถือเป็นขอบพยางค์เสมอ ตรวจเฉพาะขอบที่อยู่กลางคำ
+        elif splits_syllable("" if at_word_start else self._tokens[first][start_offset - 1],
+                             "" if at_word_end else self._tokens[last][end_offset]):
+            return
+        self.pending.append((start, end, index))
+
+    def _resolve(self, final):
+        """คืนค่า (FillerMatch ที่ตัดสินได้, pending ที่เหลือ, ตำแหน่งจบของ filler สุดท้ายที่นับ)"""
+        patterns = self.matcher.patterns
+        limit = self._length + 1 - self.matcher.max_length  # match ที่ยังไม่ได้สแกนเจอเริ่มที่ตำแหน่ง >= limit
+        exclusions = [candidate for candidate in self.pending if patterns[candidate[2]][2] is None]
+        accepted, remaining, accepted_end = [], [], self._accepted_end
+        for candidate in sorted(self.pending, key=lambda c: (c[0], c[0] - c[1])):
+            start, end, index = candidate
+            if patterns[index][2] is None:
+                continue
+            if remaining or (not final and end > limit):
+                remaining.append(candidate)
+                continue
+            if start < accepted_end or any(e_start < end and start < e_end for e_start, e_end, _ in exclusions):
+                continue
+            first, last = self._token_index(start), self._token_index(end - 1)
+            accepted.append(FillerMatch(
+                first=self._first_token + first, last=self._first_token + last, phrase=patterns[index][0],
+                start_fraction=(start - self._token_starts[first]) / max(len(self._tokens[first]), 1),
+                end_fraction=(end - self._token_starts[last]) / max(len(self._tokens[last]), 1),
+            ))
+            accepted_end = end
+        if not final:
+            # คำยกเว้นยังต้องใช้ถ้าอาจทับ filler ที่ยังไม่ตัดสินหรือที่ยังไม่ได้สแกนเจอ
+            horizon = min([limit] + [candidate[0] for candidate in remaining])
+            remaining.extend(e for e in exclusions if e[1] > horizon)
+        return accepted, remaining, accepted_end
+
+    def _settle(self, final):
+        if self.pending:
+            accepted, self.pending, self._accepted_end = self._resolve(final)
+            self.matches.extend(accepted)
+        if len(self._tokens) >= 2 * PRUNE_TOKENS:
+            # ทิ้งคำที่ไม่มี match ใดเริ่มได้อีกแล้ว (เก็บไว้หนึ่งตัวอักษรก่อนหน้าสำหรับตรวจขอบพยางค์)
+            keep_from = min([self._length - self.matcher.max_length] + [candidate[0] for candidate in self.pending]) - 1
+            drop = max(self._token_index(keep_from) - 1, 0)
+            del self._tokens[:drop], self._token_starts[:drop]
+            self._first_token += drop
+
+
+_matchers = {}
+_matchers_lock = threading.Lock()
+
+
+def get_matcher(language):
+    """FillerMatcher ของภาษา สร้างครั้งแรกที่ใช้แล้วใช้ร่วมกันทุก thread (อ่านอย่างเดียวหลังสร้าง)"""
+    key = lexicon_language(language)
+    with _matchers_lock:
+        if key not in _matchers:
+            _matchers[key] = FillerMatcher.from_lexicon(load_lexicon(key))
+        return _matchers[key]
@@ -0,0 +1,184 @@
+"""
+ประวัติผลวิเคราะห์ข้าม session (SQLite โหมด WAL ไฟล์เดียว ไม่ต้องมี server): หนึ่งแถวต่อการวิเคราะห์ของผู้สอนหนึ่งคน
+ค่าสถิติเก็บเป็น column (index ตามผู้สอน + เวลา และตาม hash ของวิดีโอ) ส่วน word timeline เก็บแยกตารางเป็น array แบบ column
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from array import array
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".cache", "longsorn", "history.sqlite3")
+# metric ที่ใช้กับ trend() ได้ -> expression ของ SQL (ชื่อ column ไม่ได้มาจากผู้ใช้โดยตรง)
+TREND_METRICS = {
+    "wpm": "wpm",
+    "filler_per_minute": "filler_count * 60.0 / duration_seconds",
+    "filler_count": "filler_count",
+    "long_pauses": "long_pauses",
+    "clarity": "NULLIF(clarity, 0)",  # 0 = อ่านคะแนนไม่ได้ ไม่นำมาเฉลี่ย
+    "duration_seconds": "duration_seconds",
+}
+BUCKET_SECONDS = {"day": 86400, "week": 7 * 86400, "month": 30 * 86400}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    video_hash TEXT NOT NULL,
+    job_id TEXT,
+    created_at REAL NOT NULL,
+    file_name TEXT,
+    description TEXT,
+    duration_seconds REAL,
+    word_count INTEGER,
+    wpm REAL,
+    filler_count INTEGER,
+    long_pauses INTEGER,
+    clarity REAL,
+    pace TEXT,
+    summary TEXT,
+    UNIQUE (user_id, job_id)
+);
+CREATE INDEX IF NOT EXISTS analyses_user_time ON analyses (user_id, created_at);
+CREATE INDEX IF NOT EXISTS analyses_video ON analyses (video_hash, created_at);
+CREATE TABLE IF NOT EXISTS word_timelines (
+    analysis_id INTEGER PRIMARY KEY REFERENCES analyses (id) ON DELETE CASCADE,
+    words BLOB NOT NULL,
+    starts BLOB NOT NULL,
+    ends BLOB NOT NULL
+);
+"""
+
+_INSERT_ANALYSIS = """
+INSERT OR IGNORE INTO analyses (user_id, video_hash, job_id, created_at, file_name, description, duration_seconds, word_count, wpm,
+                                filler_count, long_pauses, clarity, pace, summary)
+VALUES (:user_id, :video_hash, :job_id, :created_at, :file_name, :description, :duration_seconds, :word_count, :wpm,
+        :filler_count, :long_pauses, :clarity, :pace, :summary)
+"""
+
+
+def _pack_floats(values):
+    """float32 little-endian (ใช้ array ของ standard library: หน้าเว็บไม่ต้อง import NumPy)"""
+    packed = array("f", values)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return zlib.compress(packed.tobytes())
+
+
+def _unpack_floats(blob):
+    values = array("f")
+    values.frombytes(zlib.decompress(blob))
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tolist()
+
+
+def encode_word_timeline(word_timeline):
+    """{"words", "starts", "ends"} -> blob (zlib) ของคำคั่นด้วย \\n และเวลาเป็น float32"""
+    words = zlib.compress("\n".join(word_timeline["words"]).encode("utf-8"))
+    return words, _pack_floats(word_timeline["starts"]), _pack_floats(word_timeline["ends"])
+
+
+def decode_word_timeline(words, starts, ends):
+    text = zlib.decompress(words).decode("utf-8")
+    return {"words": text.split("\n") if text else [], "starts": _unpack_floats(starts), "ends": _unpack_floats(ends)}
+
+
+def analysis_row(user_id, video_hash, nlp_results, job_id=None, file_name=None, description="", created_at=None):
+    """แปลงผลของ run_pipeline เป็นแถวของตาราง analyses (summary = ข้อมูลที่หน้า history แสดง ไม่รวม timeline)"""
+    delivery = nlp_results.get("delivery_stats", {})
+    analysis = nlp_results["speech_analysis"]
+    summary = {"keywords": nlp_results.get("keywords", []), "timeline_feedback": nlp_results.get("timeline_feedback", []),
+               "clarity_justification": analysis.get("Clarity Justification"), "speech_features": (nlp_results.get("speech_features") or {}).get("summary")}
+    return {
+        "user_id": user_id, "video_hash": video_hash, "job_id": job_id, "created_at": created_at or time.time(),
+        "file_name": file_name, "description": description, "duration_seconds": delivery.get("duration_seconds"),
+        "word_count": delivery.get("word_count"), "wpm": delivery.get("wpm"), "filler_count": analysis.get("Filler Words Detected"),
+        "long_pauses": analysis.get("Long Pauses"), "clarity": analysis.get("Clarity Score"), "pace": analysis.get("Speaking Pace"),
+        "summary": json.dumps(summary, ensure_ascii=False),
+    }
+
+
+class AnalysisStore:
+    """
+    หนึ่ง connection ต่อ thread (sqlite3 ใช้ข้าม thread ไม่ได้) ทุก thread/process เปิดไฟล์เดียวกันได้
+    WAL ทำให้การอ่าน (หน้า history) ไม่ถูกบล็อกโดยการเขียนจาก worker
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("LONGSORN_HISTORY_DB") or DEFAULT_DB_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._local = threading.local()
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")  # WAL + NORMAL: ไม่เสียข้อมูลเมื่อ process ล้ม (อาจเสียรายการล่าสุดถ้าไฟดับ)
+            connection.execute("PRAGMA foreign_keys=ON")
+            self._local.connection = connection
+        return connection
+
+    def add(self, user_id, video_hash, nlp_results, **fields):
+        """บันทึกหนึ่งการวิเคราะห์ คืนค่า id (None ถ้าผู้สอนคนนี้บันทึก job นี้ไปแล้ว)"""
+        return self.add_many([(user_id, video_hash, nlp_results, fields)])[0]
+
+    def add_many(self, entries):
+        """
+        บันทึกหลายรายการใน transaction เดียว (สำหรับ batch) entries: (user_id, video_hash, nlp_results, fields)
+        โดย fields เป็น keyword ของ analysis_row คืนค่า list ของ id ตามลำดับ
+        """
+        connection = self._connect()
+        ids = []
+        with connection:
+            for user_id, video_hash, nlp_results, fields in entries:
+                cursor = connection.execute(_INSERT_ANALYSIS, analysis_row(user_id, video_hash, nlp_results, **fields))
+                if cursor.rowcount == 0:
+                    ids.append(None)
+                    continue
+                ids.append(cursor.lastrowid)
+                word_timeline = nlp_results.get("word_timeline")
+                if word_timeline:
+                    connection.execute("INSERT INTO word_timelines VALUES (?, ?, ?, ?)", (cursor.lastrowid, *encode_word_timeline(word_timeline)))
+        return ids
+
+    def history(self, user_id, limit=50, offset=0):
+        """การวิเคราะห์ของผู้สอน ใหม่สุดก่อน (ไม่รวม word timeline)"""
+        rows = self._connect().execute(
+            "SELECT * FROM analyses WHERE user_id = ? ORDER BY created_at DESC LIMIT ? OFFSET ?", (user_id, limit, offset)).fetchall()
+        return [{**dict(row), "summary": json.loads(row["summary"] or "{}")} for row in rows]
+
+    def for_video(self, video_hash):
+        rows = self._connect().execute(
+            "SELECT id, user_id, created_at, wpm, filler_count, clarity FROM analyses WHERE video_hash = ? ORDER BY created_at", (video_hash,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def trend(self, user_id, metric="wpm", bucket=None, since=None):
+        """
+        ค่าเฉลี่ยของ metric ตามเวลา: bucket=None คืนทุกการวิเคราะห์, "day"/"week"/"month" รวมเป็นช่วง
+        คืนค่า list ของ {"start": epoch วินาที, "value": ค่าเฉลี่ย, "count": จำนวนการวิเคราะห์}
+        """
+        expression = TREND_METRICS[metric]
+        if bucket is None:
+            query = f"SELECT created_at AS start, {expression} AS value, 1 AS count FROM analyses WHERE user_id = ? AND created_at >= ? ORDER BY created_at"
+            params = (user_id, since or 0)
+        else:
+            seconds = BUCKET_SECONDS[bucket]
+            query = (f"SELECT CAST(created_at / ? AS INTEGER) * ? AS start, AVG({expression}) AS value, COUNT(*) AS count "
+                     f"FROM analyses WHERE user_id = ? AND created_at >= ? GROUP BY CAST(created_at / ? AS INTEGER) ORDER BY start")
+            params = (seconds, seconds, user_id, since or 0, seconds)
+        return [dict(row) for row in self._connect().execute(query, params)]
+
+    def word_timeline(self, analysis_id):
+        row = self._connect().execute("SELECT words, starts, ends FROM word_timelines WHERE analysis_id = ?", (analysis_id,)).fetchone()
+        return decode_word_timeline(*row) if row else None
+
+    def delete_user(self, user_id):
+        with self._connect() as connection:
+            return connection.execute("DELETE FROM analyses WHERE user_id = ?", (user_id,)).rowcount
@@ -0,0 +1,114 @@
+"""ขั้นตอนรับไฟล์: แปลงไฟล์เสียง/วิดีโอเป็น PCM ด้วย ffmpeg เพียงครั้งเดียว"""
+import os
+import re
+import subprocess
+import tempfile
+from dataclasses import dataclass
+
+SAMPLE_RATE = 16000
+BYTES_PER_SECOND = SAMPLE_RATE * 2  # mono, pcm_s16le
+
+# encoding ที่ใช้ส่งเสียงไป STT -> (codec, format) ของ ffmpeg, LINEAR16 ส่ง PCM ตรง ๆ
+TRANSPORT_CODECS = {
+    "LINEAR16": None,
+    "FLAC": (["-c:a", "flac", "-compression_level", "5"], "flac"),
+    "OGG_OPUS": (["-c:a", "libopus", "-b:a", "32k", "-application", "voip"], "ogg"),
+}
+TRANSPORT_ENCODINGS = tuple(TRANSPORT_CODECS)
+# FLAC เป็น lossless: ผลถอดเสียงเหมือน LINEAR16 แต่ขนาดที่อัปโหลดเล็กกว่ามาก
+DEFAULT_TRANSPORT_ENCODING = "FLAC"
+
+_DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+# ไฟล์ mp4/mov ที่ moov atom อยู่ท้ายไฟล์ อ่านผ่าน pipe ไม่ได้ ต้องใช้ไฟล์ที่ seek ได้
+_NEEDS_SEEK_MARKERS = ("moov atom not found", "Invalid data found when processing input")
+
+
+@dataclass
+class IngestResult:
+    pcm: bytes  # raw LINEAR16, 16 kHz, mono (ไม่มี WAV header)
+    duration: float  # ความยาวของไฟล์ต้นฉบับ (วินาที)
+    sample_rate: int = SAMPLE_RATE
+
+    @property
+    def pcm_duration(self):
+        return len(self.pcm) / BYTES_PER_SECOND
+
+
+def build_ffmpeg_command(input_target, trim_duration=None):
+    command = ["ffmpeg", "-hide_banner"]
+    if input_target != "pipe:0":
+        command.append("-nostdin")
+    command.extend(["-i", input_target, "-vn", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "-ac", "1"])
+    if trim_duration:
+        command.extend(["-t", str(trim_duration)])
+    command.extend(["-f", "s16le", "pipe:1"])
+    return command
+
+
+def parse_duration(stderr_text):
+    """อ่านค่า Duration ที่ ffmpeg พิมพ์ออกมาตอนเปิดไฟล์ (คืนค่า None ถ้าเป็น N/A)"""
+    match = _DURATION_RE.search(stderr_text)
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def _run_ffmpeg(command, input_bytes=None):
+    proc = subprocess.run(command, input=input_bytes, capture_output=True)
+    return proc.returncode, proc.stdout, proc.stderr.decode("utf-8", errors="replace")
+
+
+def ingest_media(source, suffix=None, trim_duration=None):
+    """
+    แปลงไฟล์ที่อัปโหลดเป็น PCM 16 kHz และหาความยาวไฟล์ในการรัน ffmpeg ครั้งเดียว
+    source เป็น path ของไฟล์ (ffmpeg อ่านเองโดยตรง) หรือ bytes (ส่งผ่าน stdin/stdout โดยไม่เขียนไฟล์ชั่วคราว
+    ยกเว้นไฟล์ที่ต้อง seek เช่น mp4 ที่ moov อยู่ท้ายไฟล์)
+    """
+    try:
+        if isinstance(source, (str, os.PathLike)):
+            returncode, pcm, stderr_text = _run_ffmpeg(build_ffmpeg_command(os.fspath(source), trim_duration))
+        else:
+            returncode, pcm, stderr_text = _run_ffmpeg(build_ffmpeg_command("pipe:0", trim_duration), source)
+            if returncode != 0 and any(marker in stderr_text for marker in _NEEDS_SEEK_MARKERS):
+                # Fallback: เขียนไฟล์ครั้งเดียวแล้วรัน ffmpeg ตัวเดิม (ยังคงเป็น process เดียว)
+                with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_in:
+                    temp_in.write(source)
+                    input_filename = temp_in.name
+                try:
+                    returncode, pcm, stderr_text = _run_ffmpeg(build_ffmpeg_command(input_filename, trim_duration))
+                finally:
+                    os.remove(input_filename)
+        if returncode != 0:
+            return None, stderr_text.strip().splitlines()[-1] if stderr_text.strip() else f"ffmpeg exited with {returncode}"
+
+        duration = parse_duration(stderr_text)
+        if duration is None:
+            # ไม่มี Duration ใน header (เช่น stream ที่ไม่มีข้อมูลความยาว) ใช้ความยาว PCM ที่ถอดได้แทน
+            duration = len(pcm) / BYTES_PER_SECOND
+        return IngestResult(pcm=pcm, duration=duration), None
+    except Exception as e:
+        return None, str(e)
+
+
+def encode_pcm(pcm, encoding, sample_rate=SAMPLE_RATE):
+    """บีบอัด PCM (s16le mono) เป็น encoding ที่ STT รองรับ ผ่าน ffmpeg stdin/stdout, LINEAR16 คืน PCM เดิม"""
+    if TRANSPORT_CODECS[encoding] is None:
+        return pcm
+    codec_args, container = TRANSPORT_CODECS[encoding]
+    command = ["ffmpeg", "-hide_banner", "-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0",
+               *codec_args, "-f", container, "pipe:1"]
+    returncode, encoded, stderr_text = _run_ffmpeg(command, pcm)
+    if returncode != 0:
+        raise RuntimeError(stderr_text.strip().splitlines()[-1] if stderr_text.strip() else f"ffmpeg exited with {returncode}")
+    return encoded
+
+
+def decode_audio(content, encoding, sample_rate=SAMPLE_RATE):
+    """แปลงเสียงที่บีบอัดด้วย encode_pcm กลับเป็น PCM (ใช้ใน fake และ benchmark)"""
+    if TRANSPORT_CODECS[encoding] is None:
+        return content
+    returncode, pcm, stderr_text = _run_ffmpeg(build_ffmpeg_command("pipe:0"), content)
+    if returncode != 0:
+        raise RuntimeError(stderr_text.strip().splitlines()[-1] if stderr_text.strip() else f"ffmpeg exited with {returncode}")
+    return pcm
@@ -0,0 +1,214 @@
+"""
+Job queue ภายใน process สำหรับรัน pipeline เบื้องหลัง (ไม่ผูกกับ script thread ของ Streamlit)
+Backend มี interface แบบเดียวกับที่ Redis backend ใช้ได้ (claim = SET NX, enqueue/dequeue = LPUSH/BRPOP, save/load = SET/GET)
+"""
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from dataclasses import asdict, dataclass, field, replace
+
+JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED = "queued", "running", "done", "failed"
+DEFAULT_WORKERS = 2
+DEFAULT_JOB_TTL_SECONDS = 60 * 60
+DEFAULT_JOB_DIR = os.path.join(os.path.expanduser("~"), ".cache", "longsorn", "jobs")
+# ลบไฟล์ผลลัพธ์ที่หมดอายุใน result_dir ไม่บ่อยกว่านี้ (วินาที)
+SWEEP_INTERVAL_SECONDS = 60
+
+
+def is_complete_result(result):
+    """ผลที่ไม่มีคำเตือนและไม่มีช่วงที่วิเคราะห์ไม่สำเร็จ (ผลที่ไม่ครบไม่ถูกบันทึกหรือใช้ซ้ำ ส่งไฟล์เดิมแล้ววิเคราะห์ใหม่ได้)"""
+    if not isinstance(result, dict):
+        return result is not None
+    return not result.get("warnings") and not (result.get("timings") or {}).get("failed_sections")
+
+
+def job_key(file_hash, **params):
+    """Job ที่ไฟล์และพารามิเตอร์เหมือนกันได้ key เดียวกัน (ใช้เป็น job id เพื่อรวมงานซ้ำ)"""
+    payload = json.dumps({"file": file_hash, **params}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+@dataclass
+class Job:
+    id: str
+    payload: dict
+    sessions: list = field(default_factory=list)
+    status: str = JOB_QUEUED
+    progress: int = 0
+    message: str = ""
+    events: list = field(default_factory=list)  # feedback event ที่ได้ระหว่างทาง (ให้ UI แสดงก่อนงานเสร็จ)
+    result: dict = None
+    error: str = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    @property
+    def finished(self):
+        return self.status in (JOB_DONE, JOB_FAILED)
+
+    @property
+    def reusable(self):
+        """งานที่ submit ซ้ำแล้วใช้ต่อได้: ยังไม่เสร็จ หรือเสร็จโดยได้ผลครบ"""
+        return not self.finished or (self.status == JOB_DONE and is_complete_result(self.result))
+
+
+class InMemoryJobBackend:
+    """
+    เก็บ job ในหน่วยความจำ และบันทึก job ที่เสร็จแล้วได้ผลครบเป็น JSON บนดิสก์ (อ่านกลับได้หลัง restart)
+    ทั้ง job ในหน่วยความจำและไฟล์บนดิสก์หมดอายุหลัง ttl_seconds
+    """
+
+    def __init__(self, result_dir=None, ttl_seconds=DEFAULT_JOB_TTL_SECONDS):
+        self.result_dir = result_dir or os.getenv("LONGSORN_JOB_DIR") or DEFAULT_JOB_DIR
+        self.ttl_seconds = ttl_seconds
+        self._jobs = {}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        os.makedirs(self.result_dir, exist_ok=True)
+
+    def _path(self, job_id):
+        return os.path.join(self.result_dir, f"{job_id}.json")
+
+    def _remove_persisted(self, job_id):
+        try:
+            os.remove(self._path(job_id))
+        except OSError:
+            pass
+
+    def _load_persisted(self, job_id):
+        """job ที่บันทึกไว้ ถ้าหมดอายุหรือใช้ซ้ำไม่ได้จะลบไฟล์ทิ้งและคืนค่า None"""
+        try:
+            with open(self._path(job_id), encoding="utf-8") as f:
+                job = Job(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+        if job.updated_at < time.time() - self.ttl_seconds or not job.reusable:
+            self._remove_persisted(job_id)
+            return None
+        return job
+
+    def claim(self, job):
+        """
+        บันทึก job ใหม่ถ้ายังไม่มี job id นี้ที่ยังใช้ได้ (กำลังรัน หรือเสร็จแล้วได้ผลครบ)
+        คืนค่า (job ที่ใช้จริง, True ถ้าเป็น job ใหม่ที่ต้อง enqueue)
+        """
+        with self._lock:
+            self._expire()
+            existing = self._jobs.get(job.id) or self._load_persisted(job.id)
+            if existing is not None and existing.reusable:
+                self._jobs[job.id] = existing
+                return existing, False
+            self._jobs[job.id] = job
+            return job, True
+
+    def enqueue(self, job_id):
+        self._queue.put(job_id)
+
+    def dequeue(self, timeout=None):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def load(self, job_id):
+        """snapshot ของ job (แก้ไขไม่มีผลกับ job จริง)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return replace(job, sessions=list(job.sessions), events=list(job.events))
+        return self._load_persisted(job_id)
+
+    def update(self, job_id, **changes):
+        with self._lock:
+            job = self._jobs[job_id]
+            for name, value in changes.items():
+                setattr(job, name, value)
+            job.updated_at = time.time()
+            if job.status == JOB_DONE and job.reusable:
+                self._persist(job)
+            return job
+
+    def append_event(self, job_id, event):
+        with self._lock:
+            self._jobs[job_id].events.append(event)
+
+    def _persist(self, job):
+        temp_path = self._path(job.id) + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(asdict(job), f, ensure_ascii=False)
+        os.replace(temp_path, self._path(job.id))
+
+    def _expire(self):
+        now = time.time()
+        deadline = now - self.ttl_seconds
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished and job.updated_at < deadline]:
+            del self._jobs[job_id]
+            self._remove_persisted(job_id)
+        if now - self._last_sweep >= SWEEP_INTERVAL_SECONDS:
+            self._last_sweep = now
+            self._sweep_result_dir(deadline)
+
+    def _sweep_result_dir(self, deadline):
+        """ลบไฟล์ผลลัพธ์ที่ไม่ถูกเขียนใหม่หลัง deadline (รวมไฟล์จาก process ก่อน restart)"""
+        try:
+            entries = list(os.scandir(self.result_dir))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if entry.name.endswith(".json") and entry.stat().st_mtime < deadline:
+                    os.remove(entry.path)
+            except OSError:
+                continue
+
+
+class JobExecutor:
+    """
+    Worker pool ที่ดึง job จาก backend แล้วเรียก handler(job, progress, on_event) ซึ่งคืนค่า (result, error)
+    """
+
+    def __init__(self, handler, backend=None, workers=DEFAULT_WORKERS):
+        self.handler = handler
+        self.backend = backend or InMemoryJobBackend()
+        self._threads = [threading.Thread(target=self._work, name=f"longsorn-job-{i}", daemon=True) for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, session_id, file_hash, payload, **params):
+        """ส่งงาน ถ้ามีงานเดียวกัน (ไฟล์ + params เดียวกัน) กำลังรันหรือเสร็จแล้ว จะคืน job เดิมแทนการรันซ้ำ"""
+        job, is_new = self.backend.claim(Job(id=job_key(file_hash, **params), payload=payload, sessions=[session_id]))
+        if not is_new and session_id not in job.sessions:
+            self.backend.update(job.id, sessions=job.sessions + [session_id])
+        if is_new:
+            self.backend.enqueue(job.id)
+        return job
+
+    def get(self, job_id):
+        return self.backend.load(job_id)
+
+    def _work(self):
+        while True:
+            job_id = self.backend.dequeue()
+            job = self.backend.load(job_id)
+            if job is None:
+                continue
+            self.backend.update(job_id, status=JOB_RUNNING)
+
+            def progress(percent, text, job_id=job_id):
+                self.backend.update(job_id, progress=percent, message=text)
+
+            def on_event(event, job_id=job_id):
+                self.backend.append_event(job_id, event)
+
+            try:
+                result, error = self.handler(job, progress, on_event)
+            except Exception as e:
+                result, error = None, str(e)
+            if error:
+                self.backend.update(job_id, status=JOB_FAILED, error=error)
+            else:
+                self.backend.update(job_id, status=JOB_DONE, result=result, progress=100)
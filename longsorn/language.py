@@ -0,0 +1,76 @@
+"""
+ตรวจภาษาพูดจากเสียง: ถอดเสียงช่วงสั้น ๆ ไม่กี่ช่วงที่กระจายทั่วไฟล์ด้วย alternative_language_codes ของ Google STT
+แล้วถอดเสียงทั้งไฟล์ครั้งเดียวด้วยภาษาที่ STT เลือก (ถ่วงตามจำนวนตัวอักษรที่ถอดได้ในแต่ละภาษา)
+"""
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from longsorn.ingest import DEFAULT_TRANSPORT_ENCODING, SAMPLE_RATE, encode_pcm
+from longsorn.resilience import stt_caller as shared_stt_caller
+
+AUTO = "auto"
+SUPPORTED_LANGUAGE_CODES = ("th-TH", "en-US")  # ตัวแรกเป็นภาษาหลักและเป็นค่าเริ่มต้นเมื่อตัดสินไม่ได้
+DETECTION_WINDOWS = 3
+WINDOW_SECONDS = 8.0
+
+
+def sample_windows(n_samples, sample_rate=SAMPLE_RATE, windows=DETECTION_WINDOWS, window_seconds=WINDOW_SECONDS):
+    """ช่วง [start, end) (หน่วย sample) ยาว window_seconds จำนวน windows ช่วง กระจายเท่า ๆ กันทั่วเสียง"""
+    window = int(window_seconds * sample_rate)
+    if n_samples <= window * windows:
+        return [(0, min(n_samples, window * windows))] if n_samples else []
+    centers = [int(n_samples * (i + 0.5) / windows) for i in range(windows)]
+    return [(center - window // 2, center - window // 2 + window) for center in centers]
+
+
+def language_cache_key(audio_digest, candidates=SUPPORTED_LANGUAGE_CODES):
+    payload = json.dumps({"language_of": audio_digest, "candidates": list(candidates)}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def match_language_code(reported, candidates):
+    """language_code ที่ STT ส่งกลับ (มักเป็นตัวพิมพ์เล็ก เช่น 'en-us') -> รหัสใน candidates"""
+    reported = (reported or "").lower()
+    for code in candidates:
+        if code.lower() == reported:
+            return code
+    for code in candidates:
+        if reported and code.split("-")[0].lower() == reported.split("-")[0]:
+            return code
+    return candidates[0]
+
+
+def detect_language(client, pcm, sample_rate=SAMPLE_RATE, candidates=SUPPORTED_LANGUAGE_CODES, encoding=DEFAULT_TRANSPORT_ENCODING,
+                    windows=DETECTION_WINDOWS, window_seconds=WINDOW_SECONDS, stats=None, caller=None):
+    """
+    ส่งแต่ละช่วงไป recognize พร้อมกัน (ภาษาหลัก candidates[0], ที่เหลือเป็น alternative_language_codes)
+    คืนค่า ({"language_code", "votes": {รหัสภาษา: จำนวนตัวอักษร}, "sampled_seconds"}, error)
+    """
+    from longsorn.stt import build_recognition_config  # stt ใช้ NumPy: หน้าเว็บ import ค่าคงที่ของโมดูลนี้ได้โดยไม่โหลด NumPy
+
+    caller = shared_stt_caller if caller is None else caller
+    try:
+        config = build_recognition_config(candidates[0], sample_rate, encoding)
+        config.update(alternative_language_codes=list(candidates[1:]), enable_automatic_punctuation=False, enable_word_time_offsets=False)
+        spans = sample_windows(len(pcm) // 2, sample_rate, windows, window_seconds)
+
+        def recognize(span):
+            start, end = span
+            content = encode_pcm(pcm[start * 2:end * 2], encoding, sample_rate)
+            return caller.call(client.recognize, config=config, audio={"content": content}, stats=stats)
+
+        with ThreadPoolExecutor(max_workers=max(1, len(spans))) as executor:
+            responses = list(executor.map(recognize, spans))
+
+        votes = dict.fromkeys(candidates, 0)
+        for response in responses:
+            for result in response.results:
+                if result.alternatives:
+                    code = match_language_code(getattr(result, "language_code", None), candidates)
+                    votes[code] += len("".join(result.alternatives[0].transcript.split()))
+        # เท่ากัน (รวมถึงไม่ได้ยินคำพูดเลย) ใช้ภาษาหลัก
+        language_code = max(candidates, key=lambda code: (votes[code], code == candidates[0]))
+        return {"language_code": language_code, "votes": votes, "sampled_seconds": sum(end - start for start, end in spans) / sample_rate}, None
+    except Exception as e:
+        return None, str(e)
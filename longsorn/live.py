@@ -0,0 +1,166 @@
+"""
+โหมด Live coaching: ส่งเฟรม PCM (ไมโครโฟนหรือไฟล์ที่เล่นซ้ำ) เข้า streaming_recognize
+และอัปเดตสถิติการพูด (pace, filler, long pause) ทีละคำแบบ O(1) โดยไม่คำนวณใหม่ทั้งไฟล์
+"""
+import time
+from collections import deque
+from itertools import chain
+
+from longsorn.analysis import classify_pace
+from longsorn.fillers import get_matcher
+from longsorn.ingest import SAMPLE_RATE
+from longsorn.phrase_index import normalize_token
+from longsorn.stt import build_recognition_config
+from longsorn.timeline import PACE_WINDOW_SECONDS, PAUSE_THRESHOLD_SECONDS
+
+FRAME_SECONDS = 0.1
+# Google STT ปิด streaming_recognize ที่ประมาณ 305 วินาที จึงเปิด stream ใหม่ก่อนถึงกำหนด
+STREAM_LIMIT_SECONDS = 290.0
+TIMELINE_WORDS = 500  # จำนวนคำล่าสุดที่เก็บไว้แสดงผล
+
+
+def iter_pcm_frames(pcm, sample_rate=SAMPLE_RATE, frame_seconds=FRAME_SECONDS, speed=None):
+    """แบ่ง PCM เป็นเฟรมแบบไมโครโฟน: speed=1.0 ส่งตามเวลาจริง, speed=None ส่งเร็วที่สุดเท่าที่ทำได้"""
+    frame_bytes = int(frame_seconds * sample_rate) * 2
+    started = time.perf_counter()
+    for position in range(0, len(pcm), frame_bytes):
+        if speed:
+            delay = position / (2 * sample_rate) / speed - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+        yield pcm[position:position + frame_bytes]
+
+
+def build_streaming_config(language_code, sample_rate=SAMPLE_RATE, interim_results=True):
+    """StreamingRecognitionConfig ในรูป dict (เฟรมเป็น PCM จึงใช้ LINEAR16)"""
+    return {"config": build_recognition_config(language_code, sample_rate, encoding="LINEAR16"), "interim_results": interim_results}
+
+
+def live_transcribe(client, frames, language_code="th-TH", sample_rate=SAMPLE_RATE, stream_limit_seconds=STREAM_LIMIT_SECONDS,
+                    on_interim=None):
+    """
+    ถอดเสียงจากเฟรมที่ทยอยเข้ามา yield รายการคำ [(word, start, end), ...] ของผลลัพธ์ final แต่ละชุด
+    เวลาเป็นวินาทีนับจากเฟรมแรก (ต่อเนื่องข้าม stream ที่เปิดใหม่ทุก stream_limit_seconds)
+    """
+    config = build_streaming_config(language_code, sample_rate)
+    frames = iter(frames)
+    offset = 0.0
+    while True:
+        first = next(frames, None)
+        if first is None:
+            return
+        sent_samples = 0
+
+        def requests():
+            nonlocal sent_samples
+            for frame in chain([first], frames):
+                sent_samples += len(frame) // 2
+                yield {"audio_content": frame}
+                if sent_samples >= stream_limit_seconds * sample_rate:
+                    return
+
+        for response in client.streaming_recognize(config, requests()):
+            for result in response.results:
+                if not result.alternatives:
+                    continue
+                alternative = result.alternatives[0]
+                if result.is_final:
+                    yield [(w.word, offset + w.start_time.total_seconds(), offset + w.end_time.total_seconds()) for w in alternative.words]
+                elif on_interim:
+                    on_interim(alternative.transcript)
+        offset += sent_samples / sample_rate
+
+
+class LiveStats:
+    """
+    สถิติการพูดที่อัปเดตทีละคำ (ค่าเดียวกับ compute_delivery_stats แต่ไม่ต้องสร้าง timeline ใหม่)
+    filler สแกนต่อเนื่องด้วย FillerScanner (automaton เดียวกับทั้งไฟล์) filler ที่ยังอาจถูกแทนด้วยตัวที่ยาวกว่านับแบบชั่วคราว
+    pace ปัจจุบันใช้หน้าต่างเวลาเลื่อน
+    """
+
+    def __init__(self, language="th", pause_threshold=PAUSE_THRESHOLD_SECONDS, window_seconds=PACE_WINDOW_SECONDS,
+                 matcher=None, timeline_words=TIMELINE_WORDS):
+        self.fillers = (matcher or get_matcher(language)).scanner()
+        self.pause_threshold = pause_threshold
+        self.window_seconds = window_seconds
+        self.timeline = deque(maxlen=timeline_words)  # (word, start, end) ของคำล่าสุด
+        self.word_count = 0
+        self.last_end = 0.0
+        self.filler_word_count = 0
+        self.filler_matches = []
+        self.long_pauses = 0
+        self.longest_pause = 0.0
+        self._window = deque()  # เวลาเริ่มของคำในหน้าต่าง pace ปัจจุบัน
+        self._provisional = []  # filler ที่ยังไม่ตัดสิน (นับรวมใน filler_word_count แล้ว)
+
+    def add_word(self, word, start, end):
+        index = self.word_count
+        if index:
+            pause = start - self.last_end
+            if pause >= self.pause_threshold:
+                self.long_pauses += 1
+            self.longest_pause = max(self.longest_pause, pause)
+        self.word_count += 1
+        self.last_end = max(self.last_end, end)
+        self.timeline.append((word, start, end))
+
+        self._window.append(start)
+        while self._window[0] < self.last_end - self.window_seconds:
+            self._window.popleft()
+
+        settled = len(self.fillers.matches)
+        self.fillers.feed(normalize_token(word))
+        self.filler_matches.extend(self._filler_dict(match) for match in self.fillers.matches[settled:])
+        self._provisional = [self._filler_dict(match) for match in self.fillers.provisional()]
+        self.filler_word_count = len(self.filler_matches) + len(self._provisional)
+
+    def _filler_dict(self, match):
+        # match อยู่ในไม่กี่คำล่าสุดเสมอ (ไม่เกินความยาว filler ที่ยาวที่สุด) จึงหาเวลาได้จาก timeline
+        offset = self.word_count - len(self.timeline)
+        starts = {match.first: self.timeline[match.first - offset][1], match.last: self.timeline[match.last - offset][1]}
+        ends = {match.first: self.timeline[match.first - offset][2], match.last: self.timeline[match.last - offset][2]}
+        return match.to_dict(starts, ends)
+
+    def add_words(self, words):
+        for word, start, end in words:
+            self.add_word(word, start, end)
+
+    @property
+    def duration_seconds(self):
+        return self.last_end if self.last_end > 0 else 1.0
+
+    @property
+    def wpm(self):
+        return self.word_count / self.duration_seconds * 60
+
+    @property
+    def current_wpm(self):
+        """WPM ใน window_seconds ล่าสุด"""
+        return len(self._window) * 60.0 / min(self.window_seconds, self.duration_seconds)
+
+    def snapshot(self):
+        return {
+            "word_count": self.word_count,
+            "duration_seconds": self.duration_seconds,
+            "wpm": self.wpm,
+            "current_wpm": self.current_wpm,
+            "pace": classify_pace(self.current_wpm),
+            "filler_word_count": self.filler_word_count,
+            "recent_fillers": (self.filler_matches[-5:] + self._provisional)[-5:],
+            "long_pauses": self.long_pauses,
+            "longest_pause": self.longest_pause,
+            "pause_threshold": self.pause_threshold,
+        }
+
+    def to_word_timestamps(self):
+        return [{"Word": word, "Start (s)": start, "End (s)": end} for word, start, end in self.timeline]
+
+
+def run_live_session(client, frames, language_code="th-TH", stats=None, on_update=None, on_interim=None, sample_rate=SAMPLE_RATE):
+    """ถอดเสียงแบบ streaming และเรียก on_update(stats) ทุกครั้งที่ได้ผล final คืนค่า LiveStats"""
+    stats = stats or LiveStats(language_code.split("-")[0].lower())
+    for words in live_transcribe(client, frames, language_code, sample_rate, on_interim=on_interim):
+        stats.add_words(words)
+        if on_update:
+            on_update(stats)
+    return stats
@@ -0,0 +1,110 @@
+"""ดัชนีสำหรับหาเวลาของวลีใน transcript (สร้างครั้งเดียวต่อการวิเคราะห์ แล้วค้นได้หลายวลี)"""
+import math
+import unicodedata
+from bisect import bisect_right
+from collections import defaultdict
+
+# จำนวนคำแรกของวลีที่ใช้เป็น key ของ hash (n-gram)
+NGRAM_SIZE = 3
+# การค้นแบบไม่สนช่องว่างจะลดวลีเหลือ prefix ที่ยาวที่สุดที่พบ แต่ต้องยาวอย่างน้อยเท่านี้ (ตัวอักษร)
+# และอย่างน้อย MIN_FUZZY_SHARE ของวลี ใช้เฉพาะวลีในภาษาที่ไม่เว้นวรรคระหว่างคำ (ภาษาอังกฤษ prefix สั้น ๆ ตรงกับที่อื่นได้ง่าย)
+MIN_FUZZY_CHARS = 6
+MIN_FUZZY_SHARE = 0.6
+UNSPACED_SCRIPTS = {"THAI", "LAO", "KHMER", "MYANMAR", "CJK", "HIRAGANA", "KATAKANA"}
+
+
+def normalize_token(token):
+    """ตัวพิมพ์เล็กและตัดเครื่องหมายวรรคตอนออก (สระ/วรรณยุกต์ภาษาไทยเป็นหมวด M จึงไม่ถูกตัด)"""
+    return "".join(ch for ch in token.casefold() if not unicodedata.category(ch).startswith("P"))
+
+
+def is_unspaced_script(text):
+    """มีตัวอักษรของภาษาที่ไม่เว้นวรรคระหว่างคำ (ไทย ลาว เขมร พม่า จีน ญี่ปุ่น) หรือไม่"""
+    return any(unicodedata.name(ch, "").split(" ")[0] in UNSPACED_SCRIPTS for ch in text if ch.isalpha())
+
+
+def format_timestamp(seconds):
+    if seconds is None:
+        return "N/A"
+    minutes = int(seconds // 60); secs = int(seconds % 60)
+    return f"{minutes:01d}:{secs:02d}"
+
+
+def parse_timestamp(timestamp):
+    """"m:ss" จาก format_timestamp กลับเป็นวินาที ("N/A" หรือรูปแบบอื่นคืนค่า None)"""
+    minutes, _, secs = (timestamp or "").partition(":")
+    if not (minutes.isdigit() and secs.isdigit()):
+        return None
+    return int(minutes) * 60 + int(secs)
+
+
+class PhraseIndex:
+    """
+    - ค้นแบบตรงตัว: hash ของ n-gram คำแรกของวลี -> ตำแหน่งคำ แล้วตรวจคำที่เหลือ
+    - ค้นแบบไม่สนช่องว่าง (สำหรับภาษาไทยที่การตัดคำของ STT ไม่ตรงกับ Gemini): ต่อทุกคำเป็นสตริงเดียวแล้วใช้ str.find
+    """
+
+    def __init__(self, word_timestamps):
+        self.starts = [float(w["Start (s)"]) for w in word_timestamps]
+        normalized = {}  # คำซ้ำกันมาก normalize ครั้งเดียวต่อคำที่ไม่ซ้ำ
+        self.tokens = [normalized.get(w["Word"]) or normalized.setdefault(w["Word"], normalize_token(w["Word"]))
+                       for w in word_timestamps]
+        self.ngrams = defaultdict(list)
+        for n in range(1, NGRAM_SIZE + 1):
+            for i, gram in enumerate(zip(*(self.tokens[k:] for k in range(n)))):
+                self.ngrams[gram].append(i)
+        self.char_offsets = []
+        offset = 0
+        for token in self.tokens:
+            self.char_offsets.append(offset)
+            offset += len(token)
+        self.joined = "".join(self.tokens)
+
+    def find_exact(self, phrase_tokens):
+        """ตำแหน่งคำแรกที่ตรงกับวลี (list ของคำที่ normalize แล้ว) หรือ None"""
+        if not phrase_tokens:
+            return None
+        head = tuple(phrase_tokens[:NGRAM_SIZE])
+        tail = phrase_tokens[NGRAM_SIZE:]
+        for i in self.ngrams.get(head, ()):
+            if self.tokens[i + NGRAM_SIZE:i + NGRAM_SIZE + len(tail)] == tail:
+                return i
+        return None
+
+    def find_fuzzy(self, phrase_tokens):
+        """
+        ค้นโดยไม่สนช่องว่าง ถ้าไม่พบทั้งวลีและเป็นภาษาที่ไม่เว้นวรรค จะใช้ prefix ที่ยาวที่สุดที่พบ (binary search บนความยาว)
+        โดย prefix ต้องยาวอย่างน้อย MIN_FUZZY_CHARS และ MIN_FUZZY_SHARE ของวลี
+        """
+        target = "".join(phrase_tokens)
+        if not target:
+            return None
+        position = self.joined.find(target)
+        if position < 0:
+            if not is_unspaced_script(target):
+                return None
+            # ถ้า prefix ยาว L พบ prefix ที่สั้นกว่าก็พบด้วย จึง binary search ได้
+            lo, hi, position = max(MIN_FUZZY_CHARS, math.ceil(MIN_FUZZY_SHARE * len(target))), len(target) - 1, -1
+            while lo <= hi:
+                mid = (lo + hi) // 2
+                found = self.joined.find(target[:mid])
+                if found >= 0:
+                    position = found; lo = mid + 1
+                else:
+                    hi = mid - 1
+            if position < 0:
+                return None
+        return bisect_right(self.char_offsets, position) - 1
+
+    def lookup(self, phrase):
+        """เวลาเริ่ม (วินาที) ของวลี หรือ None ถ้าไม่พบ"""
+        phrase_tokens = [t for t in (normalize_token(p) for p in phrase.replace("...", " ").split()) if t]
+        index = self.find_exact(phrase_tokens)
+        if index is None:
+            index = self.find_fuzzy(phrase_tokens)
+        return None if index is None else self.starts[index]
+
+
+def find_timestamp_for_phrase(phrase, phrase_index):
+    """ค้นหาเวลาเริ่มต้นของวลีจาก PhraseIndex ของ word_timestamps (สร้างครั้งเดียวต่อการวิเคราะห์)"""
+    return format_timestamp(phrase_index.lookup(phrase))
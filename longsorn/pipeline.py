@@ -0,0 +1,270 @@
+"""ขั้นตอนวิเคราะห์ทั้งหมด (ffmpeg → VAD → features → ตรวจภาษา → STT → Gemini) แบบไม่ขึ้นกับ Streamlit ใช้ได้ทั้งจาก UI และ background worker"""
+import os
+import time
+
+from longsorn.analysis import (
+    DEFAULT_OUTPUT_MODE, PROMPT_VERSIONS, SECTION_SECONDS, SECTIONED_MIN_SECONDS, apply_feedback_event, build_analysis_prompt,
+    build_data_summary, has_clarity_score, new_analysis_results, sectioned_feedback_events, split_sections, stream_feedback_events,
+    structured_feedback_events,
+)
+from longsorn.features import extract_features
+from longsorn.ingest import IngestResult, ingest_media
+from longsorn.language import AUTO, SUPPORTED_LANGUAGE_CODES, detect_language, language_cache_key
+from longsorn.phrase_index import PhraseIndex, find_timestamp_for_phrase, format_timestamp, parse_timestamp
+from longsorn.response_cache import response_cache_key, response_context_key
+from longsorn.stt import DEFAULT_TRANSPORT_ENCODING, build_recognition_config, transcribe_long_audio
+from longsorn.timeline import WordTimeline, compute_delivery_stats
+from longsorn.tracing import export_metrics, new_trace
+from longsorn.transcript_cache import audio_fingerprint, transcript_cache_key
+from longsorn.vad import compress_silence
+
+EMPTY_TRANSCRIPT_ERROR = "Error: ไม่สามารถตรวจจับคำพูดใดๆ ในไฟล์เสียงได้ กรุณาตรวจสอบไฟล์แล้วลองอีกครั้ง"
+
+
+def run_language_detection(pcm, speech_client_factory, transcript_cache=None, span=None, encoding=DEFAULT_TRANSPORT_ENCODING, audio_digest=None,
+                           caller=None):
+    """
+    เลือกภาษาสำหรับ STT จากเสียงช่วงสั้น ๆ (ดู longsorn.language) ผลถูกเก็บใน transcript_cache ตาม hash ของเสียง
+    ไฟล์เดิมจึงไม่ต้องตรวจซ้ำ ตรวจไม่สำเร็จใช้ภาษาหลัก คืนค่า dict ที่มี language_code, source และ detect_seconds
+    """
+    cache_key = language_cache_key(audio_digest or audio_fingerprint(pcm))
+    cached = transcript_cache.get_raw(cache_key, count=False) if transcript_cache is not None else None
+    if cached is not None:
+        if span is not None: span.set(cache_hit=True, language_code=cached["language_code"])
+        return {**cached, "source": "cache"}
+    started = time.perf_counter()
+    call_stats = {}
+    detection, error = detect_language(speech_client_factory(), pcm, encoding=encoding, stats=call_stats, caller=caller)
+    detect_seconds = round(time.perf_counter() - started, 3)
+    if span is not None: span.set(cache_hit=False, detect_seconds=detect_seconds, **call_stats)
+    if error:
+        if span is not None: span.error = error
+        return {"language_code": SUPPORTED_LANGUAGE_CODES[0], "source": "default", "detect_seconds": detect_seconds, "error": error}
+    detection["detect_seconds"] = detect_seconds
+    if span is not None: span.set(language_code=detection["language_code"], sampled_seconds=detection["sampled_seconds"])
+    if transcript_cache is not None:
+        transcript_cache.put_raw(cache_key, detection)
+    return {**detection, "source": "detected"}
+
+
+def run_stt_transcription(audio_file_content, language_code, speech_client_factory, transcript_cache=None, span=None,
+                          encoding=DEFAULT_TRANSPORT_ENCODING, audio_digest=None, caller=None):
+    """
+    ถอดเสียงด้วย Google STT (ไฟล์ยาวจะถูกตัดเป็นช่วงตามช่วงเงียบแล้วถอดเสียงพร้อมกัน)
+    speech_client_factory ถูกเรียกเฉพาะเมื่อไม่พบผลใน transcript_cache, encoding คือรูปแบบเสียงที่อัปโหลดไป STT
+    """
+    config = build_recognition_config(language_code, encoding=encoding)
+    cache_key = transcript_cache_key(audio_digest or audio_fingerprint(audio_file_content), language_code, config)
+    if transcript_cache is not None:
+        cached_result = transcript_cache.get(cache_key)
+        if span is not None: span.set(cache_hit=cached_result is not None)
+        if cached_result is not None:
+            return cached_result, None
+    try:
+        call_stats = {}
+        stt_result, stt_error = transcribe_long_audio(speech_client_factory(), audio_file_content, language_code, config=config, stats=call_stats,
+                                                     caller=caller)
+        if span is not None: span.set(**call_stats)
+        if stt_error: raise RuntimeError(stt_error)
+        if transcript_cache is not None:
+            transcript_cache.put(cache_key, stt_result)
+        return stt_result, None
+    except Exception as e:
+        return None, f"Google STT API Error: {e}"
+
+
+def cached_feedback_events(cached_events, word_timestamps, match="exact", section_seconds=None):
+    """
+    event จาก response cache: key ตรงกัน (exact) ใช้ timestamp เดิม ส่วนผลของ transcript ที่แค่คล้ายกัน (near)
+    คำนวณ timestamp ใหม่จากคำของไฟล์นี้ โดยค้นเฉพาะช่วงที่ครอบ timestamp เดิม (section_seconds = ความยาวช่วง
+    ของการวิเคราะห์แบบแบ่งช่วง, None = ค้นทั้งไฟล์) เพราะวลีเดียวกันอาจพบได้ในหลายช่วง
+    """
+    if match == "exact":
+        yield from cached_events
+        return
+    ranges = split_sections(word_timestamps, section_seconds) if section_seconds else [(0, len(word_timestamps))]
+    phrase_indexes = {}
+    for kind, payload in cached_events:
+        if kind == "recommendation":
+            seconds = parse_timestamp(payload["timestamp"])
+            # timestamp ถูกปัดลงเป็นวินาที จึงเทียบกับเวลาเริ่มของช่วงที่ปัดลงแล้ว (ขอบช่วงอาจตรงกับสองช่วง)
+            candidates = [(a, b) for a, b in ranges if seconds is None
+                          or int(word_timestamps[a]["Start (s)"]) <= seconds <= word_timestamps[b - 1]["End (s)"]]
+            timestamp = format_timestamp(None)
+            for a, b in candidates:
+                if (a, b) not in phrase_indexes:
+                    phrase_indexes[a, b] = PhraseIndex(word_timestamps[a:b])
+                timestamp = find_timestamp_for_phrase(payload["original"], phrase_indexes[a, b])
+                if parse_timestamp(timestamp) is not None:
+                    break
+            payload = {**payload, "timestamp": timestamp}
+        yield kind, payload
+
+
+def run_real_nlp_analysis(transcript: str, word_timestamps: list, description: str, lang_code_for_stt: str, model_factory,
+                          timeline: WordTimeline = None, on_event=None, output_mode: str = DEFAULT_OUTPUT_MODE, response_cache=None, caller=None):
+    """
+    ฟังก์ชันสำหรับเรียกใช้ Gemini วิเคราะห์ Transcript
+    (เวอร์ชัน 6 - output_mode="text" (ค่าเริ่มต้น): Streaming ทีละบรรทัด ส่งให้ on_event ทันทีที่มาถึง
+     output_mode="json": Gemini ตอบเป็น JSON ตาม schema, ช่วงที่ตรวจไม่ผ่านถูกเรียกซ้ำเฉพาะช่วงนั้น
+     ไฟล์ที่ยาวเกิน SECTIONED_MIN_SECONDS จะถูกแบ่งเป็นช่วงแล้ววิเคราะห์พร้อมกันทั้งสองแบบ)
+    ถ้าเรียก Gemini ไม่สำเร็จ (ทั้งหมดหรือบางช่วง) ผลลัพธ์ยังมีสถิติการพูดครบ และข้อความเตือนอยู่ใน results["warnings"]
+    response_cache: ถ้าเคยวิเคราะห์ transcript/สถิติ/คำอธิบายเดียวกันด้วย model และ prompt เดียวกันแล้ว จะใช้ผลเดิมโดยไม่เรียก Gemini
+    caller: ResilientCaller ของ Gemini (None = gemini_caller ที่ใช้ร่วมกันทั้ง process)
+    """
+    # --- Pre-calculation of all statistics (vectorized บน WordTimeline) ---
+    if timeline is None:
+        timeline = WordTimeline.from_word_timestamps(word_timestamps)
+    detected_language = lang_code_for_stt.split('-')[0].lower()
+    delivery_stats = compute_delivery_stats(timeline, detected_language)
+
+    # --- Construct the Data Summary for the AI ---
+    data_summary = build_data_summary(delivery_stats["wpm"], delivery_stats["filler_word_count"], delivery_stats["pause_threshold"], delivery_stats["long_pauses"])
+
+    results = new_analysis_results(delivery_stats)
+    results["warnings"] = []
+    timings = {}
+    try:
+        model = model_factory()
+        sectioned = delivery_stats["duration_seconds"] >= SECTIONED_MIN_SECONDS
+        cached = None
+        if response_cache is not None:
+            model_name = getattr(model, "model_name", type(model).__name__)
+            cache_key = response_cache_key(transcript, data_summary, description, model_name, PROMPT_VERSIONS[output_mode])
+            cache_context = response_context_key(description, model_name, PROMPT_VERSIONS[output_mode])
+            cached = response_cache.get(cache_key, transcript, cache_context)
+            timings["response_cache"] = cached[1] if cached else "miss"
+        if cached is not None:
+            feedback_events = cached_feedback_events(cached[0], word_timestamps, cached[1], SECTION_SECONDS if sectioned else None)
+        elif output_mode == "json":
+            feedback_events = structured_feedback_events(model, word_timestamps, description, lang_code_for_stt, timings,
+                                                         None if sectioned else transcript, data_summary, caller=caller)
+        elif sectioned:
+            # transcript ยาว: วิเคราะห์ทีละช่วงพร้อมกัน (map-reduce) แทนการส่งทั้งไฟล์ใน prompt เดียว
+            feedback_events = sectioned_feedback_events(model, word_timestamps, description, lang_code_for_stt, timings, caller=caller)
+        else:
+            full_prompt = build_analysis_prompt(transcript, description, data_summary)
+            feedback_events = stream_feedback_events(model, full_prompt, PhraseIndex(word_timestamps), timings, caller)
+        events = []
+        for event in feedback_events:
+            events.append(event)
+            apply_feedback_event(results, event)
+            if on_event: on_event(event)
+        if timings.get("failed_sections"):
+            results["warnings"].append(f"Gemini วิเคราะห์ไม่สำเร็จ {timings['failed_sections']} จาก {timings['sections']} ช่วง "
+                                       "คำแนะนำของช่วงเวลาดังกล่าวจึงไม่แสดง (คะแนนและคำสำคัญคิดจากช่วงที่สำเร็จ)")
+        # เก็บเฉพาะการวิเคราะห์ที่สมบูรณ์ (ทุกช่วงสำเร็จและอ่านคะแนนได้)
+        if cached is None and response_cache is not None and not timings.get("failed_sections") and has_clarity_score(events):
+            response_cache.put(cache_key, events, transcript, cache_context)
+    except Exception as e:
+        results["warnings"].append(f"Could not connect to Gemini API: {e}")
+
+    results["timings"] = timings
+    return results
+
+
+def run_pipeline(source, description, speech_client_factory, model_factory, transcript_cache=None, progress=None, on_event=None, trace=None,
+                 encoding=DEFAULT_TRANSPORT_ENCODING, output_mode=DEFAULT_OUTPUT_MODE, response_cache=None, thumbnail_cache=None, file_hash=None,
+                 language=AUTO, stt_caller=None, gemini_caller=None):
+    """
+    รันทุกขั้นตอนกับไฟล์หนึ่งไฟล์ (source เป็น path, bytes หรือ IngestResult ที่แปลงมาแล้ว) คืนค่า (nlp_results, error)
+    progress(percent, text) ถูกเรียกเมื่อเริ่มแต่ละขั้นตอน, แต่ละขั้นตอนถูกบันทึกเป็น span ใน trace
+    thumbnail_cache: ถ้า source เป็น path ของวิดีโอ จะดึงภาพ ณ เวลาของแต่ละ feedback (file_hash = SHA-256 ของไฟล์ ถ้ารู้แล้ว)
+    language: "auto" = ตรวจจากเสียง หรือรหัสภาษาของ STT (เช่น "en-US") เพื่อข้ามการตรวจ
+    stt_caller / gemini_caller: ResilientCaller ที่ใช้เรียก API (None = ตัวที่ใช้ร่วมกันทั้ง process, fake ใช้ตัวใน longsorn.fakes)
+    """
+    try:
+        return _run_stages(source, description, speech_client_factory, model_factory, transcript_cache,
+                           progress or (lambda percent, text: None), on_event, trace or new_trace(), encoding, output_mode, response_cache,
+                           thumbnail_cache, file_hash, language, stt_caller, gemini_caller)
+    finally:
+        export_metrics()
+
+
+def _run_stages(source, description, speech_client_factory, model_factory, transcript_cache, progress, on_event, trace, encoding, output_mode, response_cache,
+                thumbnail_cache, file_hash, language, stt_caller, gemini_caller):
+    progress(10, "กำลังตรวจสอบและแปลงไฟล์เสียง...")
+    # ffmpeg รอบเดียว: ได้ทั้งความยาวไฟล์และ PCM
+    with trace.span("ingest") as span:
+        if isinstance(source, IngestResult):
+            # แปลงมาแล้ว (เช่นจาก process pool ของ batch CLI)
+            ingest_result, ffmpeg_error = source, None
+        else:
+            ingest_result, ffmpeg_error = ingest_media(source)
+            span.set(bytes_in=os.path.getsize(source) if isinstance(source, (str, os.PathLike)) else len(source))
+        if ffmpeg_error:
+            span.error = ffmpeg_error
+            return None, f"FFmpeg Error: {ffmpeg_error}"
+        span.set(bytes_out=len(ingest_result.pcm), audio_seconds=ingest_result.duration)
+
+    # ตัดช่วงเงียบยาว ๆ ออกก่อนส่ง STT เวลาของคำจะถูกแปลงกลับเป็นเวลาในไฟล์ต้นฉบับหลังถอดเสียง
+    with trace.span("vad", bytes_in=len(ingest_result.pcm)) as span:
+        vad_result = compress_silence(ingest_result.pcm, ingest_result.sample_rate)
+        span.set(bytes_out=len(vad_result.pcm), segments=len(vad_result.compressed_starts), saved_seconds=round(vad_result.saved_seconds, 2))
+
+    # pitch / ความดัง / อัตราพยางค์จาก PCM ของไฟล์ต้นฉบับ (เวลาตรงกับวิดีโอ)
+    with trace.span("features", audio_seconds=ingest_result.duration) as span:
+        speech_features = extract_features(ingest_result.pcm, ingest_result.sample_rate)
+        span.set(windows=len(speech_features))
+
+    # --- Language Detection Step (จากเสียงที่ตัดช่วงเงียบแล้ว: ทุกช่วงที่สุ่มมีคำพูด) ---
+    audio_digest = audio_fingerprint(vad_result.pcm)
+    progress(30, "กำลังตรวจสอบภาษา...")
+    with trace.span("language", requested=language) as span:
+        if language == AUTO:
+            language_result = run_language_detection(vad_result.pcm, speech_client_factory, transcript_cache, span, encoding, audio_digest,
+                                                     stt_caller)
+        else:
+            language_result = {"language_code": language, "source": "selected"}
+        lang_code_for_stt = language_result["language_code"]
+        span.set(language_code=lang_code_for_stt, source=language_result["source"])
+
+    progress(40, f"กำลังแปลงเสียงเป็นข้อความ... ({lang_code_for_stt})...")
+    with trace.span("stt", language_code=lang_code_for_stt, encoding=encoding, bytes_in=len(vad_result.pcm)) as span:
+        stt_result, stt_error = run_stt_transcription(vad_result.pcm, lang_code_for_stt, speech_client_factory, transcript_cache, span, encoding,
+                                                      audio_digest, stt_caller)
+        if stt_error:
+            span.error = stt_error
+            return None, f"STT Error: {stt_error}"
+        span.set(words=len(stt_result["word_timestamps"]))
+
+    full_transcript = stt_result["transcript"]
+    if not full_transcript.strip():
+        return None, EMPTY_TRANSCRIPT_ERROR
+    word_timestamps = vad_result.map_words(stt_result["word_timestamps"])
+    with trace.span("timeline", words=len(word_timestamps)):
+        timeline = WordTimeline.from_word_timestamps(word_timestamps)
+
+    progress(70, "กำลังวิเคราะห์ด้วยโมเดลภาษา...")
+    with trace.span("nlp", output_mode=output_mode, bytes_in=len(full_transcript.encode("utf-8"))) as span:
+        nlp_results = run_real_nlp_analysis(full_transcript, word_timestamps, description, lang_code_for_stt, model_factory, timeline, on_event,
+                                            output_mode, response_cache, gemini_caller)
+        timings = nlp_results["timings"]
+        if "response_cache" in timings:
+            span.set(cache_hit=timings["response_cache"] != "miss", response_cache=timings["response_cache"])
+        span.set(**{name: timings[name] for name in ("prompt_tokens", "output_tokens", "ttfb_s", "sections", "llm_calls", "parse_failures",
+                                                   "retries", "rate_limited", "hedges", "hedge_wins") if name in timings})
+        if nlp_results["warnings"]:
+            span.error = "; ".join(nlp_results["warnings"])
+
+    if thumbnail_cache is not None and isinstance(source, (str, os.PathLike)):
+        progress(95, "กำลังดึงภาพตัวอย่างจากวิดีโอ...")
+        with trace.span("thumbnails") as span:
+            seconds = [parse_timestamp(feedback["timestamp"]) for feedback in nlp_results["timeline_feedback"]]
+            if file_hash is None:
+                with open(source, "rb") as f:
+                    file_hash = audio_fingerprint(f)
+            thumbnails, thumbnail_error = thumbnail_cache.get_many(source, file_hash, [s for s in seconds if s is not None])
+            span.set(frames=len(thumbnails))
+            if thumbnail_error:
+                span.error = thumbnail_error
+            nlp_results["thumbnails"] = {format_timestamp(s): path for s, path in thumbnails.items()}
+    nlp_results["vad"] = vad_result.summary()
+    nlp_results["language"] = language_result
+    if "error" in language_result:
+        nlp_results["warnings"].append(f"ตรวจภาษาจากเสียงไม่สำเร็จ จึงถอดเสียงเป็น {lang_code_for_stt}: {language_result['error']}")
+    nlp_results["word_timeline"] = timeline.to_columns()
+    nlp_results["speech_features"] = {"summary": speech_features.summary(), "timeline": speech_features.to_records()}
+    nlp_results["trace"] = trace.to_dict()
+    progress(100, "การวิเคราะห์เสร็จสิ้น!")
+    return nlp_results, None
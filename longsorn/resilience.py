@@ -0,0 +1,204 @@
+"""
+ชั้นเรียก API (STT / Gemini) ที่ใช้ร่วมกันทุก session ใน process: token bucket, จำกัดจำนวน request ที่ค้างพร้อมกัน,
+deadline ต่อการเรียก, retry เฉพาะ error ชั่วคราวแบบ exponential backoff + jitter และ hedged request
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# HTTP status ที่ลองใหม่ได้ (exception ของ google.api_core มี .code เป็น HTTP status)
+RETRYABLE_CODES = {429, 500, 502, 503, 504}
+RATE_LIMITED_CODE = 429
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 20.0
+DEFAULT_MAX_CONCURRENT = 16
+# อัตรารวมต่อ process ควรต่ำกว่า quota ของ Google Cloud project (ปรับด้วย LONGSORN_STT_QPS / LONGSORN_GEMINI_QPS)
+DEFAULT_STT_QPS = 10.0
+DEFAULT_GEMINI_QPS = 10.0
+# ยิงติดกันได้โดยไม่รอ token: พอสำหรับทุกช่วงของไฟล์ 60 นาที (12 ช่วง) พร้อม retry บางส่วน
+DEFAULT_BURST = 20
+STT_DEADLINE_SECONDS = 120.0
+GEMINI_DEADLINE_SECONDS = 180.0
+
+_END = object()
+
+
+class CallDeadlineExceeded(TimeoutError):
+    """ไม่ได้คำตอบภายใน deadline (นับรวมทุกครั้งที่ลองใหม่และเวลารอ token)"""
+
+
+def is_retryable(error):
+    if isinstance(error, CallDeadlineExceeded):
+        return False
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return getattr(error, "code", None) in RETRYABLE_CODES
+
+
+class TokenBucket:
+    """
+    จำกัดอัตราการเรียกไว้ที่ rate ครั้ง/วินาที (สะสมได้สูงสุด burst ครั้ง) ใช้ร่วมกันทุก thread
+    pause(seconds) หยุดการเรียกของทุก session ชั่วคราว เมื่อ API ตอบ 429
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.waited_seconds = 0.0
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline=None):
+        """รอจนได้ token คืนค่า False ถ้าต้องรอเกิน deadline (ค่าจาก time.monotonic())"""
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    self.waited_seconds += now - start
+                    return True
+                wait_seconds = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            if deadline is not None and now + wait_seconds > deadline:
+                return False
+            time.sleep(wait_seconds)
+
+    def pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class ResilientCaller:
+    """
+    เรียก fn(*args, **kwargs) ผ่าน limiter และ slot จำกัด (max_concurrent ต่อ process) ภายใน deadline_seconds
+    error ชั่วคราว (429/5xx/timeout) ถูกลองใหม่สูงสุด max_attempts ครั้ง รอแบบ full jitter: uniform(0, base_delay x 2^n)
+    hedge_after_seconds: ถ้าครั้งแรกยังไม่ตอบ ส่ง request เดิมซ้ำอีกชุดแล้วใช้อันที่สำเร็จก่อน
+    request ที่เกิน deadline ไม่ถูกยกเลิกจริง (thread หยุดกลางคันไม่ได้) แต่ผลจะถูกทิ้งและ slot คืนเมื่อมันจบ
+    """
+
+    def __init__(self, name, limiter=None, max_attempts=DEFAULT_MAX_ATTEMPTS, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY,
+                 deadline_seconds=None, hedge_after_seconds=None, max_concurrent=DEFAULT_MAX_CONCURRENT, seed=None):
+        self.name = name
+        self.limiter = limiter
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline_seconds = deadline_seconds
+        self.hedge_after_seconds = hedge_after_seconds
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix=f"longsorn-{name}")
+        self._rng = random.Random(seed)
+        self._stats = dict.fromkeys(("calls", "retries", "rate_limited", "hedges", "hedge_wins", "deadline_exceeded", "failures"), 0)
+        self._lock = threading.Lock()
+
+    def _count(self, name, stats=None):
+        with self._lock:
+            self._stats[name] += 1
+            if stats is not None:
+                stats[name] = stats.get(name, 0) + 1
+
+    def _remaining(self, deadline):
+        return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+    def _deadline_exceeded(self, stats):
+        self._count("deadline_exceeded", stats)
+        return CallDeadlineExceeded(f"{self.name}: no response within {self.deadline_seconds:g}s")
+
+    def _submit(self, fn, args, kwargs, deadline, stats):
+        if self.limiter is not None and not self.limiter.acquire(deadline):
+            raise self._deadline_exceeded(stats)
+        if not self._slots.acquire(timeout=self._remaining(deadline)):
+            raise self._deadline_exceeded(stats)
+        future = self._executor.submit(fn, *args, **kwargs)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _attempt(self, fn, args, kwargs, deadline, stats):
+        """ส่งหนึ่งครั้ง (และ hedge ถ้าช้า) คืนผลแรกที่สำเร็จ หรือ raise error ล่าสุดเมื่อทุก request ล้มเหลว"""
+        first = self._submit(fn, args, kwargs, deadline, stats)
+        pending, hedged, error = {first}, self.hedge_after_seconds is None, None
+        while pending:
+            timeout = self._remaining(deadline)
+            if not hedged:
+                timeout = self.hedge_after_seconds if timeout is None else min(timeout, self.hedge_after_seconds)
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not first:
+                        self._count("hedge_wins", stats)
+                    return future.result()
+                error = future.exception()
+            if not done:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise self._deadline_exceeded(stats)
+                hedged = True
+                self._count("hedges", stats)
+                pending.add(self._submit(fn, args, kwargs, deadline, stats))
+        raise error
+
+    def call(self, fn, *args, stats=None, **kwargs):
+        """stats (dict เช่น timings ของการวิเคราะห์) จะถูกเติมจำนวน retries/hedges ของการเรียกนี้"""
+        self._count("calls")
+        deadline = time.monotonic() + self.deadline_seconds if self.deadline_seconds else None
+        for attempt in range(self.max_attempts):
+            try:
+                return self._attempt(fn, args, kwargs, deadline, stats)
+            except Exception as e:
+                if not is_retryable(e) or attempt == self.max_attempts - 1:
+                    self._count("failures")
+                    raise
+                delay = self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                if getattr(e, "code", None) == RATE_LIMITED_CODE:
+                    self._count("rate_limited", stats)
+                    if self.limiter is not None:
+                        self.limiter.pause(delay)  # ให้ทุก session ชะลอพร้อมกัน แทนที่จะยิงซ้ำจนโดน 429 ต่อ
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    self._count("failures")
+                    raise self._deadline_exceeded(stats) from e
+                self._count("retries", stats)
+                time.sleep(delay)
+
+    def call_stream(self, fn, *args, stats=None, **kwargs):
+        """
+        สำหรับ API ที่คืน iterator (generate_content(stream=True)): retry/hedge/deadline ใช้ถึง chunk แรกเท่านั้น
+        หลังจากนั้น chunk ถูกส่งต่อตามที่มาถึง (ลองใหม่กลาง stream ไม่ได้เพราะส่ง chunk ก่อนหน้าออกไปแล้ว)
+        """
+        def first_chunk():
+            iterator = iter(fn(*args, **kwargs))
+            return iterator, next(iterator, _END)
+
+        iterator, chunk = self.call(first_chunk, stats=stats)
+        while chunk is not _END:
+            yield chunk
+            chunk = next(iterator, _END)
+
+    def stats(self):
+        with self._lock:
+            report = dict(self._stats)
+        if self.limiter is not None:
+            report["throttled_seconds"] = round(self.limiter.waited_seconds, 3)
+        return report
+
+
+def _env_float(name, default=None):
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+# ใช้ร่วมกันทุก session: Streamlit รันทุก session ใน process เดียว limiter จึงคุมอัตรารวมต่อ process
+# ฟังก์ชันที่เรียก API รับ caller=... แทนได้ (None = ตัวที่ใช้ร่วมกันนี้)
+stt_caller = ResilientCaller("stt", TokenBucket(_env_float("LONGSORN_STT_QPS", DEFAULT_STT_QPS), DEFAULT_BURST), deadline_seconds=STT_DEADLINE_SECONDS)
+gemini_caller = ResilientCaller("gemini", TokenBucket(_env_float("LONGSORN_GEMINI_QPS", DEFAULT_GEMINI_QPS), DEFAULT_BURST),
+                                deadline_seconds=GEMINI_DEADLINE_SECONDS, hedge_after_seconds=_env_float("LONGSORN_GEMINI_HEDGE_SECONDS"))
+
+
+def call_stats():
+    return {"stt": stt_caller.stats(), "gemini": gemini_caller.stats()}
@@ -0,0 +1,191 @@
+"""
+Cache คำตอบของ Gemini บนดิสก์: วิเคราะห์ transcript เดิมด้วย prompt เดิมซ้ำจะไม่เรียก generate_content อีก
+(เลือกเปิดการค้นหา transcript ที่เกือบเหมือนกันด้วย MinHash ได้)
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from longsorn.disk_cache import DiskCache
+
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "longsorn", "responses")
+INDEX_FILE = "near_duplicates.jsonl"
+# เขียน INDEX_FILE ใหม่เฉพาะรายการที่ยังอยู่ เมื่อบรรทัดของ key ที่ถูกลบไปแล้วมีมากกว่าบรรทัดที่ยังใช้ได้
+# (ไม่เขียนใหม่ทุกครั้งที่ลบ เพื่อให้การ evict ทีละรายการไม่ต้องเขียนทั้งไฟล์ซ้ำ)
+MIN_STALE_INDEX_LINES = 64
+
+# MinHash บน shingle 3 คำ: ค่าประมาณ Jaccard >= NEAR_DUPLICATE_THRESHOLD ถือว่าเป็น transcript เดียวกัน
+MINHASH_PERMUTATIONS = 64
+SHINGLE_WORDS = 3
+NEAR_DUPLICATE_THRESHOLD = 0.9
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = np.random.default_rng(20240601)
+# a, b, x < 2^32 ทำให้ a*x + b ไม่ล้น uint64
+_HASH_A = _rng.integers(1, 1 << 32, MINHASH_PERMUTATIONS, dtype=np.uint64)
+_HASH_B = _rng.integers(0, 1 << 32, MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+
+def response_cache_key(transcript, data_summary, description, model_name, prompt_version):
+    payload = json.dumps({"transcript": hashlib.sha256(transcript.encode("utf-8")).hexdigest(), "data_summary": data_summary,
+                          "description": description or "", "model": model_name, "prompt_version": prompt_version}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def response_context_key(description, model_name, prompt_version):
+    """ส่วนของ key ที่ต้องตรงกันทุกตัวแม้จะจับคู่แบบ near-duplicate"""
+    payload = json.dumps({"description": description or "", "model": model_name, "prompt_version": prompt_version}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def minhash_signature(transcript):
+    """MinHash ของ shingle ละ SHINGLE_WORDS คำ (crc32 เพื่อให้ได้ค่าเดียวกันทุก process)"""
+    words = transcript.split()
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+    hashes = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+    permuted = (hashes[:, None] * _HASH_A[None, :] + _HASH_B[None, :]) % np.uint64(_MERSENNE_PRIME)
+    return permuted.min(axis=0)
+
+
+class ResponseCache(DiskCache):
+    """
+    เก็บ feedback event ของการวิเคราะห์ทั้งครั้งต่อ key จาก response_cache_key (หมดอายุหลัง ttl_seconds)
+    near_duplicates=True: ถ้าไม่พบ key ตรงกัน จะหารายการที่ context เดียวกันและ transcript คล้ายกันพอ
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES, ttl_seconds=DEFAULT_TTL_SECONDS, near_duplicates=None):
+        super().__init__(directory or os.getenv("LONGSORN_RESPONSE_CACHE_DIR") or DEFAULT_CACHE_DIR, max_bytes)
+        self.ttl_seconds = ttl_seconds
+        if near_duplicates is None:
+            near_duplicates = os.getenv("LONGSORN_NEAR_DUPLICATE_CACHE") == "1"
+        self.near_duplicates = near_duplicates
+        self.near_hits = 0
+        self._signatures = {}  # context -> {key: (created, signature)}
+        self._stale_index_lines = 0
+        self._index_lock = threading.Lock()
+        if near_duplicates:
+            self._load_index()
+
+    def _index_path(self):
+        return os.path.join(self.directory, INDEX_FILE)
+
+    def _load_index(self):
+        """อ่าน index โดยข้ามรายการที่หมดอายุหรือไม่มีไฟล์คำตอบแล้ว (ถูก evict/discard) แล้วเขียนไฟล์ใหม่ถ้ามีบรรทัดที่ข้าม"""
+        lines = 0
+        now = time.time()
+        try:
+            with open(self._index_path(), encoding="utf-8") as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    created = entry.get("created", now)
+                    if now - created > self.ttl_seconds or not os.path.exists(self._path(entry["key"])):
+                        continue
+                    self._signatures.setdefault(entry["context"], {})[entry["key"]] = (created, np.asarray(entry["signature"], dtype=np.uint64))
+        except OSError:
+            return
+        if lines > self._index_size():
+            self._compact_index()
+
+    def _index_size(self):
+        return sum(len(signatures) for signatures in self._signatures.values())
+
+    def _compact_index(self):
+        """เขียน INDEX_FILE ใหม่จากรายการในหน่วยความจำที่ยังไม่หมดอายุ (เรียกขณะถือ _index_lock หรือก่อนเริ่มใช้งาน)"""
+        now = time.time()
+        for signatures in self._signatures.values():
+            for key in [key for key, (created, _) in signatures.items() if now - created > self.ttl_seconds]:
+                del signatures[key]
+        temp_path = f"{self._index_path()}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                for context, signatures in self._signatures.items():
+                    for key, (created, signature) in signatures.items():
+                        f.write(json.dumps({"context": context, "key": key, "created": created, "signature": signature.tolist()}) + "\n")
+            os.replace(temp_path, self._index_path())
+        except OSError:
+            return
+        self._stale_index_lines = 0
+
+    def _removed(self, keys):
+        if not self.near_duplicates:
+            return
+        keys = set(keys)
+        with self._index_lock:
+            for signatures in self._signatures.values():
+                for key in keys & signatures.keys():
+                    del signatures[key]
+                    self._stale_index_lines += 1
+            if self._stale_index_lines > max(self._index_size(), MIN_STALE_INDEX_LINES):
+                self._compact_index()
+
+    def _load(self, key, count):
+        entry = self.get_raw(key, count=count)
+        if entry is not None and time.time() - entry["created"] > self.ttl_seconds:
+            self.discard(key)
+            entry = None
+        return entry
+
+    def get(self, key, transcript=None, context=None):
+        """คืนค่า (events, "exact" | "near") หรือ None ถ้าไม่พบ"""
+        entry = self._load(key, count=False)
+        match = "exact"
+        if entry is None and self.near_duplicates and transcript is not None:
+            entry, match = self._find_near_duplicate(transcript, context), "near"
+        self._count(entry is not None)
+        if entry is None:
+            return None
+        if match == "near":
+            with self._lock:
+                self.near_hits += 1
+        return [tuple(event) for event in entry["events"]], match
+
+    def _find_near_duplicate(self, transcript, context):
+        with self._index_lock:
+            candidates = [(key, signature) for key, (_, signature) in self._signatures.get(context, {}).items()]
+        if not candidates:
+            return None
+        signature = minhash_signature(transcript)
+        keys, signatures = zip(*candidates)
+        similarity = (np.stack(signatures) == signature).mean(axis=1)
+        missing = []
+        try:
+            for index in np.argsort(-similarity):
+                if similarity[index] < NEAR_DUPLICATE_THRESHOLD:
+                    break
+                entry = self._load(keys[index], count=False)
+                if entry is not None:
+                    return entry
+                missing.append(keys[index])
+        finally:
+            if missing:
+                # ไฟล์คำตอบถูกลบไปแล้ว (เช่น replica อื่น evict) ไม่ให้ lookup ครั้งต่อไปมาเจอ key เดิมอีก
+                self._removed(missing)
+        return None
+
+    def put(self, key, events, transcript=None, context=None):
+        self.put_raw(key, {"created": time.time(), "events": [list(event) for event in events]})
+        if self.near_duplicates and transcript is not None:
+            signature = minhash_signature(transcript)
+            created = time.time()
+            with self._index_lock:
+                signatures = self._signatures.setdefault(context, {})
+                if key in signatures:
+                    self._stale_index_lines += 1
+                signatures[key] = (created, signature)
+                with open(self._index_path(), "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"context": context, "key": key, "created": created, "signature": signature.tolist()}) + "\n")
+
+    def stats(self):
+        stats = super().stats()
+        stats["near_hits"] = self.near_hits
+        return stats
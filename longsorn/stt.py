@@ -0,0 +1,117 @@
+"""Speech-to-Text สำหรับไฟล์ยาว: ตัด PCM ตามช่วงเงียบ แล้วส่งแต่ละช่วงไป recognize พร้อมกัน"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from longsorn.ingest import DEFAULT_TRANSPORT_ENCODING, SAMPLE_RATE, TRANSPORT_CODECS, TRANSPORT_ENCODINGS, encode_pcm
+from longsorn.resilience import stt_caller as shared_stt_caller
+
+# client.recognize (แบบ synchronous) รับเสียงได้ไม่เกิน ~60 วินาทีต่อครั้ง
+MAX_CHUNK_SECONDS = 55.0
+# หาจุดตัดที่เงียบที่สุดภายในช่วงท้ายของแต่ละ chunk
+SILENCE_SEARCH_SECONDS = 15.0
+FRAME_SECONDS = 0.03
+MIN_SILENCE_SECONDS = 0.3
+DEFAULT_MAX_WORKERS = 4
+
+
+def frame_energy(samples, frame_size):
+    """RMS ต่อเฟรม (เฟรมละ frame_size sample)"""
+    n_frames = len(samples) // frame_size
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = samples[:n_frames * frame_size].reshape(n_frames, frame_size).astype(np.float32)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+
+def split_on_silence(pcm, sample_rate=SAMPLE_RATE, max_chunk_seconds=MAX_CHUNK_SECONDS,
+                     search_seconds=SILENCE_SEARCH_SECONDS, min_silence_seconds=MIN_SILENCE_SECONDS):
+    """
+    แบ่ง PCM (LINEAR16 mono) เป็นช่วง [start, end) หน่วยเป็น sample โดยแต่ละช่วงยาวไม่เกิน max_chunk_seconds
+    จุดตัดเลือกจากช่วงที่พลังงานเฉลี่ย (ยาว min_silence_seconds) ต่ำที่สุดในช่วง search_seconds สุดท้ายของ chunk
+    """
+    samples = np.frombuffer(pcm, dtype="<i2")
+    total = len(samples)
+    max_chunk = int(max_chunk_seconds * sample_rate)
+    if total <= max_chunk:
+        return [(0, total)] if total else []
+
+    frame_size = int(FRAME_SECONDS * sample_rate)
+    energy = frame_energy(samples, frame_size)
+    smooth_frames = max(1, int(min_silence_seconds / FRAME_SECONDS))
+    smoothed = np.convolve(energy, np.ones(smooth_frames, dtype=np.float32) / smooth_frames, mode="same")
+
+    chunks = []
+    start = 0
+    max_frames = max_chunk // frame_size
+    search_frames = max(1, int(search_seconds / FRAME_SECONDS))
+    while total - start > max_chunk:
+        start_frame = start // frame_size
+        lo = start_frame + max(1, max_frames - search_frames)
+        hi = min(start_frame + max_frames, len(smoothed))
+        cut = (lo + int(np.argmin(smoothed[lo:hi]))) * frame_size if hi > lo else start + max_chunk
+        chunks.append((start, cut))
+        start = cut
+    chunks.append((start, total))
+    return chunks
+
+
+def build_recognition_config(language_code, sample_rate=SAMPLE_RATE, encoding=DEFAULT_TRANSPORT_ENCODING):
+    """RecognitionConfig ในรูป dict (SpeechClient รับ dict ได้โดยตรง และใช้เป็น key ของ cache ได้)"""
+    if encoding not in TRANSPORT_CODECS:
+        raise ValueError(f"Unsupported STT encoding: {encoding}")
+    return {
+        "encoding": encoding,
+        "sample_rate_hertz": sample_rate,
+        "language_code": language_code,
+        "enable_automatic_punctuation": True,
+        "enable_word_time_offsets": True,
+    }
+
+
+def response_to_words(response, offset_seconds=0.0):
+    """แปลงผลจาก client.recognize เป็น (transcript, word_timestamps) โดยบวกเวลาเริ่มของ chunk"""
+    transcripts = []
+    word_timestamps = []
+    for result in response.results:
+        if not result.alternatives:
+            continue
+        alternative = result.alternatives[0]
+        transcripts.append(alternative.transcript)
+        for word_info in alternative.words:
+            word_timestamps.append({
+                "Word": word_info.word,
+                "Start (s)": offset_seconds + word_info.start_time.total_seconds(),
+                "End (s)": offset_seconds + word_info.end_time.total_seconds(),
+            })
+    return " ".join(transcripts), word_timestamps
+
+
+def transcribe_long_audio(client, pcm, language_code="th-TH", config=None, sample_rate=SAMPLE_RATE,
+                          max_workers=DEFAULT_MAX_WORKERS, stats=None, caller=None):
+    """
+    ถอดเสียงไฟล์ยาวด้วย client.recognize ทีละ chunk แบบขนาน (thread pool จำกัดจำนวน)
+    แต่ละ chunk ถูกบีบอัดตาม config["encoding"] ก่อนส่ง (การตัด chunk ยังทำบน PCM เหมือนเดิม)
+    error ชั่วคราว (429/503) ถูกลองใหม่ผ่าน caller (ค่าเริ่มต้น stt_caller ที่ใช้ร่วมกัน), stats (dict) จะถูกเติมจำนวน retries
+    คืนค่า ({"transcript": str, "word_timestamps": list}, error) โดยคำเรียงตามเวลาในไฟล์ต้นฉบับ
+    """
+    caller = shared_stt_caller if caller is None else caller
+    try:
+        config = config or build_recognition_config(language_code, sample_rate)
+        chunks = split_on_silence(pcm, sample_rate)
+
+        def recognize(chunk):
+            start, end = chunk
+            content = encode_pcm(pcm[start * 2:end * 2], config["encoding"], sample_rate)
+            response = caller.call(client.recognize, config=config, audio={"content": content}, stats=stats)
+            return response_to_words(response, start / sample_rate)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+            # executor.map คืนผลตามลำดับ chunk เสมอ ไม่ว่า chunk ไหนจะเสร็จก่อน
+            chunk_results = list(executor.map(recognize, chunks))
+
+        transcript = " ".join(text for text, _ in chunk_results if text)
+        word_timestamps = [word for _, words in chunk_results for word in words]
+        return {"transcript": transcript, "word_timestamps": word_timestamps}, None
+    except Exception as e:
+        return None, str(e)
@@ -0,0 +1,99 @@
+"""
+ภาพตัวอย่าง (thumbnail) ของวิดีโอ ณ เวลาของแต่ละ feedback: ดึงทุกเฟรมใน ffmpeg process เดียว
+โดยใส่ -ss ก่อน -i ของแต่ละเวลา (seek ไปที่ keyframe ก่อนถอดรหัส ไม่ต้องถอดรหัสวิดีโอตั้งแต่ต้น)
+เก็บผลไว้บนดิสก์แยกโฟลเดอร์ตาม hash ของไฟล์ เปิดผลเดิมซ้ำจึงไม่ต้องรัน ffmpeg อีก
+"""
+import os
+import shutil
+import subprocess
+import threading
+
+THUMBNAIL_WIDTH = 320
+JPEG_QUALITY = 5  # -q:v ของ mjpeg (2 = ดีที่สุด, 31 = เล็กที่สุด)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "longsorn", "thumbnails")
+NO_VIDEO_MARKER = ".novideo"  # ไฟล์เสียงล้วน: จำไว้ว่าไม่มีภาพ จะได้ไม่รัน ffmpeg ซ้ำ
+
+
+def thumbnail_name(seconds):
+    return f"{int(round(seconds * 1000))}.jpg"
+
+
+def build_thumbnail_command(video_path, seconds_list, output_dir, width=THUMBNAIL_WIDTH):
+    """คำสั่ง ffmpeg เดียว: หนึ่ง input (seek ก่อนเปิด) ต่อหนึ่งเวลา และหนึ่ง output JPEG ต่อ input"""
+    command = ["ffmpeg", "-hide_banner", "-nostdin", "-loglevel", "error", "-y"]
+    for seconds in seconds_list:
+        command.extend(["-ss", f"{seconds:.3f}", "-i", video_path])
+    for index, seconds in enumerate(seconds_list):
+        command.extend(["-map", f"{index}:v:0", "-frames:v", "1", "-vf", f"scale={width}:-2", "-q:v", str(JPEG_QUALITY),
+                        os.path.join(output_dir, thumbnail_name(seconds))])
+    return command
+
+
+class ThumbnailCache:
+    """thumbnail ต่อ (hash ของไฟล์, เวลา) ไล่โฟลเดอร์ของไฟล์ที่ไม่ได้เปิดนานที่สุดออกเมื่อรวมกันเกิน max_bytes"""
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or os.getenv("LONGSORN_THUMBNAIL_DIR") or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _file_dir(self, file_hash):
+        return os.path.join(self.directory, file_hash)
+
+    def get_many(self, video_path, file_hash, seconds_list):
+        """
+        คืนค่า ({seconds: path ของ JPEG}, error) เวลาที่ยังไม่มีใน cache ถูกดึงพร้อมกันใน ffmpeg ครั้งเดียว
+        เวลาที่เกินความยาววิดีโอจะไม่มีใน dict, ไฟล์ที่ไม่มีภาพคืนค่า dict ว่าง
+        """
+        file_dir = self._file_dir(file_hash)
+        os.makedirs(file_dir, exist_ok=True)
+        os.utime(file_dir)  # ใช้ล่าสุด (สำหรับ LRU)
+        if os.path.exists(os.path.join(file_dir, NO_VIDEO_MARKER)):
+            return {}, None
+        seconds_list = sorted(set(seconds_list))
+        missing = [s for s in seconds_list if not os.path.exists(os.path.join(file_dir, thumbnail_name(s)))]
+        with self._lock:
+            self.hits += len(seconds_list) - len(missing)
+            self.misses += len(missing)
+        error = None
+        if missing:
+            try:
+                proc = subprocess.run(build_thumbnail_command(os.fspath(video_path), missing, file_dir), capture_output=True)
+            except OSError as e:  # ไม่มี ffmpeg: ข้ามภาพตัวอย่างไป ผลวิเคราะห์ยังใช้ได้
+                return {}, str(e)
+            stderr_text = proc.stderr.decode("utf-8", errors="replace").strip()
+            if proc.returncode != 0:
+                if "matches no streams" in stderr_text:
+                    open(os.path.join(file_dir, NO_VIDEO_MARKER), "w").close()
+                    return {}, None
+                error = stderr_text.splitlines()[-1] if stderr_text else f"ffmpeg exited with {proc.returncode}"
+            self._evict(keep=file_dir)
+        paths = {s: os.path.join(file_dir, thumbnail_name(s)) for s in seconds_list}
+        return {s: path for s, path in paths.items() if os.path.exists(path)}, error
+
+    def _evict(self, keep):
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.is_dir():
+                    size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+                    entries.append((entry.stat().st_mtime, entry.path, size))
+            total = sum(size for _, _, size in entries)
+            for _, path, size in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "hit_ratio": self.hits / lookups if lookups else 0.0, "evictions": self.evictions}
@@ -0,0 +1,182 @@
+"""Word timeline แบบ column (NumPy) และการคำนวณสถิติการพูดแบบ vectorized"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from longsorn.fillers import get_matcher
+from longsorn.phrase_index import normalize_token
+
+PAUSE_THRESHOLD_SECONDS = 2.0
+PACE_WINDOW_SECONDS = 60.0
+_SEPARATOR = "\x00"  # คั่นช่วงคำที่ถูกข้ามก่อนส่งเข้า automaton (ไม่มีใน pattern ใด match จึงไม่คร่อมช่วง)
+
+
+@dataclass
+class WordTimeline:
+    words: list  # คำตามที่ STT ส่งมา (ใช้แสดงผล)
+    token_ids: np.ndarray  # int32: id ของคำที่ normalize แล้ว (intern ผ่าน vocab)
+    vocab: dict  # คำที่ normalize แล้ว -> id
+    starts: np.ndarray  # float64 (วินาที)
+    ends: np.ndarray
+
+    @classmethod
+    def from_word_timestamps(cls, word_timestamps):
+        vocab_ids = {}
+        raw_ids = {}  # คำดิบ -> id เพื่อ normalize ครั้งเดียวต่อคำที่ไม่ซ้ำ
+        words = [w["Word"] for w in word_timestamps]
+        for word in dict.fromkeys(words):
+            raw_ids[word] = vocab_ids.setdefault(normalize_token(word), len(vocab_ids))
+        token_ids = np.fromiter((raw_ids[word] for word in words), dtype=np.int32, count=len(words))
+        return cls(
+            words=words,
+            token_ids=token_ids,
+            vocab=vocab_ids,
+            starts=np.fromiter((w["Start (s)"] for w in word_timestamps), dtype=np.float64, count=len(words)),
+            ends=np.fromiter((w["End (s)"] for w in word_timestamps), dtype=np.float64, count=len(words)),
+        )
+
+    def __len__(self):
+        return len(self.words)
+
+    def token_id(self, token):
+        """id ของคำ (normalize แล้ว) หรือ -1 ถ้าไม่มีใน transcript"""
+        return self.vocab.get(token, -1)
+
+    def to_word_timestamps(self):
+        return [{"Word": w, "Start (s)": float(s), "End (s)": float(e)} for w, s, e in zip(self.words, self.starts, self.ends)]
+
+    def normalized_tokens(self):
+        """คำที่ normalize แล้วตามลำดับใน transcript (id ใน vocab เรียงตามลำดับที่เพิ่ม)"""
+        tokens = list(self.vocab)
+        return [tokens[token_id] for token_id in self.token_ids.tolist()]
+
+    def to_columns(self):
+        """{"words", "starts", "ends"} แบบ column (เก็บลง JSON/ประวัติได้ เล็กกว่า list ของ dict ต่อคำ)"""
+        return {"words": list(self.words), "starts": np.round(self.starts, 3).tolist(), "ends": np.round(self.ends, 3).tolist()}
+
+
+def _word_filler_columns(timeline, matcher):
+    """filler ของ lexicon แบบ word_only: n-gram ของ token id (vectorized) แล้วเลือกแบบเดียวกับ FillerScanner (เริ่มก่อน/ยาวกว่าได้ก่อน ไม่ทับกัน)"""
+    n = len(timeline)
+    firsts, lengths, patterns, char_lengths = [], [], [], []
+    for index, (_, text, _) in enumerate(matcher.patterns):
+        ids = [timeline.token_id(token) for token in text.split(matcher.join)]
+        m = len(ids)
+        if m > n or -1 in ids:
+            continue
+        hit = timeline.token_ids[:n - m + 1] == ids[0]
+        for offset in range(1, m):
+            hit &= timeline.token_ids[offset:n - m + 1 + offset] == ids[offset]
+        positions = np.flatnonzero(hit)
+        firsts.append(positions)
+        lengths.append(np.full(len(positions), m))
+        patterns.append(np.full(len(positions), index))
+        char_lengths.append(np.full(len(positions), len(text)))
+    if not firsts:
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty, empty, np.zeros(0), np.zeros(0)
+    firsts, lengths, patterns = np.concatenate(firsts), np.concatenate(lengths), np.concatenate(patterns)
+    order = np.lexsort((-np.concatenate(char_lengths), firsts))
+    firsts, lengths, patterns = firsts[order], lengths[order], patterns[order]
+    if lengths.max() == 1:
+        # วลีคำเดียวทั้งหมด: ทับกันได้เฉพาะที่ตำแหน่งเดียวกัน เก็บตัวแรกของแต่ละตำแหน่ง
+        keep = np.concatenate(([True], firsts[1:] != firsts[:-1]))
+    else:
+        keep = np.zeros(len(firsts), dtype=bool)
+        accepted_end = 0
+        for i, (first, length) in enumerate(zip(firsts.tolist(), lengths.tolist())):
+            if first >= accepted_end:
+                keep[i] = True
+                accepted_end = first + length
+    firsts, lengths, patterns = firsts[keep], lengths[keep], patterns[keep]
+    return firsts, firsts + lengths - 1, patterns, np.zeros(len(firsts)), np.ones(len(firsts))
+
+
+def _scanned_filler_columns(timeline, matcher):
+    """
+    filler ของ lexicon ทั่วไป: สแกนด้วย automaton เฉพาะคำที่อาจอยู่ใน match (ตาม token_roles ของคำและคำข้างเคียง)
+    ช่วงคำที่ถูกข้ามถูกแทนด้วย _SEPARATOR ผลจึงเหมือนสแกนทั้ง transcript
+    """
+    vocab = list(timeline.vocab)
+    roles = np.array(matcher.token_roles(vocab), dtype=bool).reshape(len(vocab), 4)[timeline.token_ids]
+    contains, starts, ends, inside = roles.T
+    can_continue = np.concatenate((ends[1:] | inside[1:], [False]))  # คำถัดไปต่อ match ได้
+    can_precede = np.concatenate(([False], starts[:-1] | inside[:-1]))  # คำก่อนหน้าเริ่ม/ต่อ match ได้
+    keep = contains | (starts & can_continue) | (ends & can_precede) | (inside & can_precede & can_continue)
+    positions = np.flatnonzero(keep)
+    if len(positions) == 0:
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty, empty, np.zeros(0), np.zeros(0)
+
+    tokens, index_map = [], []
+    previous = -2
+    for position, token_id in zip(positions.tolist(), timeline.token_ids[positions].tolist()):
+        if position != previous + 1 and tokens:
+            tokens.append(_SEPARATOR); index_map.append(-1)
+        tokens.append(vocab[token_id]); index_map.append(position)
+        previous = position
+    matches = matcher.find(tokens)
+    index_map = np.asarray(index_map, dtype=np.intp)
+    pattern_index = {phrase: index for index, (phrase, _, _) in enumerate(matcher.patterns)}
+    return (index_map[[m.first for m in matches]] if matches else np.zeros(0, dtype=np.intp),
+            index_map[[m.last for m in matches]] if matches else np.zeros(0, dtype=np.intp),
+            np.fromiter((pattern_index[m.phrase] for m in matches), dtype=np.intp, count=len(matches)),
+            np.fromiter((m.start_fraction for m in matches), dtype=np.float64, count=len(matches)),
+            np.fromiter((m.end_fraction for m in matches), dtype=np.float64, count=len(matches)))
+
+
+def filler_match_columns(timeline, matcher):
+    """
+    filler ทั้งหมดใน timeline (ผลเดียวกับ matcher.find(timeline.normalized_tokens())) แบบ column:
+    (index คำแรก, index คำสุดท้าย, index ของ pattern ใน matcher.patterns, start_fraction, end_fraction)
+    """
+    if len(timeline) == 0:
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty, empty, np.zeros(0), np.zeros(0)
+    if matcher.word_only:
+        return _word_filler_columns(timeline, matcher)
+    return _scanned_filler_columns(timeline, matcher)
+
+
+def rolling_pace(timeline, window_seconds=PACE_WINDOW_SECONDS, step_seconds=None):
+    """WPM ในหน้าต่างเวลาเลื่อน คืนค่า (เวลาเริ่มหน้าต่าง, wpm) เป็น numpy array"""
+    if len(timeline) == 0:
+        return np.zeros(0), np.zeros(0)
+    step_seconds = step_seconds or window_seconds / 2
+    duration = float(timeline.ends[-1])
+    window_starts = np.arange(0.0, max(duration - window_seconds, 0.0) + step_seconds, step_seconds)
+    counts = np.searchsorted(timeline.starts, window_starts + window_seconds) - np.searchsorted(timeline.starts, window_starts)
+    effective = np.minimum(window_seconds, np.maximum(duration - window_starts, 1e-9))
+    return window_starts, counts * 60.0 / effective
+
+
+def compute_delivery_stats(timeline, language="th", pause_threshold=PAUSE_THRESHOLD_SECONDS,
+                           window_seconds=PACE_WINDOW_SECONDS, matcher=None):
+    """สถิติการพูดทั้งหมดจาก WordTimeline: WPM, filler words (FillerMatcher ของภาษา ผ่าน filler_match_columns), long pauses และ pace รายช่วง"""
+    word_count = len(timeline)
+    duration_seconds = float(timeline.ends[-1]) if word_count and timeline.ends[-1] > 0 else 1.0
+    wpm = word_count / duration_seconds * 60
+
+    matcher = matcher or get_matcher(language)
+    firsts, lasts, patterns, start_fractions, end_fractions = filler_match_columns(timeline, matcher)
+    durations = timeline.ends - timeline.starts
+    filler_starts = np.round(timeline.starts[firsts] + durations[firsts] * start_fractions, 3)
+    filler_ends = np.round(timeline.starts[lasts] + durations[lasts] * end_fractions, 3)
+
+    pauses = timeline.starts[1:] - timeline.ends[:-1]
+    long_pause_mask = pauses >= pause_threshold
+    window_starts, window_wpm = rolling_pace(timeline, window_seconds)
+
+    return {
+        "word_count": word_count,
+        "duration_seconds": duration_seconds,
+        "wpm": wpm,
+        "filler_word_count": len(firsts),
+        "filler_matches": [{"phrase": matcher.patterns[pattern][0], "word_index": first, "Start (s)": start, "End (s)": end}
+                           for pattern, first, start, end in zip(patterns.tolist(), firsts.tolist(), filler_starts.tolist(), filler_ends.tolist())],
+        "long_pauses": int(np.count_nonzero(long_pause_mask)),
+        "long_pause_starts": timeline.ends[:-1][long_pause_mask].tolist(),
+        "longest_pause": float(pauses.max()) if len(pauses) else 0.0,
+        "pause_threshold": pause_threshold,
+        "pace_windows": [{"start": float(s), "wpm": float(w)} for s, w in zip(window_starts, window_wpm)],
+    }
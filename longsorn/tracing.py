@@ -0,0 +1,152 @@
+"""บันทึกเวลาของแต่ละขั้นตอนใน pipeline (span) และส่งออกเป็น Prometheus text / JSON log"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+
+logger = logging.getLogger("longsorn.trace")
+_log_lock = threading.Lock()
+_log_handler = None
+
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# attribute ที่เป็นตัวเลขเหล่านี้จะถูกรวมเป็น counter ใน metrics
+COUNTER_ATTRIBUTES = ("bytes_in", "bytes_out", "audio_seconds", "words", "prompt_tokens", "output_tokens", "saved_seconds", "llm_calls", "parse_failures",
+                      "retries", "rate_limited", "hedges")
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    start: float
+    duration: float = 0.0
+    attributes: dict = field(default_factory=dict)
+    error: str = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+
+class Trace:
+    """span ทั้งหมดของการวิเคราะห์หนึ่งครั้ง"""
+
+    def __init__(self, trace_id=None, metrics=None):
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.metrics = metrics
+        self.spans = []
+
+    @contextmanager
+    def span(self, name, **attributes):
+        span = Span(name=name, trace_id=self.trace_id, start=time.time(), attributes=dict(attributes))
+        start = time.perf_counter()
+        try:
+            yield span
+        except Exception as e:
+            span.error = str(e)
+            raise
+        finally:
+            span.duration = time.perf_counter() - start
+            self.spans.append(span)
+            logger.info(json.dumps({"event": "span", **asdict(span)}, ensure_ascii=False, default=str))
+            if self.metrics is not None:
+                self.metrics.observe(span)
+
+    def to_dict(self):
+        return {"trace_id": self.trace_id, "spans": [asdict(span) for span in self.spans]}
+
+
+class Metrics:
+    """สะสมค่าจากทุก trace ใน process (histogram ของเวลาแต่ละขั้นตอน + counter)"""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self._durations = {}  # stage -> [bucket counts..., sum, count]
+        self._counters = {}  # (metric, stage) -> value
+        self._lock = threading.Lock()
+
+    def observe(self, span):
+        with self._lock:
+            histogram = self._durations.setdefault(span.name, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if span.duration <= bound:
+                    histogram["buckets"][i] += 1
+            histogram["sum"] += span.duration
+            histogram["count"] += 1
+            if span.error:
+                self._add("errors", span.name, 1)
+            for name in COUNTER_ATTRIBUTES:
+                value = span.attributes.get(name)
+                if isinstance(value, (int, float)):
+                    self._add(name, span.name, value)
+            if "cache_hit" in span.attributes:
+                self._add("cache_hits" if span.attributes["cache_hit"] else "cache_misses", span.name, 1)
+
+    def _add(self, metric, stage, value):
+        self._counters[(metric, stage)] = self._counters.get((metric, stage), 0) + value
+
+    def to_prometheus(self):
+        lines = ["# HELP longsorn_stage_duration_seconds Time spent in each pipeline stage.",
+                 "# TYPE longsorn_stage_duration_seconds histogram"]
+        with self._lock:
+            for stage, histogram in sorted(self._durations.items()):
+                for bound, count in zip(self.buckets, histogram["buckets"]):
+                    lines.append(f'longsorn_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                lines.append(f'longsorn_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram["count"]}')
+                lines.append(f'longsorn_stage_duration_seconds_sum{{stage="{stage}"}} {histogram["sum"]:.6f}')
+                lines.append(f'longsorn_stage_duration_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+            for metric in sorted({metric for metric, _ in self._counters}):
+                lines.append(f"# TYPE longsorn_{metric}_total counter")
+                for (name, stage), value in sorted(self._counters.items()):
+                    if name == metric:
+                        lines.append(f'longsorn_{metric}_total{{stage="{stage}"}} {value:g}')
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """เขียนไฟล์สำหรับ textfile collector ของ node_exporter (atomic)"""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(temp_path, path)
+
+
+metrics = Metrics()
+
+
+def configure_trace_log(destination=None):
+    """
+    ส่ง span เป็น JSON หนึ่งบรรทัดต่อ span ไปที่ destination (ค่าเริ่มต้นจาก LONGSORN_TRACE_LOG):
+    "stderr" หรือ "1" = stderr, ค่าอื่น = path ของไฟล์ (เขียนต่อท้าย), ว่าง = ไม่บันทึก ตั้งค่าครั้งเดียวต่อ process
+    """
+    global _log_handler
+    destination = destination if destination is not None else os.getenv("LONGSORN_TRACE_LOG", "")
+    with _log_lock:
+        if _log_handler is not None or not destination:
+            return _log_handler
+        if destination in ("1", "stderr"):
+            handler = logging.StreamHandler(sys.stderr)
+        else:
+            handler = logging.FileHandler(destination, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False  # ไม่ให้ handler ของ root (เช่นของ Streamlit) พิมพ์ซ้ำ
+        _log_handler = handler
+        return handler
+
+
+def new_trace(trace_id=None):
+    """Trace ที่ส่งค่าเข้า metrics กลางของ process"""
+    configure_trace_log()
+    return Trace(trace_id, metrics)
+
+
+def export_metrics():
+    """เขียน metrics ลงไฟล์ถ้าตั้งค่า LONGSORN_METRICS_FILE ไว้ (เรียกหลังจบแต่ละ pipeline)"""
+    path = os.getenv("LONGSORN_METRICS_FILE")
+    if path:
+        metrics.write_textfile(path)
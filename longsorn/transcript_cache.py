@@ -0,0 +1,63 @@
+"""Cache ผลถอดเสียงบนดิสก์ (content-addressed) ใช้ร่วมกันได้ข้าม restart และข้าม replica ที่แชร์ volume"""
+import hashlib
+import json
+import os
+
+from longsorn.disk_cache import DiskCache
+
+HASH_BLOCK_SIZE = 1 << 20
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "longsorn", "transcripts")
+
+
+def audio_fingerprint(pcm, block_size=HASH_BLOCK_SIZE):
+    """SHA-256 ของเสียง อ่านทีละ block (รับ bytes หรือ file object ที่เปิดแบบ binary)"""
+    digest = hashlib.sha256()
+    if isinstance(pcm, (bytes, bytearray, memoryview)):
+        view = memoryview(pcm)
+        for offset in range(0, len(view), block_size):
+            digest.update(view[offset:offset + block_size])
+    else:
+        for block in iter(lambda: pcm.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def transcript_cache_key(audio_digest, language_code, config=None):
+    payload = json.dumps({"audio": audio_digest, "language_code": language_code, "config": config or {}}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def pack_transcript(stt_result):
+    """เก็บ word_timestamps แบบ column (เวลาเป็นมิลลิวินาทีจำนวนเต็ม) แทน list ของ dict"""
+    words = stt_result["word_timestamps"]
+    return {
+        "t": stt_result["transcript"],
+        "w": [w["Word"] for w in words],
+        "s": [round(w["Start (s)"] * 1000) for w in words],
+        "e": [round(w["End (s)"] * 1000) for w in words],
+    }
+
+
+def unpack_transcript(packed):
+    return {
+        "transcript": packed["t"],
+        "word_timestamps": [
+            {"Word": word, "Start (s)": start / 1000, "End (s)": end / 1000}
+            for word, start, end in zip(packed["w"], packed["s"], packed["e"])
+        ],
+    }
+
+
+class TranscriptCache(DiskCache):
+    """ผลถอดเสียงแบบ content-addressed (key จาก transcript_cache_key) เก็บในรูป pack_transcript"""
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        super().__init__(directory or os.getenv("LONGSORN_CACHE_DIR") or DEFAULT_CACHE_DIR, max_bytes)
+
+    def get(self, key):
+        packed = self.get_raw(key)
+        return unpack_transcript(packed) if packed is not None else None
+
+    def put(self, key, stt_result):
+        self.put_raw(key, pack_transcript(stt_result))
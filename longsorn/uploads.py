@@ -0,0 +1,105 @@
+"""เก็บไฟล์ที่อัปโหลดลงดิสก์ (แยกโฟลเดอร์ต่อ session) แทนการเก็บ bytes ทั้งไฟล์ไว้ใน session_state"""
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+
+CHUNK_SIZE = 4 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 2 * 60 * 60
+DEFAULT_UPLOAD_DIR = os.path.join(tempfile.gettempdir(), "longsorn_uploads")
+# st.video(path) อ่านทั้งไฟล์เข้าหน่วยความจำ (MemoryMediaFileStorage) หนึ่งชุดต่อ session ที่เปิดหน้าผลลัพธ์
+# จึงเล่นจาก path เฉพาะไฟล์ที่ไม่ใหญ่กว่านี้ ไฟล์ใหญ่กว่าต้องตั้ง LONGSORN_UPLOAD_BASE_URL ให้ web server ส่งไฟล์แทน
+DEFAULT_MAX_INLINE_PLAYBACK_MB = 20
+
+
+@dataclass(frozen=True)
+class UploadHandle:
+    """สิ่งที่เก็บใน session_state แทนตัวไฟล์: path บนดิสก์ + ข้อมูลประกอบ"""
+    path: str
+    file_name: str
+    size: int
+    sha256: str
+
+    @property
+    def suffix(self):
+        return os.path.splitext(self.file_name)[1]
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+
+class UploadStore:
+    """
+    base_url: URL ที่ web server (เช่น nginx) ส่งไฟล์จากโฟลเดอร์ root ให้เบราว์เซอร์โดยตรง เพื่อเล่นวิดีโอโดยไม่ผ่านหน่วยความจำของ Streamlit
+    max_inline_playback_bytes: ถ้าไม่มี base_url ไฟล์ที่ใหญ่กว่านี้จะไม่ถูกส่งเข้า st.video
+    """
+
+    def __init__(self, root=None, ttl_seconds=DEFAULT_TTL_SECONDS, base_url=None, max_inline_playback_bytes=None):
+        self.root = root or os.getenv("LONGSORN_UPLOAD_DIR") or DEFAULT_UPLOAD_DIR
+        self.ttl_seconds = ttl_seconds
+        self.base_url = (base_url or os.getenv("LONGSORN_UPLOAD_BASE_URL") or "").rstrip("/")
+        if max_inline_playback_bytes is None:
+            max_inline_playback_bytes = float(os.getenv("LONGSORN_MAX_INLINE_PLAYBACK_MB") or DEFAULT_MAX_INLINE_PLAYBACK_MB) * 1024 * 1024
+        self.max_inline_playback_bytes = max_inline_playback_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _session_dir(self, session_id):
+        return os.path.join(self.root, session_id)
+
+    def save(self, session_id, file_obj, file_name, chunk_size=CHUNK_SIZE):
+        """คัดลอก file_obj (เช่น UploadedFile ของ Streamlit) ลงดิสก์ทีละ chunk พร้อมคำนวณ SHA-256 ไปด้วย"""
+        self.cleanup_expired()
+        session_dir = self._session_dir(session_id)
+        os.makedirs(session_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        file_obj.seek(0)
+        fd, temp_path = tempfile.mkstemp(dir=session_dir, suffix=".part")
+        with os.fdopen(fd, "wb") as out:
+            for block in iter(lambda: file_obj.read(chunk_size), b""):
+                digest.update(block)
+                out.write(block)
+                size += len(block)
+        path = os.path.join(session_dir, digest.hexdigest() + os.path.splitext(file_name)[1].lower())
+        os.replace(temp_path, path)
+        return UploadHandle(path=path, file_name=file_name, size=size, sha256=digest.hexdigest())
+
+    def playback_source(self, handle):
+        """
+        สิ่งที่ส่งให้ st.video: URL จาก base_url (เบราว์เซอร์โหลดจาก web server ทีละช่วง) ถ้าตั้งไว้,
+        ไม่งั้น path ของไฟล์ถ้าไม่เกิน max_inline_playback_bytes, ไฟล์ใหญ่กว่านั้นคืนค่า None
+        """
+        if self.base_url:
+            relative = os.path.relpath(handle.path, self.root).replace(os.sep, "/")
+            return f"{self.base_url}/{relative}"
+        if handle.size <= self.max_inline_playback_bytes:
+            return handle.path
+        return None
+
+    def touch(self, handle):
+        """ต่ออายุ TTL ของ session เมื่อยังใช้งานไฟล์อยู่"""
+        try:
+            os.utime(os.path.dirname(handle.path))
+        except OSError:
+            pass
+
+    def discard(self, handle):
+        shutil.rmtree(os.path.dirname(handle.path), ignore_errors=True)
+
+    def cleanup_expired(self):
+        """ลบโฟลเดอร์ของ session ที่ไม่ถูกใช้งานเกิน ttl_seconds คืนค่าจำนวนที่ลบ"""
+        removed = 0
+        deadline = time.time() - self.ttl_seconds
+        with self._lock:
+            for entry in os.scandir(self.root):
+                try:
+                    if entry.is_dir() and entry.stat().st_mtime < deadline:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                        removed += 1
+                except OSError:
+                    continue
+        return removed
@@ -0,0 +1,138 @@
+"""
+Voice activity detection บน PCM ด้วย NumPy: ตัดช่วงเงียบยาว ๆ ออกก่อนส่ง STT (ลดวินาทีที่ถูกคิดเงิน)
+พร้อมตารางแปลงเวลา เพื่อให้เวลาของคำชี้กลับไปยังเวลาในวิดีโอต้นฉบับ
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from longsorn.ingest import SAMPLE_RATE
+from longsorn.stt import frame_energy
+
+FRAME_SECONDS = 0.03
+# ระดับพลังงานที่ถือว่าเป็นเสียงพูด: สูงกว่า noise floor (percentile ที่ 10) อย่างน้อยเท่านี้ (dB)
+SPEECH_MARGIN_DB = 12.0
+MIN_SPEECH_DB = 30.0  # ต่ำกว่านี้ถือว่าเงียบเสมอ (dBFS ของ int16 ประมาณ 0-90)
+# ไฟล์ที่แทบไม่มีช่วงเงียบ percentile ที่ 10 เป็นเสียงพูดเอง: threshold ต้องไม่เกินระดับเสียงดัง (percentile ที่ 90) - SPEECH_MARGIN_DB
+LOUD_PERCENTILE = 90
+# เฟรมที่เบากว่าระดับเสียงดังไม่เกินเท่านี้ (dB) ถือว่าอาจเป็นเสียงพูด ถ้าถูกตัดทิ้งเกิน MAX_DROPPED_SPEECH_SHARE ส่ง PCM เต็มไฟล์แทน
+SPEECH_RANGE_DB = 20.0
+MAX_DROPPED_SPEECH_SHARE = 0.05
+PADDING_SECONDS = 0.25  # เผื่อหัว-ท้ายช่วงพูด ไม่ให้ตัดพยัญชนะต้น/ท้ายคำ
+# ช่วงเงียบที่สั้นกว่านี้เก็บไว้ทั้งหมด ที่ยาวกว่าจะถูกย่อเหลือ KEPT_SILENCE_SECONDS
+MIN_SILENCE_SECONDS = 1.0
+KEPT_SILENCE_SECONDS = 0.5
+
+
+@dataclass
+class VadResult:
+    pcm: bytes  # PCM หลังตัดช่วงเงียบ (ส่งเข้า STT)
+    compressed_starts: np.ndarray  # เวลาเริ่มของแต่ละช่วงใน pcm ที่ตัดแล้ว (วินาที)
+    original_starts: np.ndarray  # เวลาเริ่มของช่วงเดียวกันในไฟล์ต้นฉบับ
+    original_seconds: float
+    sample_rate: int = SAMPLE_RATE
+
+    @property
+    def sent_seconds(self):
+        return len(self.pcm) / (2 * self.sample_rate)
+
+    @property
+    def saved_seconds(self):
+        return self.original_seconds - self.sent_seconds
+
+    def to_original(self, seconds):
+        """แปลงเวลา (scalar หรือ array) ใน pcm ที่ตัดแล้ว กลับเป็นเวลาในไฟล์ต้นฉบับ"""
+        seconds = np.asarray(seconds, dtype=np.float64)
+        if len(self.compressed_starts) == 0:
+            return seconds
+        index = np.clip(np.searchsorted(self.compressed_starts, seconds, side="right") - 1, 0, None)
+        return self.original_starts[index] + (seconds - self.compressed_starts[index])
+
+    def map_words(self, word_timestamps):
+        if not word_timestamps:
+            return word_timestamps
+        starts = self.to_original([w["Start (s)"] for w in word_timestamps])
+        ends = self.to_original([w["End (s)"] for w in word_timestamps])
+        return [{"Word": w["Word"], "Start (s)": float(s), "End (s)": float(e)} for w, s, e in zip(word_timestamps, starts, ends)]
+
+    def summary(self):
+        return {"original_seconds": self.original_seconds, "sent_seconds": self.sent_seconds, "saved_seconds": self.saved_seconds}
+
+
+def frame_energy_db(samples, sample_rate=SAMPLE_RATE):
+    frame_size = int(FRAME_SECONDS * sample_rate)
+    return 20 * np.log10(frame_energy(samples, frame_size) + 1e-9), frame_size
+
+
+def speech_mask(samples, sample_rate=SAMPLE_RATE, energy_db=None):
+    """mask ต่อเฟรม (True = มีเสียงพูด) จากพลังงานเทียบกับ noise floor ของไฟล์เอง"""
+    if energy_db is None:
+        energy_db, frame_size = frame_energy_db(samples, sample_rate)
+    else:
+        frame_size = int(FRAME_SECONDS * sample_rate)
+    if len(energy_db) == 0:
+        return np.zeros(0, dtype=bool), frame_size
+    noise_floor, loud = np.percentile(energy_db, [10, LOUD_PERCENTILE])
+    threshold = max(min(noise_floor + SPEECH_MARGIN_DB, loud - SPEECH_MARGIN_DB), MIN_SPEECH_DB)
+    mask = energy_db >= threshold
+    # ขยายช่วงพูดออกไปข้างละ PADDING_SECONDS (dilation ด้วย convolution)
+    pad = int(PADDING_SECONDS / FRAME_SECONDS)
+    if pad:
+        mask = np.convolve(mask.astype(np.int32), np.ones(2 * pad + 1, dtype=np.int32), mode="same") > 0
+    return mask, frame_size
+
+
+def _runs(mask):
+    """ช่วงต่อเนื่องของค่า True คืนค่า (starts, ends) เป็น index ของเฟรม"""
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    return edges[0::2], edges[1::2]
+
+
+def dropped_speech_share(energy_db, seg_starts, seg_ends):
+    """สัดส่วนของเฟรมที่ดังพอจะเป็นเสียงพูด (ไม่เกิน SPEECH_RANGE_DB ต่ำกว่าระดับเสียงดัง) แต่อยู่นอกช่วงที่เก็บไว้"""
+    loud = np.percentile(energy_db, LOUD_PERCENTILE)
+    speech_like = energy_db >= max(loud - SPEECH_RANGE_DB, MIN_SPEECH_DB)
+    kept = np.zeros(len(energy_db), dtype=bool)
+    for start, end in zip(seg_starts, seg_ends):
+        kept[start:end] = True
+    total = np.count_nonzero(speech_like)
+    return np.count_nonzero(speech_like & ~kept) / total if total else 0.0
+
+
+def compress_silence(pcm, sample_rate=SAMPLE_RATE, min_silence_seconds=MIN_SILENCE_SECONDS, kept_silence_seconds=KEPT_SILENCE_SECONDS):
+    """
+    ย่อช่วงเงียบที่ยาวกว่า min_silence_seconds ให้เหลือ kept_silence_seconds (ช่วงเงียบหัว-ท้ายไฟล์ถูกตัดทิ้ง)
+    ช่วงเงียบสั้น ๆ ระหว่างคำถูกเก็บไว้ตามเดิม ถ้าการตัดจะทิ้งเฟรมที่น่าจะเป็นเสียงพูดเกิน MAX_DROPPED_SPEECH_SHARE
+    (เช่นพูดต่อเนื่องแทบไม่มีช่วงเงียบ) จะส่ง PCM เต็มไฟล์แทน
+    """
+    samples = np.frombuffer(pcm, dtype="<i2")
+    original_seconds = len(samples) / sample_rate
+    energy_db, frame_size = frame_energy_db(samples, sample_rate)
+    mask, _ = speech_mask(samples, sample_rate, energy_db)
+    run_starts, run_ends = _runs(mask)
+    if len(run_starts) == 0:
+        return VadResult(b"", np.zeros(0), np.zeros(0), original_seconds, sample_rate)
+
+    # รวมช่วงพูดที่ห่างกันน้อยกว่า min_silence_seconds เข้าด้วยกัน
+    gap_frames = int(min_silence_seconds / FRAME_SECONDS)
+    gaps = run_starts[1:] - run_ends[:-1]
+    keep_break = np.concatenate(([True], gaps >= gap_frames))
+    seg_starts = run_starts[keep_break]
+    seg_ends = np.concatenate((run_ends[:-1][keep_break[1:]], [run_ends[-1]]))
+    if dropped_speech_share(energy_db, seg_starts, seg_ends) > MAX_DROPPED_SPEECH_SHARE:
+        return VadResult(pcm, np.zeros(1), np.zeros(1), original_seconds, sample_rate)
+
+    kept_silence = int(kept_silence_seconds * sample_rate)
+    silence = np.zeros(kept_silence, dtype="<i2")
+    pieces = []
+    compressed_starts, original_starts = [], []
+    position = 0
+    for start_frame, end_frame in zip(seg_starts, seg_ends):
+        start, end = start_frame * frame_size, min(end_frame * frame_size, len(samples))
+        if pieces:
+            pieces.append(silence); position += kept_silence
+        compressed_starts.append(position / sample_rate)
+        original_starts.append(start / sample_rate)
+        pieces.append(samples[start:end]); position += end - start
+    return VadResult(np.concatenate(pieces).tobytes(), np.asarray(compressed_starts), np.asarray(original_starts), original_seconds, sample_rate)
@@ -0,0 +1,122 @@
+"""การวิเคราะห์ด้วย Gemini (fake model, ไม่ผ่าน limiter ของ process)"""
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from longsorn.analysis import MAX_TOTAL_SUGGESTIONS, SuggestionLimiter
+from longsorn.fakes import FakeGenerativeModel, fake_gemini_caller
+from longsorn.pipeline import run_real_nlp_analysis
+
+
+def words_for(seconds, step=0.4):
+    return [{"Word": f"w{i % 997}", "Start (s)": i * step, "End (s)": i * step + 0.3} for i in range(int(seconds / step))]
+
+
+class BrokenSectionModel(FakeGenerativeModel):
+    """ช่วงที่ระบุตอบ JSON ที่ไม่ผ่าน schema ทุกครั้ง"""
+
+    def __init__(self, broken_section, **kwargs):
+        super().__init__(latency=0, seconds_per_1k_chars=0, **kwargs)
+        self.broken_section = broken_section
+
+    def generate_content(self, prompt, **kwargs):
+        if f"section {self.broken_section} of" in prompt:
+            return SimpleNamespace(text='{"clarity_score": 42}')
+        return super().generate_content(prompt, **kwargs)
+
+
+def analyze(words, model, output_mode):
+    transcript = " ".join(w["Word"] for w in words)
+    return run_real_nlp_analysis(transcript, words, "", "th-TH", lambda: model, output_mode=output_mode, caller=fake_gemini_caller)
+
+
+def test_default_output_mode_streams_events_as_they_arrive():
+    words = words_for(300)
+    transcript = " ".join(w["Word"] for w in words)
+    # ~0.5 วินาทีกระจายตาม chunk ละ 20 ตัวอักษร: event ต้องออกมาระหว่างที่ model ยังตอบไม่จบ
+    model = FakeGenerativeModel(latency=0, seconds_per_1k_chars=0.1, stream_chunk_chars=20)
+    arrivals = []
+    start = time.perf_counter()
+    results = run_real_nlp_analysis(transcript, words, "", "th-TH", lambda: model, caller=fake_gemini_caller,
+                                    on_event=lambda event: arrivals.append((time.perf_counter() - start, event)))
+    total = time.perf_counter() - start
+
+    assert len(arrivals) >= 3
+    assert arrivals[0][0] < total / 2
+    assert results["timings"]["first_feedback_s"] < results["timings"]["total_s"] / 2
+
+    # parser ของข้อความต้องได้ event ชุดเดียวกับโหมด JSON (ลำดับต่างกันได้)
+    structured = []
+    run_real_nlp_analysis(transcript, words, "", "th-TH", lambda: FakeGenerativeModel(latency=0, seconds_per_1k_chars=0), output_mode="json",
+                          caller=fake_gemini_caller, on_event=structured.append)
+    assert sorted((event for _, event in arrivals), key=repr) == sorted(structured, key=repr)
+
+
+def test_failed_sections_are_reported_in_warnings():
+    results = analyze(words_for(1200), BrokenSectionModel(broken_section=2), "json")
+
+    assert results["timings"]["sections"] == 4
+    assert results["timings"]["failed_sections"] == 1
+    assert len(results["warnings"]) == 1
+    assert "1 จาก 4" in results["warnings"][0]
+    assert results["speech_analysis"]["Clarity Score"] > 0
+
+
+def test_complete_analysis_has_no_warnings():
+    results = analyze(words_for(1200), FakeGenerativeModel(latency=0, seconds_per_1k_chars=0), "json")
+
+    assert results["timings"]["failed_sections"] == 0
+    assert results["warnings"] == []
+
+
+@pytest.mark.parametrize("output_mode", ["text", "json"])
+def test_long_file_suggestions_are_capped_and_spread(output_mode):
+    words = words_for(3600)
+    results = analyze(words, FakeGenerativeModel(latency=0, seconds_per_1k_chars=0), output_mode)
+
+    recommendations = results["ai_recommendations"]
+    assert results["timings"]["sections"] == 12
+    assert 0 < len(recommendations) <= MAX_TOTAL_SUGGESTIONS
+    originals = [rec["original"] for rec in recommendations]
+    assert len(set(originals)) == len(originals)
+    # ช่วงละหนึ่งคำแนะนำ ไม่ใช่ห้าคำแนะนำจากช่วงแรก ๆ
+    assert len({item["timestamp"] for item in results["timeline_feedback"]}) == results["timings"]["sections"]
+
+
+def test_duplicate_suggestions_across_sections_are_dropped():
+    def recommendation(original):
+        return "recommendation", {"timestamp": 0.0, "type": "filler", "original": original, "suggestion": "ตัดออก"}
+
+    limiter = SuggestionLimiter(section_count=2, max_total=3)
+    first = limiter.select([recommendation("แบบว่า นะครับ"), ("keywords", ["ครู"]), recommendation("ก็คือ")])
+    second = limiter.select([recommendation("แบบว่า  นะครับ"), recommendation("Um so"), recommendation("um SO"), recommendation("อะไรอีก")])
+
+    assert [payload["original"] for _, payload in first] == ["แบบว่า นะครับ"]
+    assert [payload["original"] for _, payload in second] == ["Um so"]
+
+
+@pytest.mark.parametrize("output_mode", ["text", "json"])
+def test_cached_responses_keep_section_timestamps(tmp_path, output_mode):
+    from longsorn.response_cache import ResponseCache
+
+    cache = ResponseCache(str(tmp_path), near_duplicates=True)
+    words = words_for(1800)  # คำวนซ้ำทุก 997 คำ วลีเดียวกันจึงพบได้ในหลายช่วง
+    model = FakeGenerativeModel(latency=0, seconds_per_1k_chars=0)
+
+    def timestamps(words):
+        transcript = " ".join(w["Word"] for w in words)
+        results = run_real_nlp_analysis(transcript, words, "", "th-TH", lambda: model, output_mode=output_mode, response_cache=cache,
+                                        caller=fake_gemini_caller)
+        return results["timings"]["response_cache"], [item["timestamp"] for item in results["timeline_feedback"]]
+
+    miss, fresh = timestamps(words)
+    exact, from_cache = timestamps(words)
+    edited = [dict(w) for w in words]
+    edited[10]["Word"] = "แก้ไข"
+    near, from_near = timestamps(edited)
+
+    assert (miss, exact, near) == ("miss", "exact", "near")
+    assert model.calls == 6
+    assert from_cache == fresh
+    assert from_near == fresh
@@ -0,0 +1,94 @@
+"""CLI ของ longsorn.batch ในโหมด --fake: ผลต่อท้าย JSONL, ไฟล์เสียไม่กระทบไฟล์อื่น, รันซ้ำข้ามไฟล์ที่สำเร็จแล้ว"""
+import json
+import wave
+
+import pytest
+
+from longsorn import batch, ingest
+from longsorn.fakes import synthetic_speech_pcm
+
+
+def fake_run_ffmpeg(command, input_bytes=None):
+    """แทน ffmpeg ด้วยการอ่าน WAV ตรง ๆ (process ลูกของ ProcessPoolExecutor ได้ตัวนี้ไปด้วยเพราะ fork)"""
+    path = command[command.index("-i") + 1]
+    try:
+        with wave.open(path, "rb") as f:
+            pcm = f.readframes(f.getnframes())
+            seconds = f.getnframes() / f.getframerate()
+    except (wave.Error, EOFError):
+        return 1, b"", f"{path}: Invalid data found when processing input\n"
+    return 0, pcm, f"  Duration: 00:00:{seconds:05.2f}, start: 0.000000, bitrate: 256 kb/s\n"
+
+
+def write_wav(path, seconds):
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(ingest.SAMPLE_RATE)
+        f.writeframes(synthetic_speech_pcm(seconds))
+
+
+@pytest.fixture
+def recordings(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "_run_ffmpeg", fake_run_ffmpeg)
+    folder = tmp_path / "recordings"
+    (folder / "week2").mkdir(parents=True)
+    write_wav(folder / "lesson1.wav", 20)
+    write_wav(folder / "week2" / "lesson2.wav", 25)
+    (folder / "broken.wav").write_bytes(b"not a wav file")
+    (folder / "notes.txt").write_text("ไม่ใช่ไฟล์เสียง")
+    return folder
+
+
+def run_batch(recordings, output, capsys, *extra):
+    exit_code = batch.main([str(recordings), "--output", str(output), "--fake", "--no-cache", "--language", "th-TH",
+                            "--encoding", "LINEAR16", "--ffmpeg-workers", "2", *extra])
+    summary = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    with open(output, encoding="utf-8") as f:
+        return exit_code, summary, [json.loads(line) for line in f]
+
+
+def test_each_file_gets_one_jsonl_record_and_errors_stay_isolated(recordings, tmp_path, capsys):
+    exit_code, summary, records = run_batch(recordings, tmp_path / "results.jsonl", capsys)
+
+    assert exit_code == 1
+    assert (summary["files"], summary["ok"], summary["failed"], summary["skipped"]) == (3, 2, 1, 0)
+    by_name = {record["path"].rsplit("/", 1)[-1]: record for record in records}
+    assert sorted(by_name) == ["broken.wav", "lesson1.wav", "lesson2.wav"]
+    assert by_name["broken.wav"]["status"] == "error" and "FFmpeg Error" in by_name["broken.wav"]["error"]
+    for name, seconds in (("lesson1.wav", 20), ("lesson2.wav", 25)):
+        record = by_name[name]
+        assert record["status"] == "ok" and record["error"] is None
+        assert record["audio_seconds"] == pytest.approx(seconds)
+        assert record["language_code"] == "th-TH" and record["keywords"]
+        assert len(record["file_sha256"]) == 64
+
+
+def test_rerun_skips_completed_files_and_retries_failures(recordings, tmp_path, capsys):
+    output = tmp_path / "results.jsonl"
+    run_batch(recordings, output, capsys)
+
+    _, summary, records = run_batch(recordings, output, capsys)
+
+    assert (summary["skipped"], summary["ok"], summary["failed"]) == (2, 0, 1)
+    assert len(records) == 4 and records[-1]["path"].endswith("broken.wav")
+    assert [record["status"] for record in records].count("ok") == 2
+
+
+def test_changed_parameters_analyze_again(recordings, tmp_path, capsys):
+    output = tmp_path / "results.jsonl"
+    run_batch(recordings, output, capsys)
+
+    _, summary, records = run_batch(recordings, output, capsys, "--output-mode", "json")
+
+    assert (summary["skipped"], summary["ok"]) == (0, 2)
+    assert {record["output_mode"] for record in records if record["status"] == "ok"} == {"text", "json"}
+
+
+def test_truncated_last_line_is_ignored_on_resume(recordings, tmp_path, capsys):
+    output = tmp_path / "results.jsonl"
+    run_batch(recordings, output, capsys)
+    with open(output, "a", encoding="utf-8") as f:
+        f.write('{"key": "unfinished", "status": "o')
+
+    assert len(batch.load_completed(str(output))) == 2
@@ -0,0 +1,76 @@
+"""ClientRegistry: สร้าง client นอก lock รวม, key เดียวกันสร้างครั้งเดียว, client เก่าถูกปิด"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from longsorn.clients import ClientRegistry
+
+
+class Client:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_same_key_is_built_once_under_concurrency():
+    registry = ClientRegistry()
+    builds = []
+
+    def factory():
+        builds.append(1)
+        time.sleep(0.1)
+        return Client("speech")
+
+    with ThreadPoolExecutor(8) as pool:
+        clients = list(pool.map(lambda _: registry.get("speech", "key", factory), range(8)))
+
+    assert len(builds) == 1
+    assert all(client is clients[0] for client in clients)
+    assert registry.stats()["speech"]["created"] == 1 and registry.stats()["speech"]["reused"] == 7
+
+
+def test_slow_build_does_not_block_other_keys():
+    registry = ClientRegistry()
+    release = threading.Event()
+
+    def slow_factory():
+        release.wait(5)
+        return Client("slow")
+
+    blocked = threading.Thread(target=registry.get, args=("speech", "slow", slow_factory))
+    blocked.start()
+    try:
+        time.sleep(0.05)
+        start = time.perf_counter()
+        registry.get("gemini", "fast", lambda: Client("fast"))
+        assert time.perf_counter() - start < 1
+    finally:
+        release.set()
+        blocked.join()
+
+
+def test_replaced_clients_are_closed_after_the_grace_period():
+    registry = ClientRegistry(max_age_seconds=0, retired_grace_seconds=0.1)
+    first = registry.get("speech", "key", lambda: Client("first"))
+    second = registry.get("speech", "key", lambda: Client("second"))
+
+    assert second is not first and not first.closed
+    time.sleep(0.15)
+    registry.get("gemini", "other", lambda: Client("other"))
+    assert first.closed and not second.closed
+
+
+def test_clear_closes_clients_through_their_transport():
+    registry = ClientRegistry()
+    transport = Client("transport")
+    registry.get("speech", "key", lambda: SimpleNamespace(transport=transport))
+    model = registry.get("gemini", "key", lambda: SimpleNamespace())  # ไม่มี close: ข้ามไป
+
+    registry.clear()
+
+    assert transport.closed
+    assert registry.get("gemini", "key", lambda: SimpleNamespace()) is not model
@@ -0,0 +1,87 @@
+"""คุณลักษณะของเสียงพูด (longsorn.features) บนสัญญาณสังเคราะห์ที่รู้ค่าคำตอบ"""
+import warnings
+
+import numpy as np
+import pytest
+
+from longsorn.features import extract_features
+from longsorn.ingest import SAMPLE_RATE
+
+SECONDS = 10
+
+
+def times(seconds=SECONDS):
+    return np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+
+
+def voiced(f0, amplitude=6000, seconds=SECONDS, speaking=0.8):
+    """
+    เสียงก้องที่มี harmonic (เหมือนสระ) ความถี่มูลฐาน f0 เงียบสนิทหลังสัดส่วน speaking ของทุกวินาที
+    (noise floor ประมาณจากเฟรมที่เบาที่สุด เสียงที่ดังคงที่ตลอดจึงไม่ถูกนับเป็นเสียงพูด)
+    """
+    t = times(seconds)
+    wave = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 6))
+    return wave / np.abs(wave).max() * amplitude * (t % 1 < speaking)
+
+
+def pcm(signal):
+    return np.clip(signal, -32768, 32767).astype("<i2").tobytes()
+
+
+@pytest.mark.parametrize("f0", [110.0, 180.0, 260.0])
+def test_pitch_of_a_steady_voice(f0):
+    features = extract_features(pcm(voiced(f0)))
+    summary = features.summary()
+
+    assert summary["mean_pitch_hz"] == pytest.approx(f0, rel=0.03)
+    assert summary["pitch_variability_semitones"] < 0.5
+    assert summary["speech_seconds"] == pytest.approx(0.8 * SECONDS, abs=0.3)
+
+
+def test_pitch_glide_has_higher_variability_than_a_monotone():
+    t = times()
+    glide = np.sin(2 * np.pi * np.cumsum(np.linspace(120, 240, len(t))) / SAMPLE_RATE) * 6000 * (t % 1 < 0.8)
+
+    assert extract_features(pcm(glide)).summary()["pitch_variability_semitones"] > 2
+    assert extract_features(pcm(voiced(150))).summary()["pitch_variability_semitones"] < 0.5
+
+
+def test_energy_follows_amplitude():
+    # ครึ่งแรกเบา ครึ่งหลังดังกว่า 4 เท่า (+12 dB)
+    signal = voiced(150)
+    signal[len(signal) // 2:] *= 4
+    features = extract_features(pcm(signal / 4))
+
+    quiet, loud = features.energy_db[:SECONDS // 2 - 1], features.energy_db[SECONDS // 2 + 1:]
+    assert np.median(loud) - np.median(quiet) == pytest.approx(20 * np.log10(4), abs=0.5)
+    assert features.summary()["energy_range_db"] == pytest.approx(20 * np.log10(4), abs=1)
+
+
+@pytest.mark.parametrize("syllables_per_second", [3.0, 5.0])
+def test_syllable_rate_counts_loudness_peaks(syllables_per_second):
+    t = times()
+    envelope = np.sin(np.pi * syllables_per_second * t) ** 2  # หนึ่งยอดต่อพยางค์ ช่วงระหว่างยอดเบาพอเป็น noise floor
+    features = extract_features(pcm(voiced(150, speaking=1) * envelope))
+
+    assert features.summary()["syllables_per_second"] == pytest.approx(syllables_per_second, rel=0.15)
+
+
+def test_silence_has_no_pitch_and_no_warnings():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        features = extract_features(np.zeros(SECONDS * SAMPLE_RATE, dtype="<i2").tobytes())
+
+    assert len(features) == SECONDS
+    assert np.isnan(features.pitch_hz).all()
+    assert features.summary() == {"mean_pitch_hz": None, "pitch_variability_semitones": None, "energy_range_db": None,
+                                  "syllables_per_second": None, "speech_seconds": 0.0}
+
+
+def test_block_size_does_not_change_the_result():
+    t = times(30)
+    signal = voiced(150, seconds=30) * (np.sin(np.pi * 4 * t) ** 2) * (t % 7 < 5) * np.linspace(0.5, 1.5, len(t))
+    whole = extract_features(pcm(signal), block_seconds=60)
+    blocks = extract_features(pcm(signal), block_seconds=2.3)
+
+    assert whole.to_records() == blocks.to_records()
+    assert whole.starts[-1] == pytest.approx(29)
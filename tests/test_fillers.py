@@ -0,0 +1,166 @@
+"""การตรวจ filler words (longsorn.fillers) กับประโยคที่ติดป้ายไว้และกรณีขอบคำ/คำยกเว้น"""
+import json
+import os
+import random
+
+import pytest
+
+from longsorn.fillers import PRUNE_TOKENS, FillerMatcher, get_matcher
+from longsorn.phrase_index import normalize_token
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures")
+
+with open(os.path.join(FIXTURES, "fillers_th_labeled.json"), encoding="utf-8") as f:
+    LABELED = [(case["tokens"], case["fillers"]) for case in json.load(f)["cases"]]
+
+
+def phrases(language, sentence):
+    tokens = [normalize_token(token) for token in sentence.split("|")]
+    return [match.phrase for match in get_matcher(language).find(tokens)]
+
+
+@pytest.mark.parametrize("sentence,expected", LABELED, ids=[sentence for sentence, _ in LABELED])
+def test_labeled_thai_sentences(sentence, expected):
+    assert phrases("th", sentence) == expected
+
+
+@pytest.mark.parametrize("sentence,expected", [
+    ("แบบ|ว่า|ถ้า", ["แบบว่า"]),
+    ("แบบว่า", ["แบบว่า"]),
+    ("แบบว่าแบบ|ว่า", ["แบบว่า", "แบบว่า"]),
+    ("แบบ|ปรนัย", ["แบบ"]),
+    ("แบบ|แบบ|ว่า", ["แบบ", "แบบว่า"]),
+    ("แบบฝึกหัด", []),
+    ("รูปแบบ", []),
+])
+def test_longer_filler_wins_over_its_prefix(sentence, expected):
+    assert phrases("th", sentence) == expected
+
+
+@pytest.mark.parametrize("sentence", ["น้ำ|เอ่อล้น|ตลิ่ง", "เอ่อล้นตลิ่ง", "ได้|คะแนน|เต็ม", "คะแนนนะคะ|ดี"])
+def test_excluded_words_hide_fillers_inside_them(sentence):
+    assert "เอ่อ" not in phrases("th", sentence)
+    assert phrases("th", sentence).count("นะคะ") == sentence.count("นะคะ")
+
+
+def test_exclude_list_of_custom_matcher():
+    matcher = FillerMatcher(["um", "so"], exclude=["so so"], join=" ", default_match="anywhere")
+
+    assert [m.phrase for m in matcher.find(["so", "so", "um", "so"])] == ["um", "so"]
+    assert [m.phrase for m in matcher.find(["um", "so"])] == ["um", "so"]
+
+
+@pytest.mark.parametrize("sentence,expected", [
+    ("you|know|the|answer", ["you know"]),
+    ("do|you|know|it", ["you know"]),
+    ("you|knowledge", []),
+    ("young|know", []),
+    ("so|we|start", ["so"]),
+    ("also|soon|sofa|reason", []),
+    ("Um,|SO|I|mean|right", ["um", "so", "i mean", "right"]),
+    ("alright|like|likely", ["like"]),
+])
+def test_english_fillers_match_whole_words_only(sentence, expected):
+    assert phrases("en", sentence) == expected
+
+
+def fixture_tokens(repeat):
+    with open(os.path.join(FIXTURES, "stt_th_lecture.json"), encoding="utf-8") as f:
+        words = [normalize_token(word) for word in json.load(f)["w"]]
+    labeled = [normalize_token(token) for sentence, _ in LABELED for token in sentence.split("|")]
+    return (words + labeled) * repeat
+
+
+def merged(tokens, probability, seed=0):
+    """รวมคำที่ติดกันแบบสุ่มแบบที่ STT ภาษาไทยมักส่งมา"""
+    rng = random.Random(seed)
+    result = [tokens[0]]
+    for token in tokens[1:]:
+        if rng.random() < probability:
+            result[-1] += token
+        else:
+            result.append(token)
+    return result
+
+
+@pytest.mark.parametrize("probability", [0.0, 0.3])
+def test_incremental_scanner_matches_find(probability):
+    matcher = get_matcher("th")
+    tokens = merged(fixture_tokens(40), probability)
+    assert len(tokens) > 2 * PRUNE_TOKENS  # ผ่านการทิ้งคำเก่าของ scanner ด้วย
+    expected = matcher.find(tokens)
+
+    one_by_one = matcher.scanner()
+    for token in tokens:
+        one_by_one.feed(token)
+    assert one_by_one.finish() == expected
+
+    rng = random.Random(1)
+    chunked, position = matcher.scanner(), 0
+    while position < len(tokens):
+        size = rng.randint(1, 50)
+        chunked.feed_many(tokens[position:position + size])
+        position += size
+    assert chunked.finish() == expected
+    assert expected
+
+
+def test_provisional_count_settles_to_final_count():
+    matcher = get_matcher("th")
+    tokens = [normalize_token(token) for token in "ครู|แบบ|ว่า".split("|")]
+    scanner = matcher.scanner()
+    scanner.feed(tokens[0])
+    scanner.feed(tokens[1])
+    assert [m.phrase for m in scanner.matches + scanner.provisional()] == ["แบบ"]
+
+    scanner.feed(tokens[2])
+    assert [m.phrase for m in scanner.finish()] == ["แบบว่า"]
+
+
+def test_match_positions_within_merged_words():
+    match, = get_matcher("th").find(["ก็คือว่า"])
+
+    assert (match.first, match.last) == (0, 0)
+    assert match.start_fraction == 0 and match.end_fraction == pytest.approx(5 / 8)
+    assert match.times([10.0], [18.0]) == (10.0, pytest.approx(15.0))
+
+
+def columns_as_matches(matcher, tokens):
+    from longsorn.timeline import WordTimeline, filler_match_columns
+
+    timeline = WordTimeline.from_word_timestamps([{"Word": token, "Start (s)": i, "End (s)": i + 0.5} for i, token in enumerate(tokens)])
+    firsts, lasts, patterns, start_fractions, end_fractions = filler_match_columns(timeline, matcher)
+    return [(f, l, matcher.patterns[p][0], s, e) for f, l, p, s, e in
+            zip(firsts.tolist(), lasts.tolist(), patterns.tolist(), start_fractions.tolist(), end_fractions.tolist())]
+
+
+def as_tuples(matches):
+    return [(m.first, m.last, m.phrase, m.start_fraction, m.end_fraction) for m in matches]
+
+
+@pytest.mark.parametrize("probability", [0.0, 0.3, 0.7])
+def test_timeline_columns_match_find_for_thai(probability):
+    matcher = get_matcher("th")
+    tokens = merged(fixture_tokens(3), probability, seed=2)
+
+    assert columns_as_matches(matcher, tokens) == as_tuples(matcher.find(tokens))
+
+
+def test_timeline_columns_match_find_for_english():
+    matcher = get_matcher("en")
+    assert matcher.word_only
+    rng = random.Random(3)
+    vocab = ["so", "you", "know", "i", "mean", "um", "like", "likely", "the", "right", "also", "you", "know"]
+    tokens = [rng.choice(vocab) for _ in range(5000)]
+
+    expected = as_tuples(matcher.find(tokens))
+    assert columns_as_matches(matcher, tokens) == expected
+    assert any(phrase == "you know" for _, _, phrase, _, _ in expected)
+
+
+def test_timeline_columns_with_exclusions_use_the_automaton():
+    matcher = FillerMatcher(["um", "so"], exclude=["so so"], join=" ", default_match="anywhere")
+    tokens = "so|so|um|so|x|um".split("|")
+
+    assert not matcher.word_only
+    assert columns_as_matches(matcher, tokens) == as_tuples(matcher.find(tokens))
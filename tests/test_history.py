@@ -0,0 +1,103 @@
+"""AnalysisStore (SQLite WAL): query ของหน้าความก้าวหน้า และการเขียนพร้อมกันจากหลาย thread/process"""
+import multiprocessing
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from longsorn.history import AnalysisStore
+
+DAY = 86400.0
+
+
+def nlp_results(wpm=120.0, fillers=6, clarity=7.0, seconds=600.0, words=None):
+    results = {
+        "delivery_stats": {"duration_seconds": seconds, "word_count": int(wpm * seconds / 60), "wpm": wpm},
+        "speech_analysis": {"Filler Words Detected": fillers, "Long Pauses": 2, "Clarity Score": clarity, "Speaking Pace": "Normal",
+                            "Clarity Justification": "ok"},
+        "keywords": ["ครู"],
+        "timeline_feedback": [{"timestamp": "0:30", "original": "แบบว่า"}],
+    }
+    if words:
+        results["word_timeline"] = {"words": words, "starts": [i * 0.5 for i in range(len(words))], "ends": [i * 0.5 + 0.4 for i in range(len(words))]}
+    return results
+
+
+@pytest.fixture
+def store(tmp_path):
+    return AnalysisStore(str(tmp_path / "history.sqlite3"))
+
+
+def test_history_is_newest_first_per_user(store):
+    for day, wpm in enumerate((100.0, 110.0, 120.0)):
+        store.add("teacher", f"video{day}", nlp_results(wpm=wpm), job_id=f"job{day}", file_name=f"week{day}.mp4", created_at=(day + 1) * DAY)
+    store.add("other", "video0", nlp_results(), job_id="job0", created_at=5 * DAY)
+
+    rows = store.history("teacher")
+    assert [row["wpm"] for row in rows] == [120.0, 110.0, 100.0]
+    assert rows[0]["summary"]["keywords"] == ["ครู"] and rows[0]["file_name"] == "week2.mp4"
+    assert [row["wpm"] for row in store.history("teacher", limit=1, offset=1)] == [110.0]
+    assert [row["user_id"] for row in store.for_video("video0")] == ["teacher", "other"]
+
+
+def test_same_job_is_recorded_once_per_user(store):
+    assert store.add("teacher", "video", nlp_results(), job_id="job") is not None
+    assert store.add("teacher", "video", nlp_results(), job_id="job") is None
+    assert store.add("other", "video", nlp_results(), job_id="job") is not None
+
+    ids = store.add_many([("teacher", "video", nlp_results(), {"job_id": "job"}), ("teacher", "video", nlp_results(), {"job_id": "new"})])
+    assert ids[0] is None and ids[1] is not None
+    assert len(store.history("teacher")) == 2
+
+
+def test_trend_per_analysis_and_per_bucket(store):
+    for created_at, wpm, fillers, clarity in ((0.5 * DAY, 100.0, 10, 6.0), (0.7 * DAY, 140.0, 20, 0.0), (8 * DAY, 130.0, 5, 8.0)):
+        store.add("teacher", "video", nlp_results(wpm=wpm, fillers=fillers, clarity=clarity), created_at=created_at)
+
+    assert [point["value"] for point in store.trend("teacher", "wpm")] == [100.0, 140.0, 130.0]
+    assert store.trend("teacher", "wpm", bucket="week") == [{"start": 0, "value": 120.0, "count": 2},
+                                                            {"start": 7 * DAY, "value": 130.0, "count": 1}]
+    # clarity 0 = อ่านคะแนนไม่ได้ ไม่นำมาเฉลี่ย
+    assert [point["value"] for point in store.trend("teacher", "clarity", bucket="week")] == [6.0, 8.0]
+    assert [point["value"] for point in store.trend("teacher", "filler_per_minute", since=DAY)] == [0.5]
+    with pytest.raises(KeyError):
+        store.trend("teacher", "wpm; DROP TABLE analyses")
+
+
+def test_word_timeline_round_trip_and_cascade_delete(store):
+    analysis_id = store.add("teacher", "video", nlp_results(words=["สวัสดี", "ครับ", "um"]))
+
+    timeline = store.word_timeline(analysis_id)
+    assert timeline["words"] == ["สวัสดี", "ครับ", "um"]
+    assert timeline["starts"] == pytest.approx([0.0, 0.5, 1.0]) and timeline["ends"] == pytest.approx([0.4, 0.9, 1.4])
+    assert store.word_timeline(store.add("teacher", "video2", nlp_results())) is None
+
+    assert store.delete_user("teacher") == 2
+    assert store.history("teacher") == [] and store.word_timeline(analysis_id) is None
+
+
+def test_database_uses_wal(store):
+    assert store._connect().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert sqlite3.connect(store.path).execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def write_rows(path, user_id, count):
+    store = AnalysisStore(path)
+    for i in range(count):
+        store.add(user_id, f"video{i}", nlp_results(words=["คำ"] * 50), job_id=f"{user_id}-{i}")
+
+
+def test_concurrent_writers_do_not_lose_rows(store):
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(lambda n: write_rows(store.path, f"thread{n}", 25), range(4)))
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=write_rows, args=(store.path, f"process{n}", 25)) for n in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+
+    assert [process.exitcode for process in processes] == [0, 0, 0]
+    counts = dict(store._connect().execute("SELECT user_id, COUNT(*) FROM analyses GROUP BY user_id").fetchall())
+    assert counts == {**{f"thread{n}": 25 for n in range(4)}, **{f"process{n}": 25 for n in range(3)}}
+    assert store._connect().execute("SELECT COUNT(*) FROM word_timelines").fetchone()[0] == 175
@@ -0,0 +1,152 @@
+"""JobExecutor + InMemoryJobBackend กับ handler จำลอง (ไม่เรียก pipeline จริง)"""
+import os
+import threading
+import time
+
+from longsorn.jobs import JOB_DONE, JOB_FAILED, InMemoryJobBackend, JobExecutor, job_key
+
+
+class StubHandler:
+    """คืนค่าผลตาม results ทีละครั้ง (ค่าสุดท้ายใช้ซ้ำ) รอ release ก่อนตอบถ้า block=True"""
+
+    def __init__(self, *results, block=False):
+        self.results = list(results) or [({"warnings": [], "timings": {}}, None)]
+        self.calls = []
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+
+    def __call__(self, job, progress, on_event):
+        self.calls.append(job.id)
+        progress(50, "half way")
+        on_event(("clarity", {"score": 8.0, "justification": "ok"}))
+        self.release.wait(5)
+        return self.results[min(len(self.calls), len(self.results)) - 1]
+
+
+def wait_finished(executor, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = executor.get(job_id)
+        if job is not None and job.finished:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def executor_for(tmp_path, handler, **backend_options):
+    return JobExecutor(handler, InMemoryJobBackend(str(tmp_path), **backend_options), workers=2)
+
+
+def test_concurrent_identical_submissions_share_one_job(tmp_path):
+    handler = StubHandler(block=True)
+    executor = executor_for(tmp_path, handler)
+    jobs = []
+    threads = [threading.Thread(target=lambda n=n: jobs.append(executor.submit(f"s{n}", "hash", {}, description="x"))) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    handler.release.set()
+
+    assert len({job.id for job in jobs}) == 1
+    job = wait_finished(executor, jobs[0].id)
+    assert handler.calls == [job.id]
+    assert sorted(job.sessions) == sorted(f"s{n}" for n in range(8))
+
+
+def test_different_params_are_separate_jobs(tmp_path):
+    executor = executor_for(tmp_path, StubHandler())
+
+    assert executor.submit("s", "hash", {}, description="a").id != executor.submit("s", "hash", {}, description="b").id
+
+
+def test_reattach_by_job_id_sees_progress_events_and_result(tmp_path):
+    handler = StubHandler(({"warnings": [], "timings": {}, "score": 8}, None), block=True)
+    executor = executor_for(tmp_path, handler)
+    job_id = executor.submit("s1", "hash", {"upload": "a"}).id
+    while not handler.calls:
+        time.sleep(0.01)
+
+    running = executor.get(job_id)
+    assert running.progress == 50 and running.message == "half way"
+    assert running.events == [("clarity", {"score": 8.0, "justification": "ok"})]
+    handler.release.set()
+    assert wait_finished(executor, job_id).result["score"] == 8
+
+
+def test_failed_job_is_retried_on_resubmit(tmp_path):
+    handler = StubHandler((None, "STT failed"), ({"warnings": [], "timings": {}}, None))
+    executor = executor_for(tmp_path, handler)
+
+    first = wait_finished(executor, executor.submit("s", "hash", {}).id)
+    assert first.status == JOB_FAILED and first.error == "STT failed"
+    assert not os.path.exists(os.path.join(tmp_path, f"{first.id}.json"))
+
+    second = wait_finished(executor, executor.submit("s", "hash", {}).id)
+    assert second.status == JOB_DONE
+    assert len(handler.calls) == 2
+
+
+def test_complete_result_is_reused_after_restart(tmp_path):
+    executor = executor_for(tmp_path, StubHandler())
+    wait_finished(executor, executor.submit("s", "hash", {}, description="x").id)
+
+    second = StubHandler()
+    restarted = executor_for(tmp_path, second)
+    job = restarted.submit("s2", "hash", {}, description="x")
+    assert job.status == JOB_DONE
+    assert second.calls == []
+
+
+def test_result_with_warnings_is_not_persisted_or_reused(tmp_path):
+    degraded = ({"warnings": ["Could not connect to Gemini API"], "timings": {"failed_sections": 0}}, None)
+    first = StubHandler(degraded)
+    executor = executor_for(tmp_path, first)
+    job = wait_finished(executor, executor.submit("s", "hash", {}, description="x").id)
+    assert job.status == JOB_DONE and job.result["warnings"]
+    assert not os.path.exists(os.path.join(tmp_path, f"{job.id}.json"))
+
+    # executor เดิม: ส่งซ้ำแล้ววิเคราะห์ใหม่
+    wait_finished(executor, executor.submit("s", "hash", {}, description="x").id)
+    assert len(first.calls) == 2
+
+    # executor ใหม่บน result_dir เดียวกัน
+    second = StubHandler()
+    restarted = executor_for(tmp_path, second)
+    wait_finished(restarted, restarted.submit("s", "hash", {}, description="x").id)
+    assert second.calls == [job.id]
+
+
+def test_partial_sections_are_not_reused(tmp_path):
+    handler = StubHandler(({"warnings": [], "timings": {"failed_sections": 2}}, None))
+    executor = executor_for(tmp_path, handler)
+    wait_finished(executor, executor.submit("s", "hash", {}).id)
+    wait_finished(executor, executor.submit("s", "hash", {}).id)
+
+    assert len(handler.calls) == 2
+
+
+def test_stale_persisted_file_is_ignored_and_deleted(tmp_path):
+    executor = executor_for(tmp_path, StubHandler())
+    job_id = executor.submit("s", "hash", {}).id
+    wait_finished(executor, job_id)
+    path = os.path.join(tmp_path, f"{job_id}.json")
+    assert os.path.exists(path)
+
+    handler = StubHandler()
+    expired = executor_for(tmp_path, handler, ttl_seconds=-1)
+    wait_finished(expired, expired.submit("s", "hash", {}).id)
+    assert handler.calls == [job_id]
+
+
+def test_sweep_removes_expired_result_files(tmp_path):
+    old = os.path.join(tmp_path, f"{job_key('old')}.json")
+    with open(old, "w", encoding="utf-8") as f:
+        f.write("{}")
+    os.utime(old, (time.time() - 7200, time.time() - 7200))
+    backend = InMemoryJobBackend(str(tmp_path), ttl_seconds=3600)
+    executor = JobExecutor(StubHandler(), backend, workers=1)
+
+    wait_finished(executor, executor.submit("s", "new", {}).id)
+    assert not os.path.exists(old)
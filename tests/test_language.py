@@ -0,0 +1,125 @@
+"""ตรวจภาษาพูดจากช่วงสั้น ๆ ของเสียง (longsorn.language) กับ FakeSpeechClient"""
+from types import SimpleNamespace
+
+import pytest
+
+from longsorn.fakes import FakeSpeechClient, fake_stt_caller, synthetic_speech_pcm
+from longsorn.ingest import SAMPLE_RATE
+from longsorn.language import SUPPORTED_LANGUAGE_CODES, WINDOW_SECONDS, detect_language, match_language_code, sample_windows
+from longsorn.pipeline import run_language_detection
+from longsorn.transcript_cache import TranscriptCache
+
+WINDOW = int(WINDOW_SECONDS * SAMPLE_RATE)
+
+
+def detect(client, pcm, **kwargs):
+    return detect_language(client, pcm, encoding="LINEAR16", caller=fake_stt_caller, **kwargs)
+
+
+class RecordingClient(FakeSpeechClient):
+    """จำความยาว (sample) ของเสียงที่ส่งมาแต่ละครั้ง"""
+
+    def __init__(self, **kwargs):
+        super().__init__(latency=0, **kwargs)
+        self.lengths = []
+
+    def recognize(self, config=None, audio=None):
+        self.lengths.append(len(audio["content"]) // 2)
+        return super().recognize(config=config, audio=audio)
+
+
+class ScriptedClient:
+    """ตอบตามลำดับของ responses: list ของ [(language_code, transcript), ...] ต่อหนึ่งช่วง"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+
+    def recognize(self, config=None, audio=None):
+        results = [SimpleNamespace(alternatives=[SimpleNamespace(transcript=text)], language_code=code) for code, text in self.responses.pop(0)]
+        return SimpleNamespace(results=results)
+
+
+def test_windows_are_spread_across_long_audio():
+    n_samples = 600 * SAMPLE_RATE
+    spans = sample_windows(n_samples)
+
+    assert len(spans) == 3
+    assert all(end - start == WINDOW for start, end in spans)
+    assert [(start + end) // 2 for start, end in spans] == [100 * SAMPLE_RATE, 300 * SAMPLE_RATE, 500 * SAMPLE_RATE]
+
+
+def test_short_audio_is_sent_once():
+    assert sample_windows(10 * SAMPLE_RATE) == [(0, 10 * SAMPLE_RATE)]
+    assert sample_windows(3 * WINDOW) == [(0, 3 * WINDOW)]
+    assert len(sample_windows(3 * WINDOW + 1)) == 3
+    assert sample_windows(0) == []
+
+
+def test_reported_codes_map_to_candidates():
+    assert match_language_code("en-us", SUPPORTED_LANGUAGE_CODES) == "en-US"
+    assert match_language_code("en-gb", SUPPORTED_LANGUAGE_CODES) == "en-US"
+    assert match_language_code("ja-jp", SUPPORTED_LANGUAGE_CODES) == "th-TH"
+    assert match_language_code(None, SUPPORTED_LANGUAGE_CODES) == "th-TH"
+
+
+@pytest.mark.parametrize("spoken", ["th-TH", "en-US"])
+def test_spoken_language_wins(spoken):
+    client = RecordingClient(spoken_language=spoken)
+    detection, error = detect(client, synthetic_speech_pcm(300))
+
+    assert error is None
+    assert detection["language_code"] == spoken
+    assert detection["votes"][spoken] > 0 and sum(detection["votes"].values()) == detection["votes"][spoken]
+    assert client.lengths == [WINDOW] * 3
+    assert detection["sampled_seconds"] == pytest.approx(3 * WINDOW_SECONDS)
+
+
+def test_votes_are_weighted_by_characters():
+    client = ScriptedClient([("en-us", "ok")], [("th-th", "สวัสดีครับนักเรียน")], [("en-us", "yes no")])
+    detection, _ = detect(client, synthetic_speech_pcm(300))
+
+    assert detection["votes"] == {"th-TH": len("สวัสดีครับนักเรียน"), "en-US": 7}
+    assert detection["language_code"] == "th-TH"
+
+
+@pytest.mark.parametrize("responses", [
+    ([("en-us", "abcd")], [("th-th", "กขคง")], []),  # เท่ากัน
+    ([], [], []),  # ไม่ได้ยินคำพูดเลย
+], ids=["tie", "silent"])
+def test_tie_or_silence_falls_back_to_thai(responses):
+    detection, error = detect(ScriptedClient(*responses), synthetic_speech_pcm(300))
+
+    assert error is None and detection["language_code"] == "th-TH"
+
+
+def test_silent_audio_with_fake_client_is_thai():
+    detection, _ = detect(RecordingClient(spoken_language="en-US"), bytes(60 * SAMPLE_RATE * 2))
+
+    assert detection["language_code"] == "th-TH"
+    assert detection["votes"] == {"th-TH": 0, "en-US": 0}
+
+
+def test_detection_is_cached_per_audio(tmp_path):
+    cache = TranscriptCache(str(tmp_path))
+    client = RecordingClient(spoken_language="en-US")
+    pcm = synthetic_speech_pcm(120)
+
+    first = run_language_detection(pcm, lambda: client, cache, encoding="LINEAR16", caller=fake_stt_caller)
+    second = run_language_detection(pcm, lambda: client, cache, encoding="LINEAR16", caller=fake_stt_caller)
+
+    assert (first["source"], second["source"]) == ("detected", "cache")
+    assert first["language_code"] == second["language_code"] == "en-US"
+    assert len(client.lengths) == 3
+    assert run_language_detection(synthetic_speech_pcm(120, seed=1), lambda: client, cache, encoding="LINEAR16",
+                                  caller=fake_stt_caller)["source"] == "detected"
+
+
+def test_failed_detection_uses_the_primary_language():
+    class BrokenClient:
+        def recognize(self, config=None, audio=None):
+            raise ValueError("quota exceeded")
+
+    detection = run_language_detection(synthetic_speech_pcm(60), BrokenClient, encoding="LINEAR16", caller=fake_stt_caller)
+
+    assert detection["language_code"] == "th-TH" and detection["source"] == "default"
+    assert "quota exceeded" in detection["error"]
@@ -0,0 +1,90 @@
+"""โหมด Live coaching กับ FakeStreamingSpeechClient (ป้อนเสียงเร็วกว่าเวลาจริง)"""
+import json
+import os
+import time
+
+import pytest
+
+from longsorn.fakes import FakeSpeechClient, FakeStreamingSpeechClient, synthetic_speech_pcm
+from longsorn.live import LiveStats, iter_pcm_frames, live_transcribe, run_live_session
+from longsorn.timeline import WordTimeline, compute_delivery_stats
+
+STT_FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures", "stt_th_lecture.json")
+
+
+@pytest.fixture(scope="module")
+def pcm():
+    return synthetic_speech_pcm(120)
+
+
+def test_recorded_audio_is_not_replayed_in_real_time(pcm):
+    start = time.perf_counter()
+    frames = list(iter_pcm_frames(pcm, speed=None))
+
+    assert time.perf_counter() - start < 1.0
+    assert b"".join(frames) == pcm
+
+
+def test_real_time_speed_paces_frames():
+    pcm = synthetic_speech_pcm(0.5)
+    start = time.perf_counter()
+    list(iter_pcm_frames(pcm, speed=1.0))
+
+    assert time.perf_counter() - start >= 0.35
+
+
+def test_live_session_updates_stats_for_each_final_result(pcm):
+    client = FakeStreamingSpeechClient(final_seconds=3.0)
+    updates, interims = [], []
+    start = time.perf_counter()
+
+    stats = run_live_session(client, iter_pcm_frames(pcm, speed=None), "th-TH", on_update=lambda s: updates.append(s.word_count),
+                             on_interim=interims.append)
+
+    assert time.perf_counter() - start < 10
+    assert stats.word_count > 0
+    assert updates == sorted(updates) and updates[-1] == stats.word_count
+    assert len(updates) <= 120 / 3.0 + 1
+    assert interims
+    assert client.bytes_received == len(pcm)
+
+
+def test_streams_are_reopened_with_continuous_timestamps(pcm):
+    client = FakeStreamingSpeechClient(final_seconds=3.0)
+    words = [word for batch in live_transcribe(client, iter_pcm_frames(pcm), stream_limit_seconds=30) for word in batch]
+
+    assert client.streams == 4
+    starts = [start for _, start, _ in words]
+    assert starts == sorted(starts)
+    assert words[-1][2] <= 120
+    assert starts[-1] > 90
+
+
+def test_live_words_match_batch_transcription(pcm):
+    """final ทุก 4 วินาทีได้คำเดียวกับการถอดเสียงทีละ 4 วินาทีด้วย FakeSpeechClient"""
+    live = [w for batch in live_transcribe(FakeStreamingSpeechClient(final_seconds=4.0), iter_pcm_frames(pcm)) for w in batch]
+    batch = []
+    for offset in range(0, len(pcm), 4 * 16000 * 2):
+        response = FakeSpeechClient(latency=0).recognize(config={"encoding": "LINEAR16"}, audio={"content": pcm[offset:offset + 4 * 16000 * 2]})
+        for result in response.results:
+            batch.extend(w.word for w in result.alternatives[0].words)
+
+    assert [word for word, _, _ in live] == batch
+
+
+def test_live_stats_match_batch_delivery_stats():
+    with open(STT_FIXTURE, encoding="utf-8") as f:
+        fixture = json.load(f)
+    cycle = fixture["duration_s"] + 2.5
+    words = [(w, n * cycle + s / 1000, n * cycle + e / 1000) for n in range(3) for w, s, e in zip(fixture["w"], fixture["s"], fixture["e"])]
+    stats = LiveStats("th")
+    for i in range(0, len(words), 7):
+        stats.add_words(words[i:i + 7])
+
+    batch = compute_delivery_stats(WordTimeline.from_word_timestamps([{"Word": w, "Start (s)": s, "End (s)": e} for w, s, e in words]), "th")
+    live = stats.snapshot()
+    assert batch["filler_word_count"] > 0 and batch["long_pauses"] > 0
+    for name in ("word_count", "filler_word_count", "long_pauses"):
+        assert live[name] == batch[name]
+    for name in ("wpm", "longest_pause"):
+        assert live[name] == pytest.approx(batch[name])
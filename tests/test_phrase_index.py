@@ -0,0 +1,41 @@
+"""การหาเวลาของวลีที่ Gemini ยกมาใน transcript (longsorn.phrase_index)"""
+import pytest
+
+from longsorn.phrase_index import PhraseIndex, find_timestamp_for_phrase, is_unspaced_script
+
+
+def index_of(sentence, step=1.0):
+    return PhraseIndex([{"Word": word, "Start (s)": i * step, "End (s)": i * step + 0.5} for i, word in enumerate(sentence.split("|"))])
+
+
+ENGLISH = index_of("Today|we|present|the|results|of|our|experiment|and|then|we|discuss|the|implications|of|these|results")
+THAI = index_of("วันนี้|ครู|จะ|สอน|เรื่อง|การ|สังเคราะห์|แสง|ของ|พืช|ซึ่ง|เป็น|กระบวนการ|สำคัญ")
+
+
+def test_exact_phrase():
+    assert ENGLISH.lookup("then we discuss") == 9.0
+    assert ENGLISH.lookup("The results, of our...") == 3.0
+
+
+def test_english_phrase_with_only_a_shared_prefix_is_not_found():
+    # "presentation" ขึ้นต้นด้วย "present" แต่ไม่ใช่วลีนี้
+    assert ENGLISH.lookup("presentation skills matter") is None
+    assert ENGLISH.lookup("the results were surprising") is None
+    assert find_timestamp_for_phrase("discussion of implications", ENGLISH) == "N/A"
+
+
+def test_thai_phrase_with_different_word_breaks():
+    assert THAI.lookup("การสังเคราะห์ แสงของพืช") == 5.0
+    assert THAI.lookup("ครูจะสอน") == 1.0
+
+
+def test_thai_prefix_fallback_requires_most_of_the_phrase():
+    # Gemini เปลี่ยนคำท้ายวลีเล็กน้อย: ส่วนที่ตรงยาวเกิน MIN_FUZZY_SHARE ของวลี
+    assert THAI.lookup("การสังเคราะห์แสงของต้นไม้") == 5.0
+    # ตรงแค่ "การสังเคราะห์" แต่ส่วนที่เหลือยาวกว่ามาก
+    assert THAI.lookup("การสังเคราะห์โปรตีนในเซลล์ของสัตว์เลี้ยงลูกด้วยนม") is None
+
+
+@pytest.mark.parametrize("text,expected", [("สวัสดี", True), ("hello", False), ("ok ครับ", True), ("日本語", True), ("123", False)])
+def test_unspaced_script_detection(text, expected):
+    assert is_unspaced_script(text) == expected
@@ -0,0 +1,184 @@
+"""ResilientCaller กับ fake API ที่ล้มเหลว/ช้าตามที่กำหนด (ไม่สุ่ม)"""
+import threading
+import time
+
+import pytest
+
+from longsorn.fakes import FakeAPIError
+from longsorn.resilience import CallDeadlineExceeded, ResilientCaller, TokenBucket
+
+
+class ScriptedAPI:
+    """ครั้งที่ n ที่ถูกเรียกทำตาม script[n]: exception ถูก raise, ตัวเลขคือวินาทีที่รอก่อนตอบ"""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, value="ok"):
+        with self._lock:
+            step = self.script[self.calls] if self.calls < len(self.script) else 0
+            self.calls += 1
+            call_number = self.calls
+        if isinstance(step, Exception):
+            raise step
+        time.sleep(step)
+        return f"{value}-{call_number}"
+
+
+class FlakyOnce:
+    """generate_content ล้มเหลวด้วย 503 ครั้งแรกเท่านั้น"""
+
+    def __init__(self, model):
+        self.model = model
+        self.failed = False
+        self._lock = threading.Lock()
+
+    def generate_content(self, *args, **kwargs):
+        with self._lock:
+            fail, self.failed = not self.failed, True
+        if fail:
+            raise FakeAPIError(503)
+        return self.model.generate_content(*args, **kwargs)
+
+
+class RecordingBucket(TokenBucket):
+    def __init__(self, rate):
+        super().__init__(rate)
+        self.pauses = []
+
+    def pause(self, seconds):
+        self.pauses.append(seconds)
+        super().pause(seconds)
+
+
+def test_transient_errors_are_retried_until_success():
+    api = ScriptedAPI(FakeAPIError(503), FakeAPIError(500))
+    caller = ResilientCaller("test", base_delay=0.001, seed=0)
+    stats = {}
+
+    assert caller.call(api, stats=stats) == "ok-3"
+    assert api.calls == 3
+    assert stats["retries"] == 2
+    assert caller.stats()["failures"] == 0
+
+
+def test_non_retryable_error_is_raised_without_retry():
+    api = ScriptedAPI(FakeAPIError(400))
+    caller = ResilientCaller("test", base_delay=0.001)
+
+    with pytest.raises(FakeAPIError):
+        caller.call(api)
+    assert api.calls == 1
+
+
+def test_gives_up_after_max_attempts():
+    api = ScriptedAPI(*[FakeAPIError(503)] * 3)
+    caller = ResilientCaller("test", max_attempts=3, base_delay=0.001)
+
+    with pytest.raises(FakeAPIError):
+        caller.call(api)
+    assert api.calls == 3
+    assert caller.stats()["failures"] == 1
+
+
+def test_rate_limited_response_pauses_the_shared_bucket():
+    bucket = RecordingBucket(rate=1000)
+    api = ScriptedAPI(FakeAPIError(429))
+    caller = ResilientCaller("test", bucket, base_delay=0.05, seed=1)
+    stats = {}
+
+    assert caller.call(api, stats=stats) == "ok-2"
+    assert stats["rate_limited"] == 1
+    assert len(bucket.pauses) == 1 and bucket.pauses[0] > 0
+
+
+def test_paused_bucket_blocks_every_caller():
+    bucket = TokenBucket(rate=1000)
+    bucket.pause(0.2)
+    start = time.monotonic()
+
+    assert bucket.acquire()
+    assert time.monotonic() - start >= 0.18
+
+
+def test_bucket_gives_up_when_wait_exceeds_deadline():
+    bucket = TokenBucket(rate=1000)
+    bucket.pause(5)
+
+    assert bucket.acquire(deadline=time.monotonic() + 0.05) is False
+
+
+def test_deadline_raises_call_deadline_exceeded():
+    api = ScriptedAPI(2.0)
+    caller = ResilientCaller("test", deadline_seconds=0.1)
+    start = time.monotonic()
+
+    with pytest.raises(CallDeadlineExceeded):
+        caller.call(api)
+    assert time.monotonic() - start < 1.0
+    assert caller.stats()["deadline_exceeded"] == 1
+
+
+def test_deadline_covers_retries():
+    api = ScriptedAPI(*[FakeAPIError(503)] * 10)
+    caller = ResilientCaller("test", max_attempts=10, base_delay=0.2, deadline_seconds=0.3, seed=0)
+
+    with pytest.raises(CallDeadlineExceeded):
+        caller.call(api)
+    assert api.calls < 10
+
+
+def test_hedged_request_wins_when_first_is_slow():
+    api = ScriptedAPI(1.0, 0)
+    caller = ResilientCaller("test", hedge_after_seconds=0.05)
+    stats = {}
+    start = time.monotonic()
+
+    assert caller.call(api, stats=stats) == "ok-2"
+    assert time.monotonic() - start < 0.5
+    assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+
+
+def test_no_hedge_when_first_answers_in_time():
+    api = ScriptedAPI(0)
+    caller = ResilientCaller("test", hedge_after_seconds=0.5)
+    stats = {}
+
+    assert caller.call(api, stats=stats) == "ok-1"
+    assert api.calls == 1
+    assert "hedges" not in stats
+
+
+def test_stream_retries_until_first_chunk():
+    attempts = []
+
+    def generate():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise FakeAPIError(503)
+        yield from ("a", "b", "c")
+
+    caller = ResilientCaller("test", base_delay=0.001)
+
+    assert list(caller.call_stream(generate)) == ["a", "b", "c"]
+    assert len(attempts) == 2
+
+
+def test_callers_can_be_injected_without_the_shared_limiter():
+    from longsorn.analysis import structured_feedback_events
+    from longsorn.fakes import FakeGenerativeModel, fake_gemini_caller
+
+    words = [{"Word": f"w{i % 97}", "Start (s)": i * 0.4, "End (s)": i * 0.4 + 0.3} for i in range(9000)]
+    model = FlakyOnce(FakeGenerativeModel(latency=0, seconds_per_1k_chars=0))
+    timings = {}
+    start = time.monotonic()
+
+    events = list(structured_feedback_events(model, words, "", "th-TH", timings, caller=fake_gemini_caller))
+    assert time.monotonic() - start < 5
+    assert timings["sections"] == 12 and timings["failed_sections"] == 0
+    assert timings["retries"] == 1
+    assert fake_gemini_caller.limiter is None
+    assert any(kind == "clarity" for kind, _ in events)
+
@@ -0,0 +1,98 @@
+"""ResponseCache: index ของ near-duplicate ต้องตามการ evict/discard/หมดอายุของไฟล์คำตอบ"""
+import json
+import os
+import time
+
+from longsorn.response_cache import INDEX_FILE, ResponseCache
+
+CONTEXT = "ctx"
+EVENTS = [("clarity", 80), ("keywords", ["ครู", "นักเรียน"])]
+
+
+def transcript(n):
+    return " ".join(f"lesson{n} word{i}" for i in range(300))
+
+
+def index_keys(cache):
+    with open(os.path.join(cache.directory, INDEX_FILE), encoding="utf-8") as f:
+        return [json.loads(line)["key"] for line in f]
+
+
+def fill(cache, count):
+    for n in range(count):
+        cache.put(f"key{n}", EVENTS, transcript(n), CONTEXT)
+
+
+def test_near_duplicate_lookup(tmp_path):
+    cache = ResponseCache(str(tmp_path), near_duplicates=True)
+    fill(cache, 1)
+
+    events, match = cache.get("other", transcript(0) + " extra", CONTEXT)
+    assert match == "near" and events == EVENTS
+
+
+def test_evicted_entries_leave_the_index(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=10**9, near_duplicates=True)
+    fill(cache, 1)
+    cache.max_bytes = os.path.getsize(cache._path("key0")) * 3
+    fill(cache, 200)
+
+    assert cache.stats()["evictions"] > 100
+    assert cache.get("other", transcript(0), CONTEXT) is None
+    kept = {entry.name[:-len(".json.gz")] for entry in os.scandir(tmp_path) if entry.name.endswith(".json.gz")}
+    assert set(cache._signatures[CONTEXT]) == kept
+    assert len(index_keys(cache)) < 200  # ไฟล์ถูกเขียนใหม่ระหว่างทาง ไม่โตตามจำนวน put
+
+
+def test_discarded_entry_is_not_a_near_duplicate(tmp_path):
+    cache = ResponseCache(str(tmp_path), near_duplicates=True)
+    fill(cache, 2)
+    cache.discard("key0")
+
+    assert cache.get("other", transcript(0), CONTEXT) is None
+    assert list(cache._signatures[CONTEXT]) == ["key1"]
+
+
+def test_missing_payload_is_dropped_from_the_index(tmp_path):
+    cache = ResponseCache(str(tmp_path), near_duplicates=True)
+    fill(cache, 1)
+    os.remove(cache._path("key0"))  # เช่น replica อื่น evict ไปแล้ว
+
+    assert cache.get("other", transcript(0), CONTEXT) is None
+    assert cache._signatures[CONTEXT] == {}
+
+
+def test_startup_compacts_stale_and_expired_lines(tmp_path):
+    cache = ResponseCache(str(tmp_path), near_duplicates=True)
+    fill(cache, 3)
+    cache.put("key1", EVENTS, transcript(1), CONTEXT)
+    os.remove(cache._path("key0"))
+    with open(os.path.join(tmp_path, INDEX_FILE), "a", encoding="utf-8") as f:
+        f.write(json.dumps({"context": CONTEXT, "key": "key2", "created": time.time() - 10**8, "signature": [0] * 64}) + "\n")
+    assert len(index_keys(cache)) == 5
+
+    reopened = ResponseCache(str(tmp_path), ttl_seconds=3600, near_duplicates=True)
+    assert sorted(index_keys(reopened)) == ["key1", "key2"]
+    assert reopened.get("other", transcript(1), CONTEXT)[1] == "near"
+    assert reopened.get("other", transcript(0), CONTEXT) is None
+
+
+def test_expired_index_entries_are_skipped_at_startup(tmp_path):
+    cache = ResponseCache(str(tmp_path), near_duplicates=True)
+    fill(cache, 2)
+
+    reopened = ResponseCache(str(tmp_path), ttl_seconds=-1, near_duplicates=True)
+    assert reopened._signatures == {}
+    assert index_keys(reopened) == []
+
+
+def payload_bytes(directory):
+    return sum(entry.stat().st_size for entry in os.scandir(directory) if entry.name.endswith(".json.gz"))
+
+
+def test_overwriting_a_key_does_not_inflate_the_byte_count(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=10**9)
+    for _ in range(20):
+        fill(cache, 3)
+
+    assert cache.stats()["bytes"] == payload_bytes(tmp_path)
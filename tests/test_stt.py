@@ -0,0 +1,144 @@
+"""การถอดเสียงไฟล์ยาว (longsorn.stt) บน PCM ที่ถอดมาแล้ว กับ fake client (ไม่ใช้ ffmpeg หรือ Google STT)"""
+import threading
+import time
+import zlib
+from datetime import timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from longsorn.fakes import FakeSpeechClient, fake_stt_caller, synthetic_speech_pcm
+from longsorn.ingest import SAMPLE_RATE
+from longsorn.stt import FRAME_SECONDS, MAX_CHUNK_SECONDS, build_recognition_config, split_on_silence, transcribe_long_audio
+
+FRAME = int(FRAME_SECONDS * SAMPLE_RATE)
+CONFIG = build_recognition_config("th-TH", encoding="LINEAR16")
+
+
+def burst_pcm(seconds, seed=0):
+    """คำ = เสียง 0.2-0.7 วินาที คั่นด้วยช่วงเงียบสนิท 0.4-0.8 วินาที"""
+    rng = np.random.default_rng(seed)
+    samples = np.zeros(int(seconds * SAMPLE_RATE), dtype="<i2")
+    position = int(0.5 * SAMPLE_RATE)
+    while position < len(samples):
+        length = int(rng.uniform(0.2, 0.7) * SAMPLE_RATE)
+        samples[position:position + length] = (rng.standard_normal(len(samples[position:position + length])) * 3000).astype("<i2")
+        position += length + int(rng.uniform(0.4, 0.8) * SAMPLE_RATE)
+    return samples.tobytes()
+
+
+class BurstSpeechClient:
+    """
+    หนึ่งคำต่อช่วงเฟรมที่มีเสียงติดกัน (เฟรมนับจากต้น content ขนาดเดียวกับที่ split_on_silence ใช้)
+    ถ้าตัด chunk ในช่วงเงียบ ผลของทุก chunk รวมกันจึงต้องเท่ากับการส่งทั้งไฟล์ครั้งเดียว
+    latencies: วินาทีที่รอของการเรียกครั้งที่ 1, 2, ... (ให้ chunk แรกเสร็จทีหลังได้)
+    """
+
+    def __init__(self, latencies=()):
+        self.latencies = list(latencies)
+        self.calls = 0
+        self.completed = []  # จำนวนคำแรกของแต่ละ chunk ตามลำดับที่ตอบเสร็จ
+        self._lock = threading.Lock()
+
+    def recognize(self, config=None, audio=None):
+        with self._lock:
+            call = self.calls
+            self.calls += 1
+        time.sleep(self.latencies[call] if call < len(self.latencies) else 0)
+        samples = np.frombuffer(audio["content"], dtype="<i2")
+        frames = samples[:len(samples) // FRAME * FRAME].reshape(-1, FRAME).astype(np.float32)
+        loud = np.concatenate(([False], np.sqrt((frames * frames).mean(axis=1)) > 100, [False]))
+        edges = np.flatnonzero(np.diff(loud.astype(np.int8)))
+        words = [SimpleNamespace(word=f"w{zlib.crc32(samples[a * FRAME:b * FRAME].tobytes()) % 100000}",
+                                 start_time=timedelta(seconds=a * FRAME / SAMPLE_RATE), end_time=timedelta(seconds=b * FRAME / SAMPLE_RATE))
+                 for a, b in zip(edges[0::2], edges[1::2])]
+        with self._lock:
+            self.completed.append(call)
+        alternative = SimpleNamespace(transcript=" ".join(w.word for w in words), words=words)
+        return SimpleNamespace(results=[SimpleNamespace(alternatives=[alternative])] if words else [])
+
+
+def assert_contiguous_chunks(chunks, total):
+    assert chunks[0][0] == 0 and chunks[-1][1] == total
+    assert all(end == next_start for (_, end), (next_start, _) in zip(chunks, chunks[1:]))
+    assert all(0 < end - start <= MAX_CHUNK_SECONDS * SAMPLE_RATE for start, end in chunks)
+
+
+@pytest.mark.parametrize("pcm", [burst_pcm(200), synthetic_speech_pcm(300)], ids=["bursts", "synthetic"])
+def test_chunks_cover_the_audio_and_stay_under_the_limit(pcm):
+    chunks = split_on_silence(pcm)
+
+    assert len(chunks) >= 4
+    assert_contiguous_chunks(chunks, len(pcm) // 2)
+
+
+def test_cuts_fall_in_silence():
+    pcm = burst_pcm(200)
+    samples = np.frombuffer(pcm, dtype="<i2")
+
+    for _, cut in split_on_silence(pcm)[:-1]:
+        assert cut % FRAME == 0
+        assert not samples[cut - FRAME:cut + FRAME].any()
+
+
+def test_audio_without_pauses_is_cut_at_the_limit():
+    pcm = (np.random.default_rng(0).standard_normal(130 * SAMPLE_RATE) * 3000).astype("<i2").tobytes()
+    chunks = split_on_silence(pcm)
+
+    assert len(chunks) == 3
+    assert_contiguous_chunks(chunks, len(pcm) // 2)
+
+
+def test_short_audio_is_one_chunk():
+    assert split_on_silence(burst_pcm(30)) == [(0, 30 * SAMPLE_RATE)]
+    assert split_on_silence(b"") == []
+
+
+def test_stitched_transcript_matches_a_single_call():
+    pcm = burst_pcm(200)
+    chunks = split_on_silence(pcm)
+    # chunk แรกช้าที่สุด: ตอบกลับไม่ตรงลำดับ แต่ผลต้องเรียงตามเวลา
+    client = BurstSpeechClient(latencies=[0.05 * (len(chunks) - i) for i in range(len(chunks))])
+    result, error = transcribe_long_audio(client, pcm, config=CONFIG, max_workers=len(chunks), caller=fake_stt_caller)
+    single = BurstSpeechClient().recognize(config=CONFIG, audio={"content": pcm})
+
+    assert error is None
+    assert client.calls == len(chunks)
+    assert client.completed != sorted(client.completed)
+    starts = [w["Start (s)"] for w in result["word_timestamps"]]
+    assert starts == sorted(starts)
+    expected = single.results[0].alternatives[0]
+    assert result["transcript"] == expected.transcript
+    assert [w["Word"] for w in result["word_timestamps"]] == [w.word for w in expected.words]
+    assert starts == pytest.approx([w.start_time.total_seconds() for w in expected.words])
+    assert [w["End (s)"] for w in result["word_timestamps"]] == pytest.approx([w.end_time.total_seconds() for w in expected.words])
+
+
+def test_words_from_each_chunk_are_offset_by_the_chunk_start():
+    pcm = synthetic_speech_pcm(180)
+    chunks = split_on_silence(pcm)
+    client = FakeSpeechClient(latency=0)
+    result, error = transcribe_long_audio(client, pcm, config=CONFIG, caller=fake_stt_caller)
+
+    assert error is None
+    expected = []
+    for start, end in chunks:
+        response = FakeSpeechClient(latency=0).recognize(config=CONFIG, audio={"content": pcm[start * 2:end * 2]})
+        for item in response.results:
+            expected.extend((w.word, start / SAMPLE_RATE + w.start_time.total_seconds()) for w in item.alternatives[0].words)
+    got = [(w["Word"], w["Start (s)"]) for w in result["word_timestamps"]]
+    assert [word for word, _ in got] == [word for word, _ in expected]
+    assert [start for _, start in got] == pytest.approx([start for _, start in expected])
+    assert all(0 <= start <= 180 for _, start in got)
+    assert [start for _, start in got] == sorted(start for _, start in got)
+
+
+def test_failed_chunk_returns_an_error():
+    class BrokenClient(BurstSpeechClient):
+        def recognize(self, config=None, audio=None):
+            raise ValueError("invalid audio")
+
+    result, error = transcribe_long_audio(BrokenClient(), burst_pcm(120), config=CONFIG, caller=fake_stt_caller)
+
+    assert result is None and "invalid audio" in error
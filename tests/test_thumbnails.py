@@ -0,0 +1,112 @@
+"""ThumbnailCache: ทุกเวลาที่ขาดถูกดึงใน ffmpeg ครั้งเดียว (subprocess ถูกแทนด้วย fake ที่เขียนไฟล์ JPEG ตาม output)"""
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from longsorn import thumbnails
+from longsorn.thumbnails import NO_VIDEO_MARKER, ThumbnailCache, build_thumbnail_command
+
+
+class FakeFFmpeg:
+    """บันทึกคำสั่งที่ถูกเรียก แล้วสร้างไฟล์ output ทุกไฟล์ที่ไม่เกิน duration (หรือตอบ stderr/returncode ที่กำหนด)"""
+
+    def __init__(self, duration=600.0, returncode=0, stderr=b"", jpeg_bytes=1000):
+        self.duration = duration
+        self.returncode = returncode
+        self.stderr = stderr
+        self.jpeg_bytes = jpeg_bytes
+        self.commands = []
+
+    def __call__(self, command, capture_output=False, **kwargs):
+        self.commands.append(command)
+        if self.returncode == 0:
+            seeks = [float(command[i + 1]) for i, arg in enumerate(command) if arg == "-ss"]
+            outputs = [arg for arg in command if arg.endswith(".jpg")]
+            for seconds, output in zip(seeks, outputs):
+                if seconds < self.duration:
+                    with open(output, "wb") as f:
+                        f.write(b"\xff\xd8" + b"\0" * self.jpeg_bytes)
+        return SimpleNamespace(returncode=self.returncode, stdout=b"", stderr=self.stderr)
+
+
+@pytest.fixture
+def ffmpeg(monkeypatch):
+    fake = FakeFFmpeg()
+    monkeypatch.setattr(thumbnails.subprocess, "run", fake)
+    return fake
+
+
+def test_command_seeks_before_each_input_and_maps_one_frame_per_output(tmp_path):
+    command = build_thumbnail_command("lesson.mp4", [12.5, 61.0], str(tmp_path), width=160)
+
+    assert command[:6] == ["ffmpeg", "-hide_banner", "-nostdin", "-loglevel", "error", "-y"]
+    assert command[6:14] == ["-ss", "12.500", "-i", "lesson.mp4", "-ss", "61.000", "-i", "lesson.mp4"]
+    assert command[14:] == [
+        "-map", "0:v:0", "-frames:v", "1", "-vf", "scale=160:-2", "-q:v", str(thumbnails.JPEG_QUALITY), str(tmp_path / "12500.jpg"),
+        "-map", "1:v:0", "-frames:v", "1", "-vf", "scale=160:-2", "-q:v", str(thumbnails.JPEG_QUALITY), str(tmp_path / "61000.jpg"),
+    ]
+
+
+def test_missing_times_are_extracted_in_one_batched_call(tmp_path, ffmpeg):
+    cache = ThumbnailCache(str(tmp_path))
+
+    paths, error = cache.get_many("lesson.mp4", "abc", [30.0, 5.0, 30.0, 900.0])
+
+    assert error is None
+    assert len(ffmpeg.commands) == 1
+    assert ffmpeg.commands[0].count("-i") == 3  # เวลาซ้ำถูกรวม
+    assert sorted(paths) == [5.0, 30.0]  # 900 วินาทีเกินความยาววิดีโอ
+    assert paths[5.0] == str(tmp_path / "abc" / "5000.jpg")
+
+    paths, error = cache.get_many("lesson.mp4", "abc", [5.0, 30.0, 45.0])
+
+    assert len(ffmpeg.commands) == 2
+    assert [arg for arg in ffmpeg.commands[1] if arg.endswith(".jpg")] == [str(tmp_path / "abc" / "45000.jpg")]
+    assert sorted(paths) == [5.0, 30.0, 45.0]
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 4
+
+
+def test_cached_times_do_not_run_ffmpeg(tmp_path, ffmpeg):
+    cache = ThumbnailCache(str(tmp_path))
+    cache.get_many("lesson.mp4", "abc", [5.0])
+
+    paths, _ = cache.get_many("lesson.mp4", "abc", [5.0])
+
+    assert len(ffmpeg.commands) == 1 and list(paths) == [5.0]
+
+
+def test_audio_only_file_is_remembered(tmp_path, monkeypatch):
+    fake = FakeFFmpeg(returncode=1, stderr=b"Stream map '0:v:0' matches no streams.\n")
+    monkeypatch.setattr(thumbnails.subprocess, "run", fake)
+    cache = ThumbnailCache(str(tmp_path))
+
+    assert cache.get_many("lecture.mp3", "audio", [5.0]) == ({}, None)
+    assert cache.get_many("lecture.mp3", "audio", [5.0, 10.0]) == ({}, None)
+    assert len(fake.commands) == 1
+    assert os.path.exists(tmp_path / "audio" / NO_VIDEO_MARKER)
+
+
+def test_ffmpeg_errors_are_returned_not_raised(tmp_path, monkeypatch):
+    monkeypatch.setattr(thumbnails.subprocess, "run", FakeFFmpeg(returncode=1, stderr=b"first\nlesson.mp4: Invalid data\n"))
+    assert ThumbnailCache(str(tmp_path)).get_many("lesson.mp4", "abc", [5.0]) == ({}, "lesson.mp4: Invalid data")
+
+    def missing_binary(command, **kwargs):
+        raise FileNotFoundError("ffmpeg")
+
+    monkeypatch.setattr(thumbnails.subprocess, "run", missing_binary)
+    paths, error = ThumbnailCache(str(tmp_path)).get_many("lesson.mp4", "def", [5.0])
+    assert paths == {} and "ffmpeg" in error
+
+
+def test_least_recently_opened_files_are_evicted(tmp_path, ffmpeg):
+    cache = ThumbnailCache(str(tmp_path), max_bytes=2500)
+    cache.get_many("a.mp4", "a", [1.0])
+    cache.get_many("b.mp4", "b", [1.0])
+    os.utime(tmp_path / "a", (0, 0))
+    os.utime(tmp_path / "b", (1, 1))
+
+    cache.get_many("c.mp4", "c", [1.0])
+
+    assert sorted(os.listdir(tmp_path)) == ["b", "c"]
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,43 @@
+"""LONGSORN_TRACE_LOG: span ถูกเขียนเป็น JSON หนึ่งบรรทัดต่อ span"""
+import json
+import logging
+
+import pytest
+
+from longsorn import tracing
+
+
+@pytest.fixture
+def trace_logger(monkeypatch):
+    monkeypatch.setattr(tracing, "_log_handler", None)
+    yield tracing.logger
+    if tracing._log_handler is not None:
+        tracing.logger.removeHandler(tracing._log_handler)
+        tracing._log_handler.close()
+    tracing.logger.setLevel(logging.NOTSET)
+    tracing.logger.propagate = True
+
+
+def test_spans_are_written_to_the_trace_log(tmp_path, monkeypatch, trace_logger):
+    path = tmp_path / "trace.log"
+    monkeypatch.setenv("LONGSORN_TRACE_LOG", str(path))
+
+    trace = tracing.new_trace("abc")
+    with trace.span("stt", words=3):
+        pass
+    with pytest.raises(ValueError), trace.span("nlp"):
+        raise ValueError("boom")
+    tracing.new_trace()  # ตั้งค่าแล้วไม่เพิ่ม handler ซ้ำ
+
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [(line["name"], line["trace_id"], line["error"]) for line in lines] == [("stt", "abc", None), ("nlp", "abc", "boom")]
+    assert lines[0]["attributes"] == {"words": 3}
+    assert len(trace_logger.handlers) == 1
+
+
+def test_trace_log_is_off_by_default(monkeypatch, trace_logger):
+    monkeypatch.delenv("LONGSORN_TRACE_LOG", raising=False)
+
+    tracing.new_trace()
+
+    assert trace_logger.handlers == [] and not trace_logger.isEnabledFor(logging.INFO)
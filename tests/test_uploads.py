@@ -0,0 +1,51 @@
+"""UploadStore: ไฟล์ที่ส่งให้ st.video ต้องไม่ทำให้ทุก session ถือวิดีโอใหญ่ไว้ในหน่วยความจำ"""
+import io
+import os
+
+import pytest
+
+from longsorn.uploads import UploadStore
+
+
+@pytest.fixture
+def video():
+    return io.BytesIO(os.urandom(64 * 1024))
+
+
+def test_small_file_plays_from_disk(tmp_path, video):
+    store = UploadStore(str(tmp_path), base_url="", max_inline_playback_bytes=1024 * 1024)
+    handle = store.save("session", video, "lesson.MP4")
+
+    assert store.playback_source(handle) == handle.path
+    assert handle.path.endswith(".mp4") and handle.size == 64 * 1024
+
+
+def test_large_file_is_not_played_inline(tmp_path, video):
+    store = UploadStore(str(tmp_path), base_url="", max_inline_playback_bytes=1024)
+    handle = store.save("session", video, "lesson.mp4")
+
+    assert store.playback_source(handle) is None
+
+
+def test_base_url_serves_any_size(tmp_path, video):
+    store = UploadStore(str(tmp_path), base_url="https://example.com/uploads/", max_inline_playback_bytes=1024)
+    handle = store.save("session", video, "lesson.mp4")
+
+    assert store.playback_source(handle) == f"https://example.com/uploads/session/{handle.sha256}.mp4"
+
+
+def test_limit_from_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv("LONGSORN_MAX_INLINE_PLAYBACK_MB", "0.5")
+    monkeypatch.delenv("LONGSORN_UPLOAD_BASE_URL", raising=False)
+
+    store = UploadStore(str(tmp_path))
+    assert store.max_inline_playback_bytes == 512 * 1024
+    assert store.base_url == ""
+
+
+def test_default_limit_keeps_large_videos_out_of_memory(tmp_path, monkeypatch):
+    monkeypatch.delenv("LONGSORN_MAX_INLINE_PLAYBACK_MB", raising=False)
+    monkeypatch.delenv("LONGSORN_UPLOAD_BASE_URL", raising=False)
+
+    store = UploadStore(str(tmp_path))
+    assert store.max_inline_playback_bytes == 20 * 1024 * 1024
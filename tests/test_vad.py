@@ -0,0 +1,77 @@
+"""การตัดช่วงเงียบ (longsorn.vad) กับเสียงสังเคราะห์ที่มีช่วงเงียบมาก/น้อย"""
+import numpy as np
+import pytest
+
+from longsorn.fakes import synthetic_speech_pcm
+from longsorn.ingest import SAMPLE_RATE
+from longsorn import vad
+from longsorn.vad import compress_silence
+
+
+def continuous_speech_pcm(seconds, seed=0):
+    """พูดต่อเนื่องแทบไม่มีช่วงเงียบ: พยางค์ ~5 ครั้ง/วินาที ความดังต่างกันในแต่ละวินาที (บางช่วงพูดเบามาก) บนเสียงห้อง"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    syllables = np.abs(np.sin(np.pi * 5 * t)) ** 0.5
+    loudness = np.repeat(rng.uniform(0.15, 1.0, int(seconds) + 1), SAMPLE_RATE)[:len(t)]
+    samples = rng.standard_normal(len(t)) * 3000 * syllables * loudness + rng.standard_normal(len(t)) * 150
+    return samples.astype("<i2").tobytes()
+
+
+def lecture_pcm(seconds, seed=0):
+    """ช่วงพูดสลับช่วงเงียบยาว 3-8 วินาที (เสียงห้องเบา ๆ)"""
+    rng = np.random.default_rng(seed)
+    total = int(seconds * SAMPLE_RATE)
+    samples = rng.standard_normal(total) * 150
+    position = 0
+    while position < total:
+        speech = int(rng.uniform(5.0, 15.0) * SAMPLE_RATE)
+        samples[position:position + speech] += rng.standard_normal(len(samples[position:position + speech])) * 3000
+        position += speech + int(rng.uniform(3.0, 8.0) * SAMPLE_RATE)
+    return samples.astype("<i2").tobytes()
+
+
+def test_speech_with_almost_no_pauses_is_kept():
+    result = compress_silence(continuous_speech_pcm(60))
+
+    assert result.sent_seconds > 0.98 * result.original_seconds
+
+
+def test_full_pcm_is_sent_when_the_mask_would_drop_speech(monkeypatch):
+    """threshold แบบเดิม (noise floor + margin อย่างเดียว) ตัดช่วงที่พูดเบาทิ้ง: ต้องถอยกลับไปส่งทั้งไฟล์"""
+    def noise_floor_only_mask(samples, sample_rate=SAMPLE_RATE, energy_db=None):
+        mask = energy_db >= np.percentile(energy_db, 10) + vad.SPEECH_MARGIN_DB
+        return mask, int(vad.FRAME_SECONDS * sample_rate)
+
+    monkeypatch.setattr(vad, "speech_mask", noise_floor_only_mask)
+    pcm = continuous_speech_pcm(60)
+    result = compress_silence(pcm)
+
+    assert result.pcm == pcm
+    assert result.saved_seconds == 0
+    assert result.to_original(42.5) == pytest.approx(42.5)
+
+
+def test_long_pauses_are_still_compressed():
+    pcm = lecture_pcm(120)
+    result = compress_silence(pcm)
+
+    assert result.saved_seconds > 20
+    assert len(result.compressed_starts) > 1
+
+
+def test_short_gaps_between_speech_are_kept():
+    result = compress_silence(synthetic_speech_pcm(60))
+
+    assert result.sent_seconds > 0.8 * result.original_seconds
+
+
+def test_word_times_map_back_to_the_original_recording():
+    result = compress_silence(lecture_pcm(120))
+    segment = len(result.compressed_starts) - 1
+    word = {"Word": "ครู", "Start (s)": result.compressed_starts[segment] + 0.5, "End (s)": result.compressed_starts[segment] + 0.8}
+
+    mapped, = result.map_words([word])
+    assert mapped["Start (s)"] == pytest.approx(result.original_starts[segment] + 0.5)
+    assert mapped["End (s)"] - mapped["Start (s)"] == pytest.approx(0.3)
+    assert mapped["Start (s)"] > word["Start (s)"]